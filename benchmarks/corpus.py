@@ -0,0 +1,98 @@
+# A generator of synthetic, reproducible corpora of question titles, similar to the sentences in
+# tests/resources/example_sentences.json, to benchmark mutatest on inputs of any size and length.
+from random import Random
+from typing import List
+
+NOUNS = ["file", "request", "service", "database", "server", "user", "table", "string", "image",
+         "page", "form", "query", "function", "value", "error", "list", "array", "object", "class",
+         "method", "thread", "window", "button", "network", "memory", "library", "package",
+         "message", "column", "record", "account", "session", "document", "report", "model",
+         "event", "process", "answer", "question", "picture", "number", "letter", "date", "time",
+         "name", "address", "key", "line", "word", "book", "car", "house", "machine", "program"]
+
+VERBS = ["upload", "convert", "read", "write", "create", "delete", "update", "send", "parse",
+         "load", "store", "display", "find", "sort", "compare", "connect", "install", "run",
+         "build", "test", "change", "open", "close", "save", "print", "check", "copy", "move",
+         "remove", "add", "get", "set", "show", "hide", "use", "call", "return", "handle"]
+
+ADJECTIVES = ["large", "empty", "multiple", "custom", "remote", "local", "simple", "dynamic",
+              "different", "new", "old", "slow", "fast", "secure", "hidden", "single", "current",
+              "default", "main", "small", "long", "short", "open", "free", "common", "special"]
+
+ADVERBS = ["quickly", "correctly", "automatically", "efficiently", "safely", "directly",
+           "manually", "properly", "easily", "silently"]
+
+PREPOSITIONS = ["to", "in", "from", "with", "of", "for", "on", "by", "into", "without", "via"]
+
+DETERMINERS = ["the", "a", "an", "my", "this", "each", "every", "another"]
+
+# Sentences start with one of these clauses, and are extended with phrases until long enough.
+CLAUSES = [
+    ["how", "to", "VERB", "DETERMINER", "ADJECTIVE", "NOUN"],
+    ["VERB", "DETERMINER", "NOUN", "ADVERB"],
+    ["why", "does", "DETERMINER", "NOUN", "VERB", "DETERMINER", "NOUN"],
+    ["ADJECTIVE", "NOUN", "when", "I", "VERB", "DETERMINER", "NOUN"],
+    ["what", "is", "the", "ADJECTIVE", "NOUN", "of", "DETERMINER", "NOUN"],
+    ["can", "I", "VERB", "DETERMINER", "NOUN", "ADVERB"],
+]
+
+PHRASES = [
+    ["PREPOSITION", "DETERMINER", "NOUN"],
+    ["PREPOSITION", "DETERMINER", "ADJECTIVE", "NOUN"],
+    ["and", "VERB", "DETERMINER", "NOUN"],
+    ["PREPOSITION", "NOUN", "NOUN"],
+]
+
+CATEGORIES = {
+    "NOUN": NOUNS,
+    "VERB": VERBS,
+    "ADJECTIVE": ADJECTIVES,
+    "ADVERB": ADVERBS,
+    "PREPOSITION": PREPOSITIONS,
+    "DETERMINER": DETERMINERS,
+}
+
+
+def generate_sentence(rng: Random, min_length: int, max_length: int) -> str:
+    """
+    Generates a sentence of between ``min_length`` and ``max_length`` words (the first clause may
+    be longer than ``max_length``).
+    """
+    length = rng.randint(min_length, max_length)
+
+    clause = rng.choice(CLAUSES)
+    slots = list(clause)
+    while len(slots) < length:
+        slots.extend(rng.choice(PHRASES))
+
+    # The clause is kept whole, but the last phrase may be cut off.
+    slots = slots[:max(length, len(clause))]
+
+    sentence = " ".join(rng.choice(CATEGORIES[x]) if x in CATEGORIES else x for x in slots)
+
+    return sentence[0].upper() + sentence[1:]
+
+
+def generate_corpus(num_sentences: int,
+                    random_seed: int = 13,
+                    min_length: int = 6,
+                    max_length: int = 20) -> List[str]:
+    """
+    Generates ``num_sentences`` sentences. The same arguments always give the same corpus.
+
+            Parameters:
+                ``num_sentences`` (``int``): the number of sentences
+
+                ``random_seed`` (``int``): the seed of the corpus
+
+                ``min_length`` (``int``), ``max_length`` (``int``): the range of the number of
+                words per sentence
+
+            Returns:
+                The sentences.
+    """
+    assert 0 < min_length <= max_length, "Invalid sentence length range."
+
+    rng = Random(random_seed)
+
+    return [generate_sentence(rng, min_length, max_length) for _ in range(num_sentences)]
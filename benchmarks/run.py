@@ -0,0 +1,241 @@
+# Benchmarks of the main stages of mutatest on a synthetic corpus. Results are written as JSON, and
+# can be compared to a baseline written by another version:
+#
+#     python -m benchmarks.run --output baseline.json
+#     python -m benchmarks.run --compare baseline.json
+import argparse
+import hashlib
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import nltk
+import numpy as np
+
+from mutatest.cache import get_variant_cache
+from mutatest.mutators import DropoutMutator, ReplacementMutator
+from mutatest.resources import require_resources
+from mutatest.test_runner import MutamorphicTest
+from mutatest.Word import Word, preprocess_sentences, sentence_preprocessing
+
+from .corpus import generate_corpus
+
+# A benchmark prepares its input from the corpus (which is not measured), and returns the
+# function that is measured and the number of items (e.g. sentences) it processes.
+Benchmark = Callable[[List[str]], Tuple[Callable[[], Any], int]]
+
+
+def _reset_caches():
+    # Variants are looked up again, unless a variant index is loaded. The configured cache (e.g.
+    # its size and persistent store, see MUTATEST_VARIANT_CACHE) is kept, only its memory emptied.
+    get_variant_cache().clear()
+
+
+def _benchmark_preprocessing(corpus: List[str]) -> Tuple[Callable[[], Any], int]:
+    def run():
+        _reset_caches()
+        return [sentence_preprocessing(x) for x in corpus]
+
+    return run, len(corpus)
+
+
+def _benchmark_words(corpus: List[str]) -> Tuple[Callable[[], Any], int]:
+    require_resources()
+    tagged = nltk.pos_tag_sents(nltk.word_tokenize(x) for x in corpus)
+    tuples = [t for sentence in tagged for t in sentence]
+
+    def run():
+        _reset_caches()
+        return [Word.from_tuple(t) for t in tuples]
+
+    return run, len(tuples)
+
+
+def _benchmark_mutator(mutator) -> Benchmark:
+    def benchmark(corpus: List[str]) -> Tuple[Callable[[], Any], int]:
+        preprocessed = preprocess_sentences(corpus)
+
+        def run():
+            return [mutator.mutate(x, random_seed=13) for x in preprocessed]
+
+        return run, len(corpus)
+
+    return benchmark
+
+
+def _stub_model(sentence: str) -> np.ndarray:
+    """
+    A deterministic stand-in for a model, which maps a sentence to a vector of 16 scores.
+    """
+    return np.frombuffer(hashlib.md5(sentence.encode()).digest(), dtype=np.uint8) / 255
+
+
+def _benchmark_test_run(corpus: List[str]) -> Tuple[Callable[[], Any], int]:
+    preprocessed = preprocess_sentences(corpus)
+
+    def run():
+        test = MutamorphicTest(preprocessed, ReplacementMutator(1, 5), _stub_model, "cosine")
+        test.run()
+        return test
+
+    return run, len(corpus)
+
+
+BENCHMARKS: Dict[str, Benchmark] = {
+    "sentence_preprocessing": _benchmark_preprocessing,
+    "word_construction": _benchmark_words,
+    "replacement_random": _benchmark_mutator(ReplacementMutator(2, 10, "random")),
+    "replacement_most_common_first":
+        _benchmark_mutator(ReplacementMutator(2, 10, "most_common_first")),
+    "dropout_1": _benchmark_mutator(DropoutMutator(1, 10)),
+    "dropout_2": _benchmark_mutator(DropoutMutator(2, 10)),
+    "dropout_3": _benchmark_mutator(DropoutMutator(3, 10)),
+    "mutamorphic_test_run": _benchmark_test_run,
+}
+
+
+def measure(benchmark: Benchmark, corpus: List[str], repeat: int = 3) -> Dict[str, float]:
+    """
+    Runs a benchmark ``repeat`` times for its time, and once more under ``tracemalloc`` for its
+    peak memory use, which is measured separately because tracing slows the run down.
+
+            Returns:
+                The best time in seconds, the number of items, the items per second of the best
+                time, and the peak memory use in bytes.
+    """
+    run, num_items = benchmark(corpus)
+
+    seconds = min(_time(run) for _ in range(repeat))
+
+    tracemalloc.start()
+    try:
+        run()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {"seconds": seconds,
+            "items": num_items,
+            "items_per_second": num_items / seconds if seconds > 0 else float("inf"),
+            "peak_memory_bytes": peak_memory}
+
+
+def _time(run: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+def run_benchmarks(names: List[str],
+                   num_sentences: int = 1000,
+                   random_seed: int = 13,
+                   min_length: int = 6,
+                   max_length: int = 20,
+                   repeat: int = 3) -> Dict[str, Any]:
+    """
+    Runs the given benchmarks (see ``BENCHMARKS``) on a generated corpus.
+
+            Returns:
+                A JSON-serializable dictionary with the environment, the corpus parameters, and the
+                measurements of each benchmark.
+    """
+    for name in names:
+        assert name in BENCHMARKS, f"Unknown benchmark: {name}."
+
+    corpus = generate_corpus(num_sentences, random_seed, min_length, max_length)
+
+    results = dict()
+    for name in names:
+        results[name] = measure(BENCHMARKS[name], corpus, repeat)
+        print(f"{name}: {results[name]['items_per_second']:.1f} items/s, "
+              f"{results[name]['peak_memory_bytes'] / 2 ** 20:.1f} MiB", file=sys.stderr)
+
+    return {"environment": {"python": platform.python_version(),
+                            "platform": platform.platform(),
+                            "nltk": nltk.__version__,
+                            "numpy": np.__version__},
+            "corpus": {"num_sentences": num_sentences,
+                       "random_seed": random_seed,
+                       "min_length": min_length,
+                       "max_length": max_length},
+            "benchmarks": results}
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.2) -> List[str]:
+    """
+    Compares results to a baseline of the same benchmarks.
+
+            Parameters:
+                ``tolerance`` (``float``): the fraction by which throughput may drop, and peak
+                memory use may grow, before a benchmark counts as a regression
+
+            Returns:
+                A description of each regression.
+    """
+    regressions = []
+    for name, result in results["benchmarks"].items():
+        if name not in baseline["benchmarks"]:
+            continue
+        reference = baseline["benchmarks"][name]
+
+        speed = result["items_per_second"] / reference["items_per_second"]
+        memory = result["peak_memory_bytes"] / max(reference["peak_memory_bytes"], 1)
+        print(f"{name}: {speed:.2f}x throughput, {memory:.2f}x peak memory", file=sys.stderr)
+
+        if speed < 1 - tolerance:
+            regressions.append(f"{name}: throughput dropped to {speed:.2f}x of the baseline")
+        if memory > 1 + tolerance:
+            regressions.append(f"{name}: peak memory grew to {memory:.2f}x of the baseline")
+
+    return regressions
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks mutatest on a synthetic corpus.")
+    parser.add_argument("benchmarks", nargs="*", default=list(BENCHMARKS),
+                        help="the benchmarks to run (default: all)")
+    parser.add_argument("--sentences", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--min-length", type=int, default=6)
+    parser.add_argument("--max-length", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="where to write the results as JSON")
+    parser.add_argument("--compare", help="a JSON baseline to compare the results to")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    options = parser.parse_args(args)
+
+    baseline = None
+    if options.compare is not None:
+        with open(options.compare) as file:
+            baseline = json.load(file)
+
+        # Compare like with like.
+        options.sentences = baseline["corpus"]["num_sentences"]
+        options.seed = baseline["corpus"]["random_seed"]
+        options.min_length = baseline["corpus"]["min_length"]
+        options.max_length = baseline["corpus"]["max_length"]
+
+    results = run_benchmarks(options.benchmarks, options.sentences, options.seed,
+                             options.min_length, options.max_length, options.repeat)
+
+    if options.output is not None:
+        with open(options.output, "w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if baseline is not None:
+        regressions = compare(results, baseline, options.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+
+        return 1 if len(regressions) > 0 else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
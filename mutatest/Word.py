@@ -1,44 +1,166 @@
-from typing import Tuple, List, Dict, Iterable
-from nltk.corpus import stopwords
+from types import MappingProxyType
+from typing import Tuple, List, Dict, Iterable, Optional, Union
 import re
+import sys
+import weakref
 from nltk.corpus import wordnet as wn
 from nltk.corpus.reader import Synset
+from nltk.corpus.reader.wordnet import NOUN, ADJ, ADJ_SAT, ADV, VERB
 from nltk.tokenize import word_tokenize
 import nltk
+from . import profiling
+from .cache import get_variant_cache
+from .resources import get_stopwords, require_resources
+from .variant_index import get_variant_index
+from .variant_sources import VariantSource, get_variant_source, register_variant_source
 
-STOPWORDS = stopwords.words('english')
 POS_TAG_MAP = {
-    'NN': [wn.NOUN],
-    'JJ': [wn.ADJ, wn.ADJ_SAT],
-    'RB': [wn.ADV],
-    'VB': [wn.VERB]
+    'NN': [NOUN],
+    'JJ': [ADJ, ADJ_SAT],
+    'RB': [ADV],
+    'VB': [VERB]
 }
 
 
+def __getattr__(name: str):
+    # The stopwords used to be loaded at import time as ``STOPWORDS``; they are now loaded lazily.
+    if name == 'STOPWORDS':
+        return get_stopwords()
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class WordNetVariantSource(VariantSource):
+    """
+    Suggests the synonyms and hypernyms of a word in WordNet as its variants, scored by the
+    number of times each is suggested. This is the default variant source.
+
+    If a precompiled variant index is loaded (see ``mutatest.variant_index``), it answers the
+    lookup. Otherwise, results are shared through the process-wide variant cache (see
+    ``mutatest.cache.configure_variant_cache``), so WordNet is only consulted once per (word,
+    part-of-speech) pair.
+    """
+
+    name = "wordnet"
+
+    def lookup(self, value: str, pos_tag: str) -> Dict[str, int]:
+        with profiling.stage("wordnet_lookup"):
+            index = get_variant_index()
+            if index is not None:
+                result = index.lookup(value, pos_tag)
+                if result is not None:
+                    profiling.count("variant_index_hits")
+                    return result
+
+            cache = get_variant_cache()
+            key = f"{pos_tag}:{value}"
+
+            result = cache.get(key)
+            if result is not None:
+                profiling.count("variant_cache_hits")
+            else:
+                profiling.count("variant_cache_misses")
+
+                # Each character of the tag is a WordNet part of speech, which ``synsets`` iterates.
+                synsets = wn.synsets(value, pos=pos_tag)
+
+                synonyms = Word._get_synonyms(value, synsets)
+                hypernyms = Word._get_hypernyms(value, synsets)
+
+                result = Word._intern_variants(Word._count_variants(synonyms, hypernyms))
+                cache.put(key, result)
+
+            return result
+
+
+register_variant_source(WordNetVariantSource())
+
+
 class Word:
     """
     A class to represent word that possibly has variants (synonyms/hypernyms) available, as
-    suggested by WordNet.
+    suggested by WordNet, or by another variant source (see ``mutatest.variant_sources``).
+
+    Words are immutable, and there is only one instance per (value, WordNet part-of-speech tag,
+    variant source) at a time: creating a word that already exists returns the existing instance.
+    Words are equal (and hash equally) if their value, tag and source are.
 
             Attributes
                     value (str):  the actual word
 
-                    pos_tag (str): the WordNet part-of-speech tag as determined by the NLTK
-                    package
+                    pos_tag (str): the WordNet part-of-speech tag(s) as determined by the NLTK
+                    package, e.g. "n", or "as" for adjectives, or "" if there is none
 
                     is_stopword (bool): True iff this word is a stopword (as defined by
                     WordNet)
 
-                    variants (Dict[str, int]): variants available for this word. Keys
+                    variants (Mapping[str, int]): variants available for this word. Keys
                     correspond to variants, values to the number of times each variant is suggested
-                    by WordNet. (can be interpreted as a measure of variant quality)
+                    by WordNet. (can be interpreted as a measure of variant quality). Other sources
+                    give other scores, where higher is better too. The mapping is read-only.
+
+                    source (str): the name of the variant source of this word
     """
 
-    def __init__(self, value: str, pos_tag: str):
-        self.value = value.lower()
-        self.pos_tag = Word.convert_pos_tag(pos_tag)
-        self.is_stopword: bool = value.lower() in STOPWORDS
-        self.variants = self._get_variations()
+    __slots__ = ("value", "pos_tag", "is_stopword", "variants", "source", "__weakref__")
+
+    _instances: "weakref.WeakValueDictionary[Tuple[str, str, str], Word]" = \
+        weakref.WeakValueDictionary()
+
+    def __new__(cls, value: str, pos_tag: str, source: Union[None, str, VariantSource] = None):
+        return cls._shared(value.lower(), Word.convert_pos_tag(pos_tag),
+                           source=get_variant_source(source).name)
+
+    @classmethod
+    def _shared(cls,
+                value: str,
+                pos_tag: str,
+                variants: Optional[Dict[str, int]] = None,
+                source: str = WordNetVariantSource.name) -> "Word":
+        """
+        Returns the word with the given value, WordNet part-of-speech tag and variant source, which
+        is created if it does not exist yet. The variants of a new word are looked up, unless they
+        are given.
+        """
+        key = (value, pos_tag, source)
+        word = cls._instances.get(key)
+        if word is not None:
+            return word
+
+        word = object.__new__(cls)
+        set_attribute = object.__setattr__
+        set_attribute(word, "value", sys.intern(value))
+        set_attribute(word, "pos_tag", pos_tag)
+        set_attribute(word, "is_stopword", value in get_stopwords())
+        set_attribute(word, "source", source)
+        if variants is None:
+            variants = word._get_variations()
+        else:
+            variants = Word._intern_variants(variants)
+        set_attribute(word, "variants", MappingProxyType(variants))
+
+        # Another thread may have created the same word in the meantime.
+        return cls._instances.setdefault(key, word)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Words are immutable.")
+
+    def __delattr__(self, name):
+        raise AttributeError("Words are immutable.")
+
+    def __eq__(self, other):
+        if not isinstance(other, Word):
+            return NotImplemented
+        return self is other or (self.value == other.value and self.pos_tag == other.pos_tag
+                                 and self.source == other.source)
+
+    def __hash__(self):
+        return hash((self.value, self.pos_tag, self.source))
+
+    def __reduce__(self):
+        # Unpickled words are shared with the words in the receiving process, and new ones do not
+        # need to be looked up again.
+        return Word._shared, (self.value, self.pos_tag, dict(self.variants), self.source)
 
     @property
     def is_nontrivial(self):
@@ -50,68 +172,93 @@ class Word:
 
     def _get_variations(self) -> Dict[str, int]:
         """
-        Uses WordNet to determine variants of this word, where a variant is either a synonym or a
-        hypernym.
+        Asks the variant source of this word for its variants, where a WordNet variant is either a
+        synonym or a hypernym (see ``WordNetVariantSource``). Stopwords and words without a WordNet
+        part-of-speech tag have no variants.
 
                 Returns:
                     Returns a dictionary which has as its keys the variations available for this
                     word. As its values, the dictionary holds numbers that indicate how many times
                     each variant was suggested by WordNet.
         """
-        if self.is_stopword or self.pos_tag == '':
+        if not Word._has_variants(self.value, self.pos_tag):
             return dict()
 
-        synsets = wn.synsets(self.value, pos=self.pos_tag)
+        return Word._intern_variants(get_variant_source(self.source).lookup(self.value,
+                                                                            self.pos_tag))
 
-        synonyms = self._get_synonyms(synsets)
-        hypernyms = self._get_hypernyms(synsets)
+    @staticmethod
+    def _has_variants(value: str, pos_tag: str) -> bool:
+        """
+        Whether the variants of a word are looked up: they are not for stopwords and words without
+        a WordNet part-of-speech tag.
+        """
+        return pos_tag != '' and value not in get_stopwords()
 
-        result = Word._count_variants(synonyms, hypernyms)
+    @staticmethod
+    def _get_synonyms(value: str, synsets: List[Synset]) -> List[str]:
+        """
+        Given the WordNet Synsets available for a (lowercased) word, gather all possible synonyms.
+        """
+        return [x for x in Word.synonym_names(synsets) if value != x.lower()]
 
-        return result
+    @staticmethod
+    def _get_hypernyms(value: str, synsets: List[Synset]) -> List[str]:
+        """
+        Given the WordNet Synsets available for a (lowercased) word, gather all possible hypernyms.
+        """
+        return [x for x in Word.hypernym_names(synsets) if value != x.lower()]
 
-    def _get_synonyms(self, synsets: List[Synset]) -> List[str]:
+    @staticmethod
+    def synonym_names(synsets: List[Synset]) -> List[str]:
         """
-        Given the WordNet Synsets available for this word, gather all possible synonyms.
+        Gathers the names of all lemmas of the given Synsets, with underscores replaced by spaces.
+        Unlike ``_get_synonyms``, the word itself is not filtered out.
         """
         result: List[str] = []
         for synset in synsets:
             for lemma in synset.lemmas():
                 substrings = lemma.name().split('.')
                 synonym = substrings[-1]
-                synonym_without_underscore = re.sub(r'_', ' ', synonym)
-                if self.value != synonym_without_underscore.lower():
-                    result.append(synonym_without_underscore)
+                result.append(re.sub(r'_', ' ', synonym))
 
         return result
 
-    def _get_hypernyms(self, synsets: List[Synset]) -> List[str]:
+    @staticmethod
+    def hypernym_names(synsets: List[Synset]) -> List[str]:
         """
-        Given the WordNet Synsets available for this word, gather all possible hypernyms.
+        Gathers the names of all lemmas of the hypernyms of the given Synsets, with underscores
+        replaced by spaces. Unlike ``_get_hypernyms``, the word itself is not filtered out.
         """
         result: List[str] = []
         for synset in synsets:
             for hypernym in synset.hypernyms():
                 for lemma in hypernym.lemmas():
                     substrings = lemma.name().split('.')
-                    hypernym = substrings[-1]
-                    hypernym_without_underscore = re.sub(r'_', ' ', hypernym)
-                    if self.value != hypernym_without_underscore.lower():
-                        result.append(hypernym_without_underscore)
+                    hypernym_name = substrings[-1]
+                    result.append(re.sub(r'_', ' ', hypernym_name))
 
         return result
 
     @staticmethod
-    def convert_pos_tag(nltk_pos_tag):
+    def convert_pos_tag(nltk_pos_tag: str) -> str:
         """
-        Converts a NLTK part-of-speech (POS) tag to a WordNet POS tag.
+        Converts a NLTK part-of-speech (POS) tag to a WordNet POS tag, where a tag that maps to
+        several WordNet tags is returned as their concatenation.
         """
         root_tag = nltk_pos_tag[0:2]
         if root_tag in POS_TAG_MAP.keys():
-            return POS_TAG_MAP[root_tag]
+            return ''.join(POS_TAG_MAP[root_tag])
         else:
             return ''
 
+    @staticmethod
+    def _intern_variants(variants: Dict[str, int]) -> Dict[str, int]:
+        """
+        Interns the variants, so that variants suggested for many words are stored once.
+        """
+        return {sys.intern(variant): count for variant, count in variants.items()}
+
     @staticmethod
     def _count_variants(*args: Iterable[str]) -> Dict[str, int]:
         """
@@ -131,27 +278,173 @@ class Word:
         return result
 
     @staticmethod
-    def from_tuple(tuple: Tuple[str, str]):
+    def from_tuple(tuple: Tuple[str, str], source: Union[None, str, VariantSource] = None):
         """
-        Creates an instance of ``Word`` from a (token, part-of-speech tag), as generated by the
+        Returns the instance of ``Word`` for a (token, part-of-speech tag), as generated by the
         functions ``nltk.pos_tag(tokens)``.
 
                 Parameters:
                         ``tuple`` (``Tuple[str, str]``): A tuple with as the first argument the text
                         token, and as its second argument, the tokens POS tag.
 
+                        ``source`` (``Union[str, VariantSource]``): the variant source, the default
+                        source (see ``variant_sources.configure_variant_source``) if None
+
                 Returns:
                         an instance of ``Word``
         """
-        return Word(tuple[0], tuple[1])
+        return Word(tuple[0], tuple[1], source)
+
+    @staticmethod
+    def from_tuples(tuples: Iterable[Tuple[str, str]],
+                    source: Union[None, str, VariantSource] = None) -> List["Word"]:
+        """
+        Same as ``from_tuple`` for many tuples, of which the variants of the words that do not
+        exist yet are looked up in one batch (see ``VariantSource.lookup_many``).
+        """
+        source = get_variant_source(source)
+        keys = [(value.lower(), Word.convert_pos_tag(pos_tag)) for value, pos_tag in tuples]
+
+        # Holds on to the existing words, which could otherwise be collected in the meantime.
+        words = {key: Word._instances.get((*key, source.name)) for key in keys}
+
+        queries = [key for key, word in words.items() if word is None and Word._has_variants(*key)]
+        for key, variants in zip(queries, source.lookup_many(queries)):
+            words[key] = Word._shared(*key, variants, source.name)
+
+        return [Word._shared(*key, source=source.name) if words[key] is None else words[key]
+                for key in keys]
+
+    def __repr__(self):
+        return f"Word(\"{self.value}\", tag: {self.pos_tag}, stopword: {self.is_stopword}, " \
+               f"source: {self.source})"
+
+
+class PreprocessedSentence:
+    """
+    A sentence that was tokenized, tagged and looked up in WordNet once, so that it can be mutated
+    by several mutators, and inspected, without being preprocessed again.
+
+            Attributes
+                    sentence (str): the input sentence
+
+                    tokens (List[str]): the tokens of the sentence
+
+                    tags (List[str]): the NLTK part-of-speech tag of each token
+
+                    words (List[Word]): the ``Word`` of each token. Words may be shared with other
+                    sentences, and should not be modified.
+
+                    nontrivial_indices (List[int]): the positions of the nontrivial words (see
+                    ``Word.is_nontrivial``)
+
+                    variant_source (str): the name of the variant source of the words
+    """
+
+    def __init__(self,
+                 sentence: str,
+                 tokens: List[str],
+                 tags: List[str],
+                 words: List[Word],
+                 variant_source: str = WordNetVariantSource.name):
+        self.sentence = sentence
+        self.tokens = tokens
+        self.tags = tags
+        self.words = words
+        self.variant_source = variant_source
+        self.nontrivial_indices = [index for index, word in enumerate(words) if word.is_nontrivial]
+
+    @property
+    def nontrivial_words(self) -> List[Word]:
+        return [self.words[index] for index in self.nontrivial_indices]
+
+    @property
+    def non_stopwords(self) -> List[Word]:
+        return [word for word in self.words if not word.is_stopword]
 
     def __repr__(self):
-        return f"Word(\"{self.value}\", tag: {self.pos_tag}, stopword: {self.is_stopword})"
+        return f"PreprocessedSentence(\"{self.sentence}\", nontrivial: {self.nontrivial_indices})"
+
+
+def preprocess_sentence(input_sentence: str,
+                        variant_source: Union[None, str, VariantSource] = None) \
+        -> PreprocessedSentence:
+    """
+    Tokenizes and tags a sentence, and determines the variants of its words with a variant source
+    (the default source if None, see ``variant_sources.configure_variant_source``).
+    """
+    require_resources()
+
+    with profiling.stage("tokenization"):
+        tokens = word_tokenize(input_sentence)
+    with profiling.stage("pos_tagging"):
+        tokens_with_pos_tags = nltk.pos_tag(tokens)
+    source = get_variant_source(variant_source)
+    words = Word.from_tuples(tokens_with_pos_tags, source)
+
+    return PreprocessedSentence(input_sentence, tokens, [t[1] for t in tokens_with_pos_tags], words,
+                                source.name)
+
+
+def preprocess_sentences(input_sentences: Iterable[Union[str, PreprocessedSentence]],
+                         variant_source: Union[None, str, VariantSource] = None) \
+        -> List[PreprocessedSentence]:
+    """
+    Preprocesses many sentences at once. A single tagger instance tags all of them
+    (``nltk.pos_tag_sents``), a ``Word`` is constructed only once for each distinct (token,
+    part-of-speech tag) pair in the batch, and the variants of new words are looked up in one
+    batch (see ``VariantSource.lookup_many``).
 
+            Parameters:
+                ``input_sentences`` (``Iterable[Union[str, PreprocessedSentence]]``): the input
+                sentences. Sentences that were already preprocessed are passed through.
 
-def sentence_preprocessing(input_sentence: str) -> List[Word]:
-    tokens = word_tokenize(input_sentence)
-    tokens_with_pos_tags = nltk.pos_tag(tokens)
-    words = [Word.from_tuple(t) for t in tokens_with_pos_tags]
+                ``variant_source`` (``Union[str, VariantSource]``): the variant source, the default
+                source (see ``variant_sources.configure_variant_source``) if None
 
-    return words
+            Returns:
+                The preprocessed sentences, in order. Words are shared between (and within)
+                sentences, and should not be modified.
+    """
+    input_sentences = list(input_sentences)
+    sentences = [x for x in input_sentences if not isinstance(x, PreprocessedSentence)]
+    if len(sentences) == 0:
+        return input_sentences
+
+    require_resources()
+
+    with profiling.stage("tokenization"):
+        tokens_per_sentence = [word_tokenize(x) for x in sentences]
+    with profiling.stage("pos_tagging"):
+        tags_per_sentence = nltk.pos_tag_sents(tokens_per_sentence)
+
+    source = get_variant_source(variant_source)
+    distinct_tuples = list(dict.fromkeys(t for tags in tags_per_sentence for t in tags))
+    words_by_tuple: Dict[Tuple[str, str], Word] = \
+        dict(zip(distinct_tuples, Word.from_tuples(distinct_tuples, source)))
+
+    preprocessed: List[PreprocessedSentence] = []
+    for sentence, tokens_with_pos_tags in zip(sentences, tags_per_sentence):
+        preprocessed.append(PreprocessedSentence(sentence,
+                                                 [t[0] for t in tokens_with_pos_tags],
+                                                 [t[1] for t in tokens_with_pos_tags],
+                                                 [words_by_tuple[t] for t in tokens_with_pos_tags],
+                                                 source.name))
+
+    results = iter(preprocessed)
+    return [x if isinstance(x, PreprocessedSentence) else next(results) for x in input_sentences]
+
+
+def sentence_preprocessing(input_sentence: str,
+                           variant_source: Union[None, str, VariantSource] = None) -> List[Word]:
+    return preprocess_sentence(input_sentence, variant_source).words
+
+
+def sentence_preprocessing_batch(input_sentences: Iterable[str],
+                                 variant_source: Union[None, str, VariantSource] = None) \
+        -> List[List[Word]]:
+    """
+    Same as ``preprocess_sentences``, but returns only the words of each sentence, like
+    ``sentence_preprocessing``.
+    """
+    return [x.words for x in preprocess_sentences(input_sentences, variant_source)]
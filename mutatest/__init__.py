@@ -1,15 +1,24 @@
-import nltk
+from .resources import ensure_resources
 
 __all__ = [
+    "async_runner",
+    "cache",
+    "checkpoint",
+    "cli",
     "dropout_mutator",
+    "early_stopping",
+    "ensure_resources",
+    "mutation_table",
     "mutators",
+    "normalization",
+    "profiling",
     "replacement_mutator",
+    "resources",
+    "sampling",
+    "sharding",
+    "similarity",
     "test_runner",
+    "variant_index",
+    "variant_sources",
     "Word",
 ]
-
-nltk.download('wordnet')
-nltk.download('punkt')
-nltk.download('stopwords')
-nltk.download('averaged_perceptron_tagger')
-nltk.download('omw-1.4')
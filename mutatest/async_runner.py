@@ -0,0 +1,148 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from typing import Awaitable, Callable, Iterable, Optional, Tuple, Type, Union
+
+from . import profiling
+from .mutators import Mutator
+from .profiling import RunStats
+from .test_runner import MutamorphicTest, ModelOutput, _create_executor, _run_test_case
+from .Word import PreprocessedSentence
+
+
+class AsyncMutamorphicTest(MutamorphicTest[ModelOutput]):
+    """
+    A ``MutamorphicTest`` for models behind a remote endpoint, with an async model callback. Model
+    requests of many test cases are issued concurrently, while the variants of the next test cases
+    are generated in a background executor, as many test cases at a time as it has workers.
+    """
+
+    def __init__(self,
+                 input_sentences: Iterable[Union[str, PreprocessedSentence]],
+                 mutator: Mutator,
+                 model_callback: Callable[[str], Awaitable[ModelOutput]],
+                 similarity_callback: Union[Callable[[ModelOutput, ModelOutput], float], str],
+                 random_seed: int = 13,
+                 max_in_flight: int = 16,
+                 max_pending_cases: int = 64,
+                 max_retries: int = 3,
+                 retry_delay: float = 0.5,
+                 retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+                 run_stats: Optional[RunStats] = None,
+                 seed_per_case: bool = True,
+                 shard_index: int = 0,
+                 shard_count: int = 1):
+        """
+        See ``MutamorphicTest``.
+
+                Parameters:
+                    ``model_callback`` (``Callable[[str], Awaitable[ModelOutput]]``): an async
+                    function returning the model output for a sentence, e.g. by calling an HTTP
+                    inference server
+
+                    ``max_in_flight`` (``int``): the maximum number of concurrent model requests
+
+                    ``max_pending_cases`` (``int``): the maximum number of test cases whose
+                    variants are being generated, or whose model outputs are not complete yet.
+                    Variant generation waits when this is reached (backpressure).
+
+                    ``max_retries`` (``int``): the number of times a failed model request is
+                    retried, with exponential backoff starting at ``retry_delay`` seconds
+
+                    ``retry_on`` (``Tuple[Type[BaseException], ...]``): the exceptions after which
+                    a model request is retried
+        """
+        super().__init__(input_sentences, mutator, model_callback, similarity_callback, random_seed,
+                         run_stats=run_stats, seed_per_case=seed_per_case,
+                         shard_index=shard_index, shard_count=shard_count)
+
+        assert max_in_flight > 0 and max_pending_cases > 0, \
+            "The number of concurrent requests and pending test cases should be positive."
+
+        self.max_in_flight = max_in_flight
+        self.max_pending_cases = max_pending_cases
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.retry_on = retry_on
+
+    def run(self, workers: int = 1, backend: str = "thread"):
+        """
+        Runs ``run_async`` in a new event loop. Variants are generated in a pool of ``workers``
+        workers (see ``MutamorphicTest.run``), or in the event loop's default thread pool for a
+        single worker.
+        """
+        with _create_executor(workers, backend, self.mutator) as executor:
+            asyncio.run(self.run_async(executor))
+
+    async def run_async(self, executor: Optional[Executor] = None):
+        """
+        Computes the variants, model outputs and similarities of all test cases.
+
+                Parameters:
+                    ``executor`` (``Executor``): where variants are generated, the event loop's
+                    default thread pool by default
+        """
+        requests = asyncio.Semaphore(self.max_in_flight)
+        pending_cases = asyncio.Semaphore(self.max_pending_cases)
+
+        with profiling.recording(self.run_stats):
+            await asyncio.gather(*[self._run_test_case(index, executor, requests, pending_cases)
+                                   for index in range(len(self.test_cases))])
+
+            self._store_similarities(self._compute_similarities(self.test_cases, computed=True))
+
+    async def _run_test_case(self,
+                             index: int,
+                             executor: Optional[Executor],
+                             requests: asyncio.Semaphore,
+                             pending_cases: asyncio.Semaphore):
+        """
+        Generates the variants of a test case in the executor, requests its model outputs
+        concurrently, and computes its similarities. At most ``max_pending_cases`` test cases are
+        run at a time, so that the executor is kept busy without generating variants far ahead of
+        the model requests.
+        """
+        loop = asyncio.get_running_loop()
+
+        async with pending_cases:
+            # In a process pool, the variants are computed on a copy of the test case.
+            test_case = self.test_cases[index]
+            test_case = self.test_cases[index] = await loop.run_in_executor(
+                executor,
+                partial(_run_test_case, test_case, self.case_seed(test_case.input_sentence),
+                        mutator=self.mutator, model_callback=None, similarity_callback=None,
+                        record_stats=self._records_worker_stats(executor)))
+
+            if isinstance(executor, ProcessPoolExecutor):
+                # The mutator that counted this ran in another process.
+                if len(test_case.variants) == 0 and hasattr(self.mutator, "non_mutated"):
+                    self.mutator.non_mutated += 1
+                self._merge_worker_stats(test_case)
+
+            outputs = await asyncio.gather(*[self._call_model(x, requests)
+                                             for x in test_case.model_inputs])
+            test_case.set_model_outputs(list(outputs))
+
+            if not isinstance(self.similarity_callback, str):
+                test_case.compute_similarities(self.similarity_callback)
+
+    async def _call_model(self, sentence: str, requests: asyncio.Semaphore) -> ModelOutput:
+        """
+        Calls the model, with at most ``max_in_flight`` calls at a time, and retries failed calls.
+        The latency of each call is recorded as the wall time of the "model_inference" stage,
+        without CPU time: the model runs elsewhere, and the CPU time of this thread meanwhile
+        belongs to the other test cases.
+        """
+        for attempt in range(self.max_retries + 1):
+            async with requests:
+                start = time.perf_counter()
+                try:
+                    return await self.model_callback(sentence)
+                except self.retry_on:
+                    if attempt == self.max_retries:
+                        raise
+                finally:
+                    profiling.record("model_inference", time.perf_counter() - start)
+
+            await asyncio.sleep(self.retry_delay * 2 ** attempt)
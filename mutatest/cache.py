@@ -0,0 +1,356 @@
+import os
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+from multiprocessing.util import Finalize, register_after_fork
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+class LRUCache:
+    """
+    A bounded in-memory cache that evicts the least recently used entry once it holds more than
+    ``maxsize`` entries. It can be shared by threads.
+
+            Attributes
+                    maxsize (int): the maximum number of entries kept in memory
+
+                    hits (int): the number of lookups that were answered by the cache
+
+                    misses (int): the number of lookups that were not found in the cache
+    """
+
+    def __init__(self, maxsize: int = 100_000):
+        assert maxsize > 0, "The maximum size of a cache should be positive."
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Returns the value stored for ``key`` and marks it as recently used, or ``default`` if the
+        key is not cached.
+        """
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        """
+        Stores ``value`` under ``key``, evicting the least recently used entry if needed.
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteStore:
+    """
+    A persistent key-value store backed by a single SQLite table. Keys are strings, values are
+    pickled. Writes are buffered and committed in batches, so many processes can share one file
+    without paying a transaction per entry. Connections are opened lazily per process, which makes
+    instances safe to inherit by forked workers, and buffered writes are committed when the process
+    that made them exits (including worker processes). Within a process, threads share the
+    connection and the buffer, behind a lock. Unpickled stores are shared by all copies of a store
+    in a process.
+
+            Attributes
+                    path (str): the location of the SQLite database file
+
+                    table (str): the name of the table holding the entries
+
+                    flush_every (int): the number of buffered writes after which they are
+                    committed
+
+                    max_entries (Optional[int]): if given, the number of entries the table is
+                    bounded to. The entries written longest ago are evicted when writes are
+                    committed.
+    """
+
+    def __init__(self,
+                 path: str,
+                 table: str = "entries",
+                 flush_every: int = 256,
+                 max_entries: Optional[int] = None):
+        assert max_entries is None or max_entries > 0, "The maximum size should be positive."
+
+        self.path = path
+        self.table = table
+        self.flush_every = flush_every
+        self.max_entries = max_entries
+        self._pending: List[Tuple[str, bytes]] = []
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._finalizer: Optional[Finalize] = None
+        self._lock = threading.RLock()
+
+        # A lock held by another thread while forking would never be released in the child.
+        register_after_fork(self, SQLiteStore._reset_lock)
+
+    def _reset_lock(self):
+        self._lock = threading.RLock()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """
+        The connection of this process, which is opened on first use. Callers that use it from
+        several threads should hold the lock of the store.
+        """
+        with self._lock:
+            return self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None or self._pid != os.getpid():
+            # Never reuse a connection (or its pending writes) inherited from a parent process.
+            self._pending = []
+            # Threads share the connection, which is only used while holding the lock.
+            self._connection = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, value BLOB)")
+            self._connection.commit()
+            self._pid = os.getpid()
+
+            # Unlike atexit, this also runs when a multiprocessing worker exits. It runs when the
+            # store is garbage collected too, so it only holds the connection and the buffer.
+            self._finalizer = Finalize(self, _close_connection,
+                                       args=(self._connection, self.table, self._pending,
+                                             self.max_entries),
+                                       exitpriority=10)
+
+        return self._connection
+
+    def get(self, key: str) -> Any:
+        """
+        Returns the value stored for ``key``, or ``None`` if there is none.
+        """
+        with self._lock:
+            row = self._connect().execute(
+                f"SELECT value FROM {self.table} WHERE key = ?", (key,)).fetchone()
+
+        return None if row is None else pickle.loads(row[0])
+
+    def put(self, key: str, value: Any):
+        """
+        Buffers ``value`` to be written under ``key``.
+        """
+        value = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+        with self._lock:
+            connection = self._connect()
+            self._pending.append((key, value))
+
+            if len(self._pending) >= self.flush_every:
+                self._flush(connection)
+
+    def flush(self):
+        """
+        Commits all buffered writes.
+        """
+        with self._lock:
+            if self._pending:
+                self._flush(self._connect())
+
+    def _flush(self, connection: sqlite3.Connection):
+        _commit(connection, self.table, self._pending, self.max_entries)
+
+    def close(self):
+        with self._lock:
+            # Finalizers do nothing in processes other than the one that opened the connection.
+            if self._finalizer is not None:
+                self._finalizer()
+
+            self._connection = None
+            self._finalizer = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            self.flush()
+            return self._connect().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def __reduce__(self):
+        return _shared_store, (self.path, self.table, self.flush_every, self.max_entries)
+
+
+def _commit(connection: sqlite3.Connection,
+            table: str,
+            pending: List[Tuple[str, bytes]],
+            max_entries: Optional[int]):
+    """
+    Writes the buffered entries of a store, and empties the buffer in place, because the finalizer
+    of the store holds it too.
+    """
+    connection.executemany(
+        f"INSERT OR REPLACE INTO {table} (key, value) VALUES (?, ?)", pending)
+
+    if max_entries is not None:
+        # Replaced entries get a new rowid, so rowids order the entries by their last write.
+        connection.execute(
+            f"DELETE FROM {table} WHERE rowid <= (SELECT rowid FROM {table} "
+            f"ORDER BY rowid DESC LIMIT 1 OFFSET ?)", (max_entries,))
+
+    connection.commit()
+    pending.clear()
+
+
+def _close_connection(connection: sqlite3.Connection,
+                      table: str,
+                      pending: List[Tuple[str, bytes]],
+                      max_entries: Optional[int]):
+    if pending:
+        _commit(connection, table, pending, max_entries)
+
+    connection.close()
+
+
+_stores: Dict[Tuple[str, str], SQLiteStore] = dict()
+
+
+def _shared_store(path: str,
+                  table: str,
+                  flush_every: int,
+                  max_entries: Optional[int] = None) -> SQLiteStore:
+    """
+    Returns the store of this process for a table, e.g. so that worker processes, which receive a
+    copy of a store with every task, keep buffering their writes in one place.
+    """
+    store = _stores.get((path, table))
+    if store is None:
+        # Threads unpickling the same store at once keep whichever was stored first.
+        store = _stores.setdefault((path, table),
+                                   SQLiteStore(path, table, flush_every, max_entries))
+
+    return store
+
+
+class TieredCache:
+    """
+    A bounded in-memory ``LRUCache`` in front of an optional ``SQLiteStore``. Lookups that miss in
+    memory fall through to the store, and values found there are promoted into memory.
+
+            Attributes
+                    memory (LRUCache): the in-memory tier
+
+                    store (SQLiteStore | None): the persistent tier, if any
+
+                    store_hits (int): the number of memory misses that were answered by the store
+    """
+
+    def __init__(self, maxsize: int = 100_000, store: Optional[SQLiteStore] = None):
+        self.memory = LRUCache(maxsize)
+        self.store = store
+        self.store_hits = 0
+
+    def get(self, key: str) -> Any:
+        """
+        Returns the value stored for ``key`` in either tier, or ``None`` if there is none.
+        """
+        value = self.memory.get(key)
+
+        if value is None and self.store is not None:
+            value = self.store.get(key)
+            if value is not None:
+                self.store_hits += 1
+                self.memory.put(key, value)
+
+        return value
+
+    def put(self, key: str, value: Any):
+        """
+        Stores ``value`` under ``key`` in both tiers.
+        """
+        self.memory.put(key, value)
+
+        if self.store is not None:
+            self.store.put(key, value)
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        The fraction of lookups answered by either tier.
+        """
+        lookups = self.memory.hits + self.memory.misses
+        return 0.0 if lookups == 0 else (self.memory.hits + self.store_hits) / lookups
+
+    def clear(self):
+        self.memory.clear()
+        self.store_hits = 0
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Copies, e.g. in worker processes, share the store but start with an empty memory tier.
+        state = self.__dict__.copy()
+        state.update(memory=LRUCache(self.memory.maxsize), store_hits=0)
+        return state
+
+
+VARIANT_CACHE_PATH_ENV = "MUTATEST_VARIANT_CACHE"
+
+_variant_cache: Optional[TieredCache] = None
+
+
+def configure_variant_cache(maxsize: int = 100_000, path: Optional[str] = None) -> TieredCache:
+    """
+    Replaces the process-wide cache for WordNet variants used by ``Word``.
+
+            Parameters:
+                ``maxsize`` (``int``): the number of variant dictionaries kept in memory
+
+                ``path`` (``str``): optional location of a SQLite file in which variants are kept
+                between runs and shared between processes
+
+            Returns:
+                The new variant cache.
+    """
+    global _variant_cache
+
+    store = None if path is None else SQLiteStore(path, table="variants")
+    _variant_cache = TieredCache(maxsize, store)
+
+    return _variant_cache
+
+
+def get_variant_cache() -> TieredCache:
+    """
+    Returns the process-wide cache for WordNet variants. Unless ``configure_variant_cache`` was
+    called, it is created on first use, with a persistent store if the ``MUTATEST_VARIANT_CACHE``
+    environment variable points to a SQLite file.
+    """
+    if _variant_cache is None:
+        return configure_variant_cache(path=os.environ.get(VARIANT_CACHE_PATH_ENV))
+
+    return _variant_cache
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import pickle
+from typing import Any, Dict, Iterable, Optional
+
+
+def sentence_hash(sentence: str) -> str:
+    """
+    A stable hash of a sentence, which does not depend on the Python process.
+    """
+    return hashlib.sha256(sentence.encode("utf-8")).hexdigest()
+
+
+def case_seed(random_seed: int, sentence: str) -> int:
+    """
+    The random seed of the test case of a sentence in a run with ``random_seed``. It only depends
+    on the sentence, and not on the order, grouping or sharding of the test cases.
+    """
+    digest = hashlib.sha256(f"{random_seed}:{sentence_hash(sentence)}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") >> 1
+
+
+def shard_of(sentence: str, shard_count: int) -> int:
+    """
+    The shard, out of ``shard_count``, that the test case of a sentence belongs to.
+    """
+    return int(sentence_hash(sentence)[:16], 16) % shard_count
+
+
+def _describe(value: Any) -> str:
+    """
+    Describes a value that JSON cannot encode, e.g. a random generator or a callable held by a
+    custom mutator, by its ``repr``, or by its name if the ``repr`` is only a memory address.
+    """
+    description = repr(value)
+    if " at 0x" in description:
+        return getattr(value, "__qualname__", type(value).__qualname__)
+
+    return description
+
+
+def describe_config(mutator_config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The mutator configuration as plain JSON values, with the values that JSON cannot encode
+    described as strings (see ``case_key``).
+    """
+    return json.loads(json.dumps(mutator_config, default=_describe))
+
+
+def case_key(sentence: str, random_seed: int, mutator_config: Dict[str, Any]) -> str:
+    """
+    Identifies the result of mutating a sentence with a mutator configuration and random seed.
+    Values of the configuration that JSON cannot encode are described by their ``repr`` (or their
+    name), so mutators with such attributes should override ``Mutator.config`` if that does not
+    tell their parameters apart.
+    """
+    description = json.dumps([sentence_hash(sentence), random_seed, mutator_config],
+                             sort_keys=True, default=_describe)
+    return hashlib.sha256(description.encode("utf-8")).hexdigest()
+
+
+class CheckpointFile:
+    """
+    An append-only file of completed test case records. Records are pickled one after the other,
+    so that they can be written incrementally and model outputs of any type can be stored. A record
+    that was cut off because a run died while writing it is discarded when the file is opened.
+
+            Attributes
+                    path (str): the location of the checkpoint file
+
+                    records (Dict[str, Dict[str, Any]]): the records in the file, by their
+                    ``case_key``
+    """
+
+    def __init__(self, path: str, resume: bool = True):
+        """
+        Opens the checkpoint file at ``path``. Unless ``resume`` is True, existing records are
+        discarded.
+        """
+        self.path = path
+        self.records: Dict[str, Dict[str, Any]] = dict()
+
+        valid_size = 0
+        if resume and os.path.exists(path):
+            with open(path, "rb") as file:
+                while True:
+                    try:
+                        record = pickle.load(file)
+                    except (EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+                        break
+                    self.records[record["key"]] = record
+                    valid_size = file.tell()
+
+        with open(path, "ab") as file:
+            file.truncate(valid_size)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.records.get(key)
+
+    def append(self, records: Iterable[Dict[str, Any]]):
+        """
+        Appends records, each of which has a "key" entry, and makes sure they are on disk.
+        """
+        with open(self.path, "ab") as file:
+            for record in records:
+                pickle.dump(record, file, protocol=pickle.HIGHEST_PROTOCOL)
+                self.records[record["key"]] = record
+
+            file.flush()
+            os.fsync(file.fileno())
+
+    def __len__(self) -> int:
+        return len(self.records)
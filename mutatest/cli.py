@@ -0,0 +1,378 @@
+# The mutatest command line, which mutates corpora of any size without loading them into memory:
+#
+#     mutatest mutate sentences.txt --mutator replacement --num-variants 5 > variants.jsonl
+#     mutatest mutate example_sentences.json --mutator dropout --workers 4 -o variants.jsonl
+#
+# and merges the reports of the shards of a mutamorphic test (see ``mutatest.sharding``):
+#
+#     mutatest merge shard-*.jsonl -o report.json
+import argparse
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from functools import partial
+from typing import (IO, Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, TextIO,
+                    Tuple, Union)
+
+import numpy as np
+
+from .mutators import DropoutMutator, Mutator, ReplacementMutator
+from .sharding import merge_shard_reports
+from .test_runner import _create_executor
+
+INPUT_FORMATS = ["auto", "text", "jsonl", "json"]
+
+# Creates a mutator from the parsed command line options.
+MUTATORS: Dict[str, Callable[[argparse.Namespace], Mutator]] = {
+    "replacement": lambda options: ReplacementMutator(options.num_replacements,
+                                                      options.num_variants,
+                                                      options.selection_strategy),
+    "dropout": lambda options: DropoutMutator(options.num_dropouts, options.num_variants),
+}
+
+
+def read_sentences(file: TextIO,
+                   input_format: str = "auto",
+                   field: str = "sentence",
+                   buffer_size: int = 1 << 16) -> Iterator[str]:
+    """
+    Reads sentences from a file one at a time, so that memory use does not depend on its size.
+
+            Parameters:
+                ``file`` (``TextIO``): e.g. an open file or ``sys.stdin``
+
+                ``input_format`` (``str``): "text" (a sentence per line), "jsonl" (a JSON value per
+                line), "json" (a JSON array), or "auto" to tell these apart by the start of the
+                file: a JSON array starts with "[", and JSON lines with a line that is a JSON
+                string or object
+
+                ``field`` (``str``): the field that holds the sentence, when sentences are JSON
+                objects instead of strings
+
+                ``buffer_size`` (``int``): the number of characters read at a time from JSON arrays
+
+            Returns:
+                An iterator over the sentences, in order. Empty lines are skipped.
+    """
+    assert input_format in INPUT_FORMATS, f"Unknown input format: {input_format}."
+
+    # Detecting the format consumes the start of the file, which is parsed as if it were not read.
+    # JSON arrays are told apart by their first character, and JSON lines by their first line.
+    start = ""
+    if input_format == "auto":
+        while True:
+            stripped = start.lstrip()
+            if stripped.startswith("[") or "\n" in stripped:
+                break
+            chunk = file.read(buffer_size)
+            if chunk == "":
+                break
+            start += chunk
+
+        if start.strip() == "":
+            return
+
+        input_format = _detect_format(start.lstrip().split("\n", 1)[0])
+
+    if input_format == "json":
+        values = _read_json_array(file, start, buffer_size)
+    else:
+        lines = _read_lines(file, start)
+        if input_format == "text":
+            yield from (line.strip() for line in lines if line.strip() != "")
+            return
+        values = (json.loads(line) for line in lines if line.strip() != "")
+
+    for value in values:
+        yield _get_sentence(value, field)
+
+
+def _detect_format(first_line: str) -> str:
+    """
+    The format of a file that starts with the given line, which is not blank. Text that merely
+    starts with a quote, e.g. a quoted title, is not taken for a JSON line.
+    """
+    if first_line.startswith("["):
+        return "json"
+
+    try:
+        value = json.loads(first_line)
+    except ValueError:
+        return "text"
+
+    return "jsonl" if isinstance(value, (str, dict)) else "text"
+
+
+def _read_lines(file: TextIO, start: str) -> Iterator[str]:
+    lines = start.splitlines(keepends=True)
+
+    # The last line read may be incomplete.
+    if len(lines) > 0 and not lines[-1].endswith("\n"):
+        lines[-1] += file.readline()
+
+    yield from lines
+    yield from file
+
+
+def _read_json_array(file: TextIO, buffer: str, buffer_size: int) -> Iterator[Any]:
+    """
+    Parses the values of a JSON array as they are read, with ``JSONDecoder.raw_decode``.
+    """
+    decoder = json.JSONDecoder()
+    position = 0
+    end_of_file = False
+    opened = False
+
+    while True:
+        # Skips whitespace and separators until the next value is in the buffer.
+        while position < len(buffer) and (buffer[position].isspace() or
+                                          (opened and buffer[position] == ",")):
+            position += 1
+
+        if position < len(buffer):
+            if not opened:
+                assert buffer[position] == "[", "The input should be a JSON array."
+                opened = True
+                position += 1
+                continue
+
+            if buffer[position] == "]":
+                return
+
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The value may continue after the buffer.
+                if end_of_file:
+                    raise
+            else:
+                # Numbers may also continue after the buffer.
+                if end < len(buffer) or end_of_file:
+                    yield value
+                    position = end
+                    continue
+
+        assert not end_of_file, "The JSON array is not closed."
+
+        chunk = file.read(buffer_size)
+        end_of_file = chunk == ""
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def _get_sentence(value: Union[str, Dict[str, Any]], field: str) -> str:
+    if isinstance(value, dict):
+        assert field in value, f"Records should have a \"{field}\" field."
+        value = value[field]
+
+    assert isinstance(value, str), "Sentences should be strings."
+
+    return value
+
+
+def mutate_stream(mutator: Mutator,
+                  sentences: Iterable[str],
+                  random_seed: int,
+                  assure_variants: bool = False,
+                  chunk_size: int = 256,
+                  workers: int = 1,
+                  max_pending_chunks: Optional[int] = None) -> Iterator[Tuple[str, List[str]]]:
+    """
+    Mutates a stream of sentences in chunks of ``chunk_size`` sentences, which ``workers``
+    processes mutate in parallel.
+
+            Parameters:
+                ``max_pending_chunks`` (``int``): the number of chunks read ahead of the chunk
+                that is yielded next, two per worker by default, which bounds memory use
+
+            Returns:
+                An iterator over each sentence and its variants, in input order.
+    """
+    assert chunk_size > 0, "The chunk size should be positive."
+
+    if max_pending_chunks is None:
+        max_pending_chunks = 2 * workers
+    assert max_pending_chunks > 0, "The number of pending chunks should be positive."
+
+    chunks = _chunks(sentences, chunk_size)
+    mutate_many = partial(mutator.mutate_many, random_seed=random_seed)
+    if assure_variants:
+        # Only the built-in mutators take this argument.
+        mutate_many = partial(mutate_many, assure_variants=True)
+
+    with _create_executor(workers, "process", mutator) as executor:
+        if executor is None:
+            for chunk in chunks:
+                yield from zip(chunk, mutate_many(chunk))
+            return
+
+        pending: Deque[Tuple[List[str], Future]] = deque()
+        for chunk in chunks:
+            pending.append((chunk, executor.submit(mutate_many, chunk)))
+
+            # Chunks complete out of order, but are yielded in order.
+            if len(pending) >= max_pending_chunks:
+                chunk, future = pending.popleft()
+                yield from zip(chunk, future.result())
+
+        while len(pending) > 0:
+            chunk, future = pending.popleft()
+            yield from zip(chunk, future.result())
+
+
+def _chunks(sentences: Iterable[str], chunk_size: int) -> Iterator[List[str]]:
+    chunk = []
+    for sentence in sentences:
+        chunk.append(sentence)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+
+    if len(chunk) > 0:
+        yield chunk
+
+
+class ProgressReport:
+    """
+    Reports the number of sentences and variants written, and the throughput, at most every
+    ``interval`` seconds.
+    """
+
+    def __init__(self, file: Optional[TextIO] = sys.stderr, interval: float = 5.0):
+        self.file = file
+        self.interval = interval
+        self.sentences = 0
+        self.variants = 0
+        self._start = time.perf_counter()
+        self._last_report = self._start
+
+    def update(self, num_variants: int):
+        self.sentences += 1
+        self.variants += num_variants
+
+        now = time.perf_counter()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            self.report()
+
+    def report(self, prefix: str = ""):
+        if self.file is None:
+            return
+
+        elapsed = time.perf_counter() - self._start
+        rate = self.sentences / elapsed if elapsed > 0 else 0.0
+        print(f"{prefix}{self.sentences} sentences, {self.variants} variants, "
+              f"{elapsed:.1f}s ({rate:.1f} sentences/s)", file=self.file, flush=True)
+
+
+@contextmanager
+def _open(path: str, mode: str) -> Iterator[IO]:
+    """
+    Opens a file, or stdin or stdout for "-".
+    """
+    if path == "-":
+        yield sys.stdin if "r" in mode else sys.stdout
+        return
+
+    with open(path, mode, encoding="utf-8") as file:
+        yield file
+
+
+def _mutate(options: argparse.Namespace) -> int:
+    mutator = MUTATORS[options.mutator](options)
+    if options.cache is not None:
+        mutator.enable_cache(path=options.cache)
+
+    random_seed = int(time.time()) if options.seed is None else options.seed
+    progress = ProgressReport(None if options.quiet else sys.stderr, options.progress_interval)
+
+    with _open(options.input, "r") as input_file, _open(options.output, "w") as output_file:
+        sentences = read_sentences(input_file, options.format, options.field)
+        results = mutate_stream(mutator, sentences, random_seed, options.assure_variants,
+                                options.chunk_size, options.workers)
+
+        for index, (sentence, variants) in enumerate(results):
+            output_file.write(json.dumps({"index": index, "sentence": sentence,
+                                          "variants": variants}) + "\n")
+            progress.update(len(variants))
+
+        output_file.flush()
+
+    progress.report(prefix=f"Done (random seed {random_seed}): ")
+
+    return 0
+
+
+def _merge(options: argparse.Namespace) -> int:
+    assert options.bins > 0, "The number of bins should be positive."
+
+    report = merge_shard_reports(options.reports, np.linspace(0, 1, options.bins + 1))
+
+    with _open(options.output, "w") as output_file:
+        json.dump(report, output_file, indent=2)
+        output_file.write("\n")
+
+    return 0
+
+
+def _create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="mutatest",
+                                     description="Mutamorphic testing for text-based models.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    mutate = commands.add_parser("mutate",
+                                 help="write the variants of sentences as JSON lines",
+                                 description="Mutates sentences from a file (or stdin), and "
+                                             "writes each sentence and its variants as a JSON "
+                                             "line, in input order.")
+    mutate.add_argument("input", nargs="?", default="-",
+                        help="the sentences, as text, JSON lines or a JSON array (default: stdin)")
+    mutate.add_argument("-o", "--output", default="-", help="where to write (default: stdout)")
+    mutate.add_argument("--format", choices=INPUT_FORMATS, default="auto",
+                        help="the input format (default: detected)")
+    mutate.add_argument("--field", default="sentence",
+                        help="the field of JSON objects that holds the sentence")
+    mutate.add_argument("--mutator", choices=list(MUTATORS), default="replacement")
+    mutate.add_argument("--num-variants", type=int, default=5)
+    mutate.add_argument("--num-replacements", type=int, default=1)
+    mutate.add_argument("--selection-strategy", choices=["random", "most_common_first"],
+                        default="random")
+    mutate.add_argument("--num-dropouts", type=int, default=1)
+    mutate.add_argument("--assure-variants", action="store_true",
+                        help="output no variants for sentences with fewer variants than "
+                             "requested")
+    mutate.add_argument("--seed", type=int, help="the random seed (default: the current time)")
+    mutate.add_argument("--workers", type=int, default=1)
+    mutate.add_argument("--chunk-size", type=int, default=256,
+                        help="the number of sentences sent to a worker at a time")
+    mutate.add_argument("--cache", help="a SQLite file in which to cache variants between runs")
+    mutate.add_argument("--progress-interval", type=float, default=5.0,
+                        help="the seconds between progress reports on stderr")
+    mutate.add_argument("-q", "--quiet", action="store_true", help="do not report progress")
+    mutate.set_defaults(run=_mutate)
+
+    merge = commands.add_parser("merge",
+                                help="merge the shard reports of a mutamorphic test",
+                                description="Merges the reports written by "
+                                            "mutatest.sharding.write_shard_report for every shard "
+                                            "of a run into the aggregates of the whole run.")
+    merge.add_argument("reports", nargs="+", help="the report of every shard")
+    merge.add_argument("-o", "--output", default="-", help="where to write (default: stdout)")
+    merge.add_argument("--bins", type=int, default=10,
+                       help="the number of equal histogram bins between 0 and 1")
+    merge.set_defaults(run=_merge)
+
+    return parser
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    options = _create_parser().parse_args(args)
+
+    return options.run(options)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,9 @@
-from typing import Tuple, List, Callable
-from .Word import sentence_preprocessing
+from typing import List
+from . import profiling
+from .sampling import count_table, sample_distinct, unrank
+from .Word import Word, sentence_preprocessing
 
 import random as random_pkg
-from random import Random
-from itertools import combinations
 
 
 def mutate_by_dropout(input_sentence: str,
@@ -20,34 +20,80 @@ def mutate_by_dropout(input_sentence: str,
                 ``num_dropouts`` (``int``): the number of words that should be dropped out per
                 output sentence
 
-                ``random_seed`` (``int``):
+                ``random_seed`` (``int``): the seed used to choose the dropped words, when there are
+                more ways to choose them than ``num_variants``
+
+                ``num_variants`` (``int``): the number of output sentences
+
+                ``assure_variants`` (``bool``): if True, nothing is returned when fewer than
+                ``num_variants`` output sentences exist
 
             Returns:
                 A list mutated sentences.
     """
+    words = sentence_preprocessing(input_sentence)
+
+    return mutate_words_by_dropout(words,
+                                   num_dropouts=num_dropouts,
+                                   random_seed=random_seed,
+                                   num_variants=num_variants,
+                                   assure_variants=assure_variants)
+
+
+def mutate_words_by_dropout(words: List[Word],
+                            num_dropouts: int = 1,
+                            random_seed: int = 13,
+                            num_variants: int = 100,
+                            assure_variants: bool = False) -> List[str]:
+    """
+    Same as ``mutate_by_dropout``, but for a sentence that was already preprocessed into words
+    (see ``sentence_preprocessing`` and ``sentence_preprocessing_batch``).
+
+    The words that are dropped are chosen by position, among the positions of the words that are
+    not stopwords. If there are at most ``num_variants`` ways to choose them, all of them are
+    returned. Otherwise ``num_variants`` of them are sampled uniformly, without replacement, using
+    ``random_seed``. Ways that give the same output sentence as an earlier one (e.g. dropping either
+    word of "very very") are skipped. Either way, output sentences are in the lexicographic order
+    of the positions that were dropped.
+    """
     # Set thread safe seed for reproducibility
     rng = random_pkg.Random()
     rng.seed(a=random_seed)
 
-    words = sentence_preprocessing(input_sentence)
+    tokens = [word.value for word in words]
+    positions = [index for index, word in enumerate(words) if not word.is_stopword]
 
-    sentence = [word.value for word in words]
+    if num_dropouts > len(positions) or num_dropouts < 0:
+        return list()
 
-    non_stopword_list = {word.value for word in words if not word.is_stopword}
-    mutated_sentences = []
-    for subset in combinations(non_stopword_list, num_dropouts):
-        sentence = [word.value for word in words]
-        for remove_word in subset:
-            sentence.remove(remove_word)
-        mutated_sentences.append(" ".join(sentence))
-        if len(mutated_sentences) == num_variants:
-            break
+    radices = [1] * len(positions)
+    binomials = count_table(radices, num_dropouts)
+    total = binomials[0][num_dropouts]
 
     # This is mostly used for testing, to assure the number of variants
-    if len(mutated_sentences) < num_variants and assure_variants:
+    if total < num_variants and assure_variants:
+        return list()
+
+    def render(rank: int) -> str:
+        dropped = [positions[x] for x, _ in unrank(rank, radices, num_dropouts, binomials)]
+
+        # Keep the tokens in between the dropped ones.
+        kept = []
+        start = 0
+        for position in dropped:
+            kept.extend(tokens[start:position])
+            start = position + 1
+        kept.extend(tokens[start:])
+
+        return " ".join(kept)
+
+    with profiling.stage("mutation_selection"):
+        sampled = sample_distinct(total, num_variants, rng, render)
+
+    if len(sampled) < num_variants and assure_variants:
         return list()
 
-    return mutated_sentences
+    return [sentence for _, sentence in sorted(sampled)]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,91 @@
+import math
+from typing import Optional, Sequence, Tuple
+
+# Why the evaluation of the variants of a test case stopped.
+CONVERGED = "converged"
+FAILED = "failed"
+BUDGET = "budget"
+EXHAUSTED = "exhausted"
+
+
+class EarlyStopping:
+    """
+    When ``MutamorphicTest.run`` stops evaluating the variants of a test case. Variants are
+    evaluated in rounds, a few per test case at a time, and the evaluation of a test case stops
+    once the mean of its similarities is known precisely enough (it "converged"), once one of its
+    similarities is below the failure threshold (it "failed"), once the model-call budget of the
+    run is spent ("budget"), or once all of its variants were evaluated ("exhausted").
+
+            Attributes
+                    tolerance (float): the evaluation of a test case converged once the confidence
+                    interval on the mean of its similarities is at most ``2 * tolerance`` wide
+
+                    z_score (float): the width of the confidence interval in standard errors, 1.96
+                    for 95% confidence (with the normal approximation)
+
+                    min_variants (int): the number of variants of a test case evaluated before it
+                    can converge, and in the first round
+
+                    step (int): the number of variants of a test case evaluated per round after
+                    the first
+
+                    failure_threshold (Optional[float]): if given, the evaluation of a test case
+                    stops as soon as one of its similarities is below it
+
+                    max_model_calls (Optional[int]): if given, the number of model calls (for input
+                    sentences and variants) of the whole run. It must cover the first round, in
+                    which every test case is evaluated, and what is left is split evenly over the
+                    test cases that are still evaluated, round by round.
+    """
+
+    def __init__(self,
+                 tolerance: float = 0.05,
+                 z_score: float = 1.96,
+                 min_variants: int = 3,
+                 step: int = 1,
+                 failure_threshold: Optional[float] = None,
+                 max_model_calls: Optional[int] = None):
+        assert tolerance >= 0 and z_score > 0, "The tolerance and z-score should be positive."
+        assert min_variants > 1, "At least two variants are needed to estimate a spread."
+        assert step > 0, "The step should be positive."
+        assert max_model_calls is None or max_model_calls >= 0, "The budget should not be negative."
+
+        self.tolerance = tolerance
+        self.z_score = z_score
+        self.min_variants = min_variants
+        self.step = step
+        self.failure_threshold = failure_threshold
+        self.max_model_calls = max_model_calls
+
+    def confidence_interval(self, similarities: Sequence[float]) -> Tuple[float, float]:
+        """
+        The confidence interval on the mean of the similarities, which should be at least two.
+        """
+        n = len(similarities)
+        mean = math.fsum(similarities) / n
+        variance = math.fsum((x - mean) ** 2 for x in similarities) / (n - 1)
+        half_width = self.z_score * math.sqrt(variance / n)
+
+        return mean - half_width, mean + half_width
+
+    def stop_reason(self, similarities: Sequence[float]) -> Optional[str]:
+        """
+        Why the evaluation of a test case with the given similarities so far should stop, or None
+        if it should go on.
+        """
+        if self.failure_threshold is not None and len(similarities) > 0 and \
+                min(similarities) < self.failure_threshold:
+            return FAILED
+
+        if len(similarities) >= self.min_variants:
+            low, high = self.confidence_interval(similarities)
+            if high - low <= 2 * self.tolerance:
+                return CONVERGED
+
+        return None
+
+    def __repr__(self):
+        return f"EarlyStopping(tolerance: {self.tolerance}, z: {self.z_score}, " \
+               f"min_variants: {self.min_variants}, step: {self.step}, " \
+               f"failure_threshold: {self.failure_threshold}, " \
+               f"max_model_calls: {self.max_model_calls})"
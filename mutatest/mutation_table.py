@@ -0,0 +1,123 @@
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+
+import numpy as np
+
+
+class MutationTable:
+    """
+    The variants of a sentence, stored as columns instead of strings: the tokens of the sentence
+    are stored once, and each variant as the positions it changes and the replacements it puts
+    there. Like compressed sparse rows, the mutations of all variants are concatenated, and
+    ``offsets`` delimits the mutations of each variant. Variants are rendered to strings on demand,
+    by indexing or iterating the table.
+
+            Attributes
+                    tokens (List[str]): the tokens of the input sentence
+
+                    vocabulary (List[str]): the distinct replacements used by the variants
+
+                    offsets (np.ndarray): the mutations of variant ``i`` are
+                    ``offsets[i]:offsets[i + 1]`` of the arrays below
+
+                    positions (np.ndarray): for each mutation, the position of the token it
+                    replaces, in increasing order within a variant
+
+                    replacement_ids (np.ndarray): for each mutation, the index of its replacement
+                    in ``vocabulary``
+    """
+
+    def __init__(self,
+                 tokens: List[str],
+                 vocabulary: List[str],
+                 offsets: np.ndarray,
+                 positions: np.ndarray,
+                 replacement_ids: np.ndarray):
+        assert len(offsets) > 0 and offsets[-1] == len(positions) == len(replacement_ids), \
+            "The offsets should delimit the positions and replacement ids."
+
+        self.tokens = tokens
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.positions = positions
+        self.replacement_ids = replacement_ids
+
+    @staticmethod
+    def from_mutations(tokens: List[str],
+                       mutations_list: Iterable[Iterable[Tuple[int, str]]]) -> "MutationTable":
+        """
+        Creates a table from, for each variant, its mutations as (position, replacement) tuples.
+        """
+        ids: Dict[str, int] = dict()
+        offsets = [0]
+        positions: List[int] = []
+        replacement_ids: List[int] = []
+
+        for mutations in mutations_list:
+            for position, replacement in sorted(mutations):
+                positions.append(position)
+                replacement_ids.append(ids.setdefault(replacement, len(ids)))
+            offsets.append(len(positions))
+
+        return MutationTable(tokens,
+                             list(ids),
+                             np.array(offsets, dtype=np.int64),
+                             np.array(positions, dtype=np.int32),
+                             np.array(replacement_ids, dtype=np.int32))
+
+    @property
+    def variant_ids(self) -> np.ndarray:
+        """
+        For each mutation, the index of the variant it belongs to.
+        """
+        return np.repeat(np.arange(len(self)), np.diff(self.offsets))
+
+    def mutations(self, index: int) -> List[Tuple[int, str]]:
+        """
+        The mutations of a variant, as (position, replacement) tuples.
+        """
+        start, end = self.offsets[index], self.offsets[index + 1]
+
+        return [(int(position), self.vocabulary[replacement_id]) for position, replacement_id
+                in zip(self.positions[start:end], self.replacement_ids[start:end])]
+
+    def render(self, index: int) -> str:
+        """
+        The variant at ``index`` as a string.
+        """
+        return render_mutations(self.tokens, self.mutations(index))
+
+    def to_list(self) -> List[str]:
+        return [self.render(index) for index in range(len(self))]
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, List[str]]:
+        indices = range(len(self))[index]
+        if isinstance(indices, range):
+            return [self.render(x) for x in indices]
+
+        return self.render(indices)
+
+    def __iter__(self) -> Iterator[str]:
+        return (self.render(index) for index in range(len(self)))
+
+    def __repr__(self):
+        return f"MutationTable(variants: {len(self)}, tokens: {len(self.tokens)}, " \
+               f"vocabulary: {len(self.vocabulary)})"
+
+
+def render_mutations(tokens: List[str], mutations: Iterable[Tuple[int, str]]) -> str:
+    """
+    The sentence of ``tokens`` with the given (position, replacement) mutations applied, as a
+    string. Mutations must be in increasing order of position.
+    """
+    sentence: List[str] = []
+    start = 0
+    for position, replacement in mutations:
+        sentence.extend(tokens[start:position])
+        sentence.append(replacement)
+        start = position + 1
+    sentence.extend(tokens[start:])
+
+    return " ".join(sentence)
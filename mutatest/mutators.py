@@ -1,30 +1,16 @@
 from abc import ABC, abstractmethod
-from typing import List
-from .dropout_mutator import mutate_by_dropout
-from .replacement_mutator import mutate_by_replacement
-from nltk.tokenize import word_tokenize
-from .Word import Word
-import re
-import nltk
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+from .dropout_mutator import mutate_words_by_dropout
+from .mutation_table import MutationTable
+from .replacement_mutator import count_mutations, mutate_words_by_replacement
+from .Word import PreprocessedSentence, Word, preprocess_sentences, sentence_preprocessing
+# Tests import text_prepare from here.
+from .normalization import text_prepare  # noqa: F401
+from . import profiling
+from .cache import SQLiteStore, TieredCache
+from .checkpoint import case_key
+from .variant_sources import get_variant_source
 from time import time
-from nltk.corpus import stopwords
-nltk.download('stopwords')
-
-
-def text_prepare(text):
-    """
-        text: a string
-        return: modified initial string
-    """
-    REPLACE_BY_SPACE_RE = re.compile('[/(){}\[\]\|@,;]')
-    BAD_SYMBOLS_RE = re.compile('[^0-9a-z #+_]')
-    STOPWORDS = set(stopwords.words('english'))
-
-    text = text.lower()  # lowercase text
-    text = re.sub(REPLACE_BY_SPACE_RE, " ", text)  # replace REPLACE_BY_SPACE_RE symbols by space in text
-    text = re.sub(BAD_SYMBOLS_RE, "", text)  # delete symbols which are in BAD_SYMBOLS_RE from text
-    text = " ".join([word for word in text.split() if not word in STOPWORDS])  # delete stopwords from text
-    return text
 
 
 class Mutator(ABC):
@@ -32,17 +18,184 @@ class Mutator(ABC):
     TODO comment
     """
 
+    # Whether ``mutate`` also accepts a ``PreprocessedSentence``, so that test cases can preprocess
+    # their sentence once and share it between mutators.
+    accepts_preprocessed: bool = False
+
+    # Results of earlier calls, see ``enable_cache``.
+    _result_cache: Optional[TieredCache] = None
+
     @abstractmethod
-    def mutate(self, input_sentence: str, random_seed: int) -> List[str]:
+    def mutate(self, input_sentence: Union[str, PreprocessedSentence], random_seed: int) -> List[str]:
         """
         TODO comment
         """
         raise NotImplementedError()
 
+    def mutate_many(self, input_sentences: Iterable[str], random_seed: int) -> List[List[str]]:
+        """
+        Mutates each of the given sentences with the same random seed. Returns one list of mutated
+        sentences per input sentence, in order. Mutators that can preprocess sentences in bulk
+        override this.
+        """
+        return [self.mutate(x, random_seed=random_seed) for x in input_sentences]
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        """
+        The class and parameters of this mutator, which determine (together with the random seed)
+        the variants of a sentence. By default, all public attributes except counters are used.
+        Attributes that JSON cannot encode are described by their ``repr`` in checkpoint keys and
+        shard reports (see ``checkpoint.case_key``), so mutators with such attributes, e.g. a
+        tokenizer, should override this if that description does not tell them apart.
+        """
+        parameters = {key: value for key, value in vars(self).items()
+                      if not key.startswith("_") and key != "non_mutated"}
+
+        return {"class": type(self).__name__, **parameters}
+
+    def enable_cache(self,
+                     maxsize: int = 10_000,
+                     path: Optional[str] = None,
+                     cache: Optional[TieredCache] = None):
+        """
+        Remembers the variants of the sentences this mutator mutated, so that mutating a sentence
+        again (with the same random seed) only costs a lookup. Results are identified by a hash of
+        the sentence (with whitespace normalized), the mutator configuration (see ``config``), the
+        variant source and the random seed. Only the built-in mutators use the cache.
+
+                Parameters:
+                    ``maxsize`` (``int``): the number of results kept in memory, of which the least
+                    recently used are evicted first
+
+                    ``path`` (``str``): optional location of a SQLite file in which results are
+                    kept between runs and shared between processes
+
+                    ``cache`` (``TieredCache``): a cache to use instead of creating one, e.g. to
+                    share one between mutators
+        """
+        if cache is None:
+            store = None if path is None else SQLiteStore(path, table="mutations")
+            cache = TieredCache(maxsize, store)
+
+        self._result_cache = cache
+
+    def disable_cache(self):
+        self._result_cache = None
+
+    def cached_variants(self,
+                        input_sentence: Union[str, PreprocessedSentence],
+                        random_seed: int,
+                        assure_variants: bool = False) -> Optional[List[str]]:
+        """
+        Returns the variants of a sentence (with the given random seed) if they are in the result
+        cache, and counts them like ``mutate`` does, or None otherwise. Sentences whose variants
+        are cached then do not need to be preprocessed.
+        """
+        cache = self._result_cache
+        if cache is None:
+            return None
+
+        variants = cache.get(self._result_key(input_sentence, random_seed, assure_variants,
+                                              self.config))
+        if variants is None:
+            return None
+
+        profiling.count("mutation_cache_hits")
+        self._count_variants(len(variants))
+
+        # A copy, so that callers cannot change the cached list.
+        return list(variants)
+
+    def _count_variants(self, num_variants: int):
+        """
+        Counts a sentence that was mutated into ``num_variants`` variants, on the mutator (if it
+        counts the sentences without variants, see ``MutamorphicTest``) and in the active run stats
+        (see ``mutatest.profiling``).
+        """
+        if num_variants == 0:
+            if hasattr(self, "non_mutated"):
+                self.non_mutated += 1
+            profiling.count("non_mutated")
+
+        profiling.count("variants_requested", getattr(self, "num_variants", num_variants))
+        profiling.count("variants_produced", num_variants)
+
+    def _result_key(self,
+                    input_sentence: Union[str, PreprocessedSentence],
+                    random_seed: int,
+                    assure_variants: bool,
+                    config: Dict[str, Any]) -> str:
+        if isinstance(input_sentence, PreprocessedSentence):
+            variant_source = input_sentence.variant_source
+            input_sentence = input_sentence.sentence
+        else:
+            variant_source = get_variant_source().name
+
+        # The variants come from the source the sentence was preprocessed with, which need not be
+        # the default source in the configuration (or be registered in this process).
+        source_config = config.get("variant_source")
+        if source_config is None or source_config["name"] != variant_source:
+            source_config = {"name": variant_source}
+
+        # Tokenization ignores differences in whitespace, but not in case.
+        return case_key(" ".join(input_sentence.split()), random_seed,
+                        {**config, "assure_variants": assure_variants,
+                         "variant_source": source_config})
+
+    def _memoize(self,
+                 input_sentence: Union[str, PreprocessedSentence],
+                 random_seed: int,
+                 assure_variants: bool,
+                 compute: Callable[[], List[str]]) -> List[str]:
+        """
+        Returns the cached variants of a sentence, or computes and caches them.
+        """
+        return self._memoize_many([input_sentence], random_seed, assure_variants,
+                                  lambda sentences: [compute()])[0]
+
+    def _memoize_many(self,
+                      input_sentences: List[Union[str, PreprocessedSentence]],
+                      random_seed: int,
+                      assure_variants: bool,
+                      compute: Callable[[List[Union[str, PreprocessedSentence]]], List[List[str]]]) \
+            -> List[List[str]]:
+        """
+        Returns the variants of the given sentences, of which only those that are not cached are
+        computed, in one call of ``compute``.
+        """
+        cache = self._result_cache
+        if cache is None:
+            return compute(input_sentences)
+
+        config = self.config
+        keys = [self._result_key(x, random_seed, assure_variants, config) for x in input_sentences]
+        results: List[Optional[List[str]]] = [cache.get(key) for key in keys]
+
+        # Duplicate sentences in the batch are computed once.
+        misses: Dict[str, int] = dict()
+        for index, variants in enumerate(results):
+            if variants is None:
+                misses.setdefault(keys[index], index)
+        profiling.count("mutation_cache_hits", len(results) - len(misses))
+        profiling.count("mutation_cache_misses", len(misses))
+
+        if len(misses) > 0:
+            computed = dict(zip(misses, compute([input_sentences[x] for x in misses.values()])))
+            for key, variants in computed.items():
+                cache.put(key, variants)
+
+            results = [computed[key] if variants is None else variants
+                       for key, variants in zip(keys, results)]
+
+        # Copies, so that callers cannot change the cached lists.
+        return [list(variants) for variants in results]
+
 # Both checks that I putted are kind of crap
 
 
 class ReplacementMutator(Mutator):
+    accepts_preprocessed = True
 
     def __init__(self,
                  num_replacements: int = 1,
@@ -56,24 +209,96 @@ class ReplacementMutator(Mutator):
         self.selection_strategy = selection_strategy
         self.non_mutated = 0
 
-    def mutate(self, input_sentence: str, random_seed: int = int(time()), assure_variants: bool = False) -> List[str]:
+    @property
+    def config(self) -> Dict[str, Any]:
+        # The variants of words depend on the default variant source and its parameters.
+        return {"class": type(self).__name__,
+                "num_replacements": self.num_replacements,
+                "num_variants": self.num_variants,
+                "selection_strategy": self.selection_strategy,
+                "variant_source": get_variant_source().config}
+
+    def mutate(self,
+               input_sentence: Union[str, PreprocessedSentence],
+               random_seed: Optional[int] = None,
+               assure_variants: bool = False) -> List[str]:
         """
-        TODO comment
+        Returns up to ``num_variants`` distinct variants of the sentence (see
+        ``replacement_mutator.mutate_by_replacement``). With ``assure_variants``, nothing is
+        returned if fewer can be made, and ``count_mutations`` tells how many can.
         """
-        results = mutate_by_replacement(input_sentence,
-                                        num_replacements=self.num_replacements,
-                                        num_variants=self.num_variants,
-                                        selection_strategy=self.selection_strategy,
-                                        random_seed=random_seed,
-                                        assure_variants=assure_variants)
+        random_seed = _resolve_seed(random_seed)
+        results = self._memoize(input_sentence, random_seed, assure_variants,
+                                lambda: mutate_words_by_replacement(
+                                    _get_words(input_sentence),
+                                    num_replacements=self.num_replacements,
+                                    num_variants=self.num_variants,
+                                    selection_strategy=self.selection_strategy,
+                                    random_seed=random_seed,
+                                    assure_variants=assure_variants))
 
-        if len(results) == 0:
-            self.non_mutated += 1
+        self._count_variants(len(results))
+
+        return results
+
+    def count_mutations(self, input_sentence: Union[str, PreprocessedSentence]) -> int:
+        """
+        The number of ways to replace ``num_replacements`` words of the sentence by one of their
+        variants, which is the number of variants the "random" selection strategy can make, unless
+        some of them happen to render to the same sentence. If this is less than ``num_variants``,
+        ``mutate`` with ``assure_variants`` returns nothing.
+        """
+        non_trivial_words = [x for x in _get_words(input_sentence) if x.is_nontrivial]
+
+        return count_mutations(non_trivial_words, self.num_replacements)
+
+    def mutate_table(self,
+                     input_sentence: Union[str, PreprocessedSentence],
+                     random_seed: Optional[int] = None,
+                     assure_variants: bool = False) -> MutationTable:
+        """
+        Same as ``mutate``, but returns the mutated sentences as a ``MutationTable``.
+        """
+        random_seed = _resolve_seed(random_seed)
+        table = mutate_words_by_replacement(_get_words(input_sentence),
+                                            num_replacements=self.num_replacements,
+                                            num_variants=self.num_variants,
+                                            selection_strategy=self.selection_strategy,
+                                            random_seed=random_seed,
+                                            assure_variants=assure_variants,
+                                            as_table=True)
+
+        self._count_variants(len(table))
+
+        return table
+
+    def mutate_many(self,
+                    input_sentences: Iterable[Union[str, PreprocessedSentence]],
+                    random_seed: Optional[int] = None,
+                    assure_variants: bool = False) -> List[List[str]]:
+        """
+        Same as ``mutate``, but for many sentences, which are tokenized and tagged in one batch.
+        """
+        random_seed = _resolve_seed(random_seed)
+
+        def compute(sentences):
+            return [mutate_words_by_replacement(x.words,
+                                                num_replacements=self.num_replacements,
+                                                num_variants=self.num_variants,
+                                                selection_strategy=self.selection_strategy,
+                                                random_seed=random_seed,
+                                                assure_variants=assure_variants)
+                    for x in preprocess_sentences(sentences)]
+
+        results = self._memoize_many(list(input_sentences), random_seed, assure_variants, compute)
+        for variants in results:
+            self._count_variants(len(variants))
 
         return results
 
 
 class DropoutMutator(Mutator):
+    accepts_preprocessed = True
 
     def __init__(self,
                  num_dropouts: int = 1, num_variants: int = 1):
@@ -84,15 +309,66 @@ class DropoutMutator(Mutator):
         self.num_variants = num_variants
         self.non_mutated = 0
 
-    def mutate(self, input_sentence: str, random_seed: int = int(time()), assure_variants: bool = False) -> List[str]:
+    @property
+    def config(self) -> Dict[str, Any]:
+        return {"class": type(self).__name__,
+                "num_dropouts": self.num_dropouts,
+                "num_variants": self.num_variants}
 
-        results = mutate_by_dropout(input_sentence,
+    def mutate(self,
+               input_sentence: Union[str, PreprocessedSentence],
+               random_seed: Optional[int] = None,
+               assure_variants: bool = False) -> List[str]:
+        random_seed = _resolve_seed(random_seed)
+        results = self._memoize(input_sentence, random_seed, assure_variants,
+                                lambda: mutate_words_by_dropout(
+                                    _get_words(input_sentence),
                                     num_dropouts=self.num_dropouts,
                                     random_seed=random_seed,
                                     num_variants=self.num_variants,
-                                    assure_variants=assure_variants)
+                                    assure_variants=assure_variants))
+
+        self._count_variants(len(results))
+
+        return results
+
+    def mutate_many(self,
+                    input_sentences: Iterable[Union[str, PreprocessedSentence]],
+                    random_seed: Optional[int] = None,
+                    assure_variants: bool = False) -> List[List[str]]:
+        """
+        Same as ``mutate``, but for many sentences, which are tokenized and tagged in one batch.
+        """
+        random_seed = _resolve_seed(random_seed)
 
-        if len(results) == 0:
-            self.non_mutated += 1
+        def compute(sentences):
+            return [mutate_words_by_dropout(x.words,
+                                            num_dropouts=self.num_dropouts,
+                                            random_seed=random_seed,
+                                            num_variants=self.num_variants,
+                                            assure_variants=assure_variants)
+                    for x in preprocess_sentences(sentences)]
+
+        results = self._memoize_many(list(input_sentences), random_seed, assure_variants, compute)
+        for variants in results:
+            self._count_variants(len(variants))
 
         return results
+
+
+def _resolve_seed(random_seed: Optional[int]) -> int:
+    """
+    The given random seed, or the current time if none was given (so that calls without a seed are
+    not all seeded with the time the module was imported at).
+    """
+    return int(time()) if random_seed is None else random_seed
+
+
+def _get_words(input_sentence: Union[str, PreprocessedSentence]) -> List[Word]:
+    """
+    Returns the words of a sentence, which is only preprocessed if that was not done before.
+    """
+    if isinstance(input_sentence, PreprocessedSentence):
+        return input_sentence.words
+
+    return sentence_preprocessing(input_sentence)
@@ -0,0 +1,63 @@
+import re
+from typing import Iterable, Iterator, Optional
+
+from .resources import get_stopwords
+
+# The normalization of ``text_prepare``, as regular expressions applied to lowercased text.
+REPLACE_BY_SPACE_RE = re.compile(r'[/(){}\[\]\|@,;]')
+BAD_SYMBOLS_RE = re.compile(r'[^0-9a-z #+_]')
+
+
+class _TranslationTable(dict):
+    """
+    A ``str.translate`` table with the same effect as substituting ``REPLACE_BY_SPACE_RE`` by a
+    space and then removing ``BAD_SYMBOLS_RE``. Characters are looked up the first time they are
+    seen, so the table only holds the characters of the texts it was used on.
+    """
+
+    def __missing__(self, character: int) -> Optional[int]:
+        text = chr(character)
+
+        if REPLACE_BY_SPACE_RE.match(text):
+            result: Optional[int] = ord(" ")
+        elif BAD_SYMBOLS_RE.match(text):
+            result = None
+        else:
+            result = character
+
+        self[character] = result
+        return result
+
+
+_TRANSLATION_TABLE = _TranslationTable()
+
+
+def text_prepare(text: str) -> str:
+    """
+    Normalizes a text: lowercases it, replaces brackets and separators by spaces, removes other
+    symbols and stopwords, and collapses whitespace.
+
+            Parameters:
+                ``text`` (``str``): the text
+
+            Returns:
+                The normalized text.
+    """
+    stopwords = get_stopwords()
+
+    text = text.lower().translate(_TRANSLATION_TABLE)
+
+    return " ".join([word for word in text.split() if word not in stopwords])
+
+
+def text_prepare_many(texts: Iterable[str]) -> Iterator[str]:
+    """
+    Same as ``text_prepare``, for many texts. Texts are normalized lazily, so this also works on
+    streams such as the lines of a file.
+    """
+    stopwords = get_stopwords()
+    table = _TRANSLATION_TABLE
+
+    for text in texts:
+        text = text.lower().translate(table)
+        yield " ".join([word for word in text.split() if word not in stopwords])
@@ -0,0 +1,201 @@
+import math
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional
+
+# Called with the name of a stage, and the wall time, CPU time and number of calls to add to it.
+StageHook = Callable[[str, float, float, int], None]
+
+
+class StageStats:
+    """
+    The cumulative time spent in a stage of a run.
+
+            Attributes
+                    wall_time (float): the elapsed time in seconds, summed over all calls (and
+                    threads, so it can exceed the duration of the run)
+
+                    cpu_time (float): the CPU time in seconds of the threads that ran the stage
+
+                    calls (int): the number of times the stage ran
+    """
+
+    __slots__ = ("wall_time", "cpu_time", "calls")
+
+    def __init__(self, wall_time: float = 0.0, cpu_time: float = 0.0, calls: int = 0):
+        self.wall_time = wall_time
+        self.cpu_time = cpu_time
+        self.calls = calls
+
+    def __repr__(self):
+        return f"StageStats(wall: {self.wall_time:.6f}s, cpu: {self.cpu_time:.6f}s, " \
+               f"calls: {self.calls})"
+
+
+class RunStats:
+    """
+    Timings per stage and counters of a run, e.g. of ``MutamorphicTest.run``. Stages are
+    "tokenization", "pos_tagging", "wordnet_lookup", "embedding_lookup", "mutation_selection",
+    "model_inference" and "similarity". Counters are "variants_requested", "variants_produced",
+    "non_mutated", "variant_index_hits", "variant_cache_hits", "variant_cache_misses",
+    "mutation_cache_hits", "mutation_cache_misses", "model_cache_hits", "model_cache_misses" (with
+    a model output cache) and "variants_not_evaluated" (with early stopping).
+
+            Attributes
+                    stages (Dict[str, StageStats]): the time spent in each stage
+
+                    counters (Dict[str, int]): the value of each counter
+
+                    hooks (List[StageHook]): functions that are called every time time is added to
+                    a stage, e.g. to export it to a metrics system
+    """
+
+    def __init__(self, hooks: Optional[List[StageHook]] = None):
+        self.stages: Dict[str, StageStats] = dict()
+        self.counters: Dict[str, int] = dict()
+        self.hooks: List[StageHook] = [] if hooks is None else list(hooks)
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, wall_time: float, cpu_time: float, calls: int = 1):
+        """
+        Adds time spent in a stage.
+        """
+        with self._lock:
+            stats = self.stages.get(stage)
+            if stats is None:
+                stats = self.stages[stage] = StageStats()
+            stats.wall_time += wall_time
+            stats.cpu_time += cpu_time
+            stats.calls += calls
+
+        for hook in self.hooks:
+            hook(stage, wall_time, cpu_time, calls)
+
+    def count(self, counter: str, value: int = 1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def merge(self, other: "RunStats"):
+        """
+        Adds the stages and counters of another run, e.g. of a worker process.
+        """
+        for stage, stats in other.stages.items():
+            self.record(stage, stats.wall_time, stats.cpu_time, stats.calls)
+
+        for counter, value in other.counters.items():
+            self.count(counter, value)
+
+    @property
+    def variant_cache_hit_rate(self) -> float:
+        """
+        The fraction of WordNet variant lookups answered by the variant index or cache.
+        """
+        hits = self.counters.get("variant_index_hits", 0) + self.counters.get("variant_cache_hits", 0)
+        lookups = hits + self.counters.get("variant_cache_misses", 0)
+
+        return hits / lookups if lookups > 0 else float("nan")
+
+    @property
+    def variant_yield(self) -> float:
+        """
+        The fraction of requested variants that the mutators produced.
+        """
+        requested = self.counters.get("variants_requested", 0)
+
+        return self.counters.get("variants_produced", 0) / requested if requested > 0 \
+            else float("nan")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        The stages and counters as a JSON-serializable dictionary. Rates that are undefined (NaN)
+        are ``None``, since JSON has no NaN.
+        """
+        rates = {"variant_cache_hit_rate": self.variant_cache_hit_rate,
+                 "variant_yield": self.variant_yield}
+
+        return {"stages": {stage: {"wall_time": x.wall_time, "cpu_time": x.cpu_time,
+                                   "calls": x.calls}
+                           for stage, x in self.stages.items()},
+                "counters": dict(self.counters),
+                **{name: None if math.isnan(rate) else rate for name, rate in rates.items()}}
+
+    def __getstate__(self):
+        # Locks and hooks stay in the process that created them.
+        return {"stages": self.stages, "counters": self.counters}
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.stages = state["stages"]
+        self.counters = state["counters"]
+
+    def __repr__(self):
+        return f"RunStats(stages: {self.stages}, counters: {self.counters})"
+
+
+# The stats that stages and counters are recorded in, in this process. None disables recording.
+_active: Optional[RunStats] = None
+
+_NO_STAGE = nullcontext()
+
+
+def get_active() -> Optional[RunStats]:
+    return _active
+
+
+@contextmanager
+def recording(stats: Optional[RunStats]) -> Iterator[Optional[RunStats]]:
+    """
+    Records stages and counters in ``stats`` (in all threads of this process) within the context.
+    Does nothing if ``stats`` is None.
+    """
+    global _active
+
+    if stats is None:
+        yield None
+        return
+
+    previous = _active
+    _active = stats
+    try:
+        yield stats
+    finally:
+        _active = previous
+
+
+def stage(name: str) -> ContextManager:
+    """
+    Times the context as the stage ``name``, if recording is enabled. Otherwise, this costs about
+    as much as a function call.
+    """
+    if _active is None:
+        return _NO_STAGE
+
+    return _timed(_active, name)
+
+
+@contextmanager
+def _timed(stats: RunStats, name: str) -> Iterator[None]:
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    try:
+        yield
+    finally:
+        stats.record(name, time.perf_counter() - wall_start, time.thread_time() - cpu_start)
+
+
+def record(name: str, wall_time: float, cpu_time: float = 0.0):
+    """
+    Adds time that the caller measured to the stage ``name``, if recording is enabled, e.g. the
+    latency of a request that a coroutine awaited.
+    """
+    if _active is not None:
+        _active.record(name, wall_time, cpu_time)
+
+
+def count(counter: str, value: int = 1):
+    """
+    Adds ``value`` to a counter, if recording is enabled.
+    """
+    if _active is not None:
+        _active.count(counter, value)
@@ -1,21 +1,37 @@
-from typing import Tuple, List, Callable
+from typing import Tuple, List, Callable, Union
+from . import profiling
+from .mutation_table import MutationTable, render_mutations
+from .sampling import count_table, sample_distinct, unrank
 from .Word import Word, sentence_preprocessing
 
+import heapq
 import random as random_pkg
 from random import Random
 
 
+def count_mutations(non_trivial_words: List[Word], num_replacements: int) -> int:
+    """
+    Returns the number of ways to replace ``num_replacements`` of the given nontrivial words by one
+    of their variants, i.e. the number of output sentences the "random" selection strategy can
+    produce (unless some of them happen to be equal).
+    """
+    radices = [len(word.variants) for word in non_trivial_words]
+
+    return count_table(radices, num_replacements)[0][num_replacements]
+
+
 def _select_mutations_random(non_trivial_words: List[Word],
                              num_replacements: int,
                              num_variants: int,
                              rng: Random,
-                             assure_variants: bool = False) -> List[List[Tuple[Word, str]]]:
+                             assure_variants: bool = False) -> List[List[Tuple[int, str]]]:
     """
     Selects mutations at random. Ensures that each output sentence is unique, although mutations
-    at the nontrivial word level might be reused across output sentences. For each output sentence,
-    words are selected randomly, without replacement, to be mutated. Then, for the selected words,
-    a variant (synonym/hypernym) is chosen at random (uniform dist.) from the available variants of
-    that word.
+    at the nontrivial word level might be reused across output sentences. Output sentences are drawn
+    uniformly, without replacement, from all ways to replace ``num_replacements`` words by one of
+    their variants (synonym/hypernym), whose number is computed up front (see ``count_mutations``).
+    Ways that give the same output sentence as an earlier one (e.g. two variants that only differ
+    in a space and a hyphen) are skipped, and more are drawn instead.
 
             Parameters:
                 ``nontrivial_words`` (``List[Word]``): a list of all nontrivial words (words that
@@ -28,11 +44,16 @@ def _select_mutations_random(non_trivial_words: List[Word],
 
                 ``rng`` (``Random``): the random generator instance used to make random choices
 
+                ``assure_variants`` (``bool``): if True, nothing is returned when fewer than
+                ``num_variants`` distinct output sentences exist. Otherwise, all of them are
+                returned.
+
             Returns:
                 A list of mutations to be made for each output sentence. For each output sentence,
                 the function returns a list of tuples representing the mutation. The first element
-                of the tuple is the nontrivial word that is to be replaced. The second element of
-                the tuple is the variant that was chosen for the word as a replacement.
+                of the tuple is the index (in ``nontrivial_words``) of the nontrivial word that is
+                to be replaced. The second element of the tuple is the variant that was chosen for
+                the word as a replacement.
     """
     # If we want to assure the number of variants we do not use the phrase
     # Otherwise we return as many variants as possible.
@@ -43,39 +64,37 @@ def _select_mutations_random(non_trivial_words: List[Word],
         else:
             num_replacements = len(non_trivial_words)
 
-    choices = set()
-
-    # This counter is for the case where there are not enough variants for the words.
-    safety_counter = 0
-    safety_limit = 500
-    for _ in range(num_variants):
+    if num_replacements == 0:
+        return []
 
-        while True:
-            words = rng.sample(non_trivial_words, num_replacements)
+    radices = [len(word.variants) for word in non_trivial_words]
+    table = count_table(radices, num_replacements)
+    total = table[0][num_replacements]
 
-            mutations = {(word, rng.choice(list(word.variants.keys()))) for word in words}
+    if total < num_variants and assure_variants:
+        return []
 
-            mutations = frozenset(mutations)
+    variants = [list(word.variants.keys()) for word in non_trivial_words]
 
-            if safety_counter == safety_limit:
-                return list()
+    def render(rank: int) -> Tuple[Tuple[int, str], ...]:
+        # The replaced words and their replacements determine the output sentence.
+        return tuple((index, _replacement(non_trivial_words[index], variants[index][option]))
+                     for index, option in unrank(rank, radices, num_replacements, table))
 
-            if mutations not in choices:
-                choices.add(mutations)
-                break
-            else:
-                safety_counter += 1
-
-    mutations_list = [list(mutations) for mutations in choices]
+    sampled = sample_distinct(total, num_variants, rng, render)
+    if len(sampled) < num_variants and assure_variants:
+        return []
 
-    return mutations_list
+    return [[(index, variants[index][option])
+             for index, option in unrank(rank, radices, num_replacements, table)]
+            for rank, _ in sampled]
 
 
 def _select_mutations_most_common_first(nontrivial_words: List[Word],
                                         num_replacements: int,
                                         num_variants: int,
                                         rng: Random,
-                                        assure_variants: bool = False) -> List[List[Tuple[Word, str]]]:
+                                        assure_variants: bool = False) -> List[List[Tuple[int, str]]]:
     """
     Selects mutations based on how many times a variant for a nontrivial word was suggested by
     WordNet. The mutations with the highest counts are chosen first. But for a single word, only one
@@ -97,56 +116,50 @@ def _select_mutations_most_common_first(nontrivial_words: List[Word],
             Returns:
                 A list of mutations to be made for each output sentence. For each output sentence,
                 the function returns a list of tuples representing the mutation. The first element
-                of the tuple is the nontrivial word that is to be replaced. The second element of
-                the tuple is the variant that was chosen for the word as a replacement.
+                of the tuple is the index (in ``nontrivial_words``) of the nontrivial word that is
+                to be replaced. The second element of the tuple is the variant that was chosen for
+                the word as a replacement.
     """
 
-    # Some preparations: group mutations by the number of times it is suggested by WordNet
-
-    grouped_by_counts = {}
-    used_words = []
-    for word in nontrivial_words:
-
-        for variant, count in word.variants.items():
-            if word.value not in used_words:
-                used_words.append(word.value)
-            if count not in grouped_by_counts.keys():
-                grouped_by_counts[count] = {(word, variant)}
-            else:
-                grouped_by_counts[count].add((word, variant))
-
-    if len(nontrivial_words) < num_replacements or len(used_words) < num_replacements:
+    # If there are not enough distinct words, no output sentence can be made.
+    if len({word.value for word in nontrivial_words}) < num_replacements:
         return []
-    groups = list(grouped_by_counts.keys())
 
-    groups.sort(reverse=True)
+    # The mutations of each word, from the highest count to the lowest, and in random order among
+    # equal counts: each has the key (-count, random tie-breaker).
+    word_mutations = [sorted((-count, rng.random(), variant)
+                             for variant, count in word.variants.items())
+                      for word in nontrivial_words]
+    next_mutations = [0] * len(nontrivial_words)
+
+    # The words that have unused mutations, by the key of their best unused mutation.
+    heap = [(mutations[0][0], mutations[0][1], index)
+            for index, mutations in enumerate(word_mutations) if len(mutations) > 0]
+    heapq.heapify(heap)
 
     # Choose the mutations.
     mutations_list = []
     for _ in range(num_variants):
 
-        mutations = []
-        chosen_words = set()
-        current_group_number = 0
-
-        while len(chosen_words) < num_replacements and current_group_number < len(groups):
-
-            group = grouped_by_counts[groups[current_group_number]]
-
-            # We do not want single words to be replaced by two wrods
-            candidates = [x for x in group if x[0] not in chosen_words]
-
-            if len(candidates) > 0:
-
-                mutation = rng.choice(candidates)
-                chosen_words.add(mutation[0])
+        # We do not want single words to be replaced by two words, so the best mutations of
+        # distinct words are chosen, and of words with distinct values (e.g. not both "very" in
+        # "very very").
+        chosen_words: List[int] = []
+        chosen_values = set()
+        skipped = []
+        while len(chosen_words) < num_replacements and len(heap) > 0:
+            entry = heapq.heappop(heap)
+            value = nontrivial_words[entry[2]].value
+            if value in chosen_values:
+                skipped.append(entry)
+            else:
+                chosen_words.append(entry[2])
+                chosen_values.add(value)
 
-                mutations.append(mutation)
+        for entry in skipped:
+            heapq.heappush(heap, entry)
 
-                group.remove(mutation)
-            else:
-                current_group_number += 1
-        if current_group_number == len(groups):
+        if len(chosen_words) < num_replacements:
             # If we do not get all the variants we want we return an empty list
             # Or we just return the results so far, if is not strict.
             if assure_variants:
@@ -154,6 +167,16 @@ def _select_mutations_most_common_first(nontrivial_words: List[Word],
             else:
                 break
 
+        mutations = []
+        for index in chosen_words:
+            position = next_mutations[index]
+            mutations.append((index, word_mutations[index][position][2]))
+
+            next_mutations[index] = position + 1
+            if position + 1 < len(word_mutations[index]):
+                count, tie_breaker, _ = word_mutations[index][position + 1]
+                heapq.heappush(heap, (count, tie_breaker, index))
+
         mutations_list.append(mutations)
 
     return mutations_list
@@ -166,7 +189,7 @@ MUTATION_SELECTION_STRATEGIES = {
 
 
 def _get_selection_strategy_func(selection_strategy: str) \
-        -> Callable[[List[Word], int, int, Random], List[List[Tuple[Word, str]]]]:
+        -> Callable[[List[Word], int, int, Random], List[List[Tuple[int, str]]]]:
     """
     A basic dictionary lookup to select either of the two mutation selection strategies.
     """
@@ -182,7 +205,8 @@ def mutate_by_replacement(input_sentence: str,
                           num_variants: int = 5,
                           selection_strategy: str = "random",
                           random_seed: int = 13,
-                          assure_variants: bool = False) -> List[str]:
+                          assure_variants: bool = False,
+                          as_table: bool = False) -> Union[List[str], MutationTable]:
     """
     Returns a list of mutated version of the given input sentence. Mutations are based on synonyms
     and hypernyms of nontrivial words. Nontrivial words are words that are not stopwords (as defined
@@ -210,46 +234,78 @@ def mutate_by_replacement(input_sentence: str,
 
                 ``random_seed`` (``int``):
 
+                ``assure_variants`` (``bool``): if True, nothing is returned when fewer than
+                ``num_variants`` distinct output sentences can be made. For the "random" strategy,
+                ``count_mutations`` (or ``ReplacementMutator.count_mutations``) tells how many
+                can be made.
+
+                ``as_table`` (``bool``): if True, the mutated sentences are returned as a
+                ``MutationTable``, which holds the replaced positions and replacements of each
+                mutated sentence, and renders them as strings on demand
+
             Returns:
                 A list mutated sentences.
     """
+    words = sentence_preprocessing(input_sentence)
+
+    return mutate_words_by_replacement(words,
+                                       num_replacements=num_replacements,
+                                       num_variants=num_variants,
+                                       selection_strategy=selection_strategy,
+                                       random_seed=random_seed,
+                                       assure_variants=assure_variants,
+                                       as_table=as_table)
+
+
+def mutate_words_by_replacement(words: List[Word],
+                                num_replacements: int = 1,
+                                num_variants: int = 5,
+                                selection_strategy: str = "random",
+                                random_seed: int = 13,
+                                assure_variants: bool = False,
+                                as_table: bool = False) -> Union[List[str], MutationTable]:
+    """
+    Same as ``mutate_by_replacement``, but for a sentence that was already preprocessed into words
+    (see ``sentence_preprocessing`` and ``sentence_preprocessing_batch``).
+    """
     # Set thread safe seed for reproducibility
     rng = random_pkg.Random()
     rng.seed(a=random_seed)
 
-    words = sentence_preprocessing(input_sentence)
-
-    non_trivial_words = {word: index for (index, word) in enumerate(words) if word.is_nontrivial}
+    # Positions are tracked separately, because the same Word instance may occur more than once.
+    positions = [index for (index, word) in enumerate(words) if word.is_nontrivial]
+    non_trivial_words = [words[index] for index in positions]
 
     selection_strategy_func = _get_selection_strategy_func(selection_strategy)
 
-    mutations_list = selection_strategy_func(list(non_trivial_words.keys()),
-                                             num_replacements,
-                                             num_variants,
-                                             rng, assure_variants)
+    with profiling.stage("mutation_selection"):
+        mutations_list = selection_strategy_func(non_trivial_words,
+                                                 num_replacements,
+                                                 num_variants,
+                                                 rng, assure_variants)
 
-    mutated_sentences = []
-    sentence_og = [word.value for word in words]
+    tokens = [word.value for word in words]
+    replacements = ([(positions[index], _replacement(non_trivial_words[index], variant))
+                     for index, variant in mutations] for mutations in mutations_list)
 
-    for mutations in mutations_list:
-        sentence = sentence_og.copy()
-        for mutation in mutations:
-            word = mutation[0]
+    if as_table:
+        return MutationTable.from_mutations(tokens, replacements)
 
-            # In order to avoid words that are substitued by two words
-            replacement = mutation[1].replace(" ", "-")
+    return [render_mutations(tokens, sorted(mutations)) for mutations in replacements]
 
-            # Not ideal but nothing more makes sense
-            if replacement == '':
-                replacement = "-"+word.value+"-"
 
-            index = non_trivial_words[word]
-            sentence[index] = replacement
+def _replacement(word: Word, variant: str) -> str:
+    """
+    The token that replaces a word by one of its variants.
+    """
+    # In order to avoid words that are substitued by two words
+    replacement = variant.replace(" ", "-")
 
-        mutated_sentence = " ".join(sentence)
-        mutated_sentences.append(mutated_sentence)
+    # Not ideal but nothing more makes sense
+    if replacement == '':
+        replacement = "-"+word.value+"-"
 
-    return mutated_sentences
+    return replacement
 
 
 if __name__ == "__main__":
@@ -0,0 +1,87 @@
+import os
+from typing import Dict, FrozenSet, List, Optional
+
+# NLTK resources used by mutatest, with the paths under which NLTK looks them up.
+RESOURCES: Dict[str, str] = {
+    'wordnet': 'corpora/wordnet',
+    'punkt': 'tokenizers/punkt',
+    'stopwords': 'corpora/stopwords',
+    'averaged_perceptron_tagger': 'taggers/averaged_perceptron_tagger',
+    'omw-1.4': 'corpora/omw-1.4',
+}
+
+_resources_ensured = False
+_stopwords: Optional[FrozenSet[str]] = None
+
+
+def ensure_resources(download: bool = True, data_dir: Optional[str] = None) -> List[str]:
+    """
+    Makes sure the NLTK corpora and models used by mutatest are available. Resources that are
+    already present are not downloaded again, so this works offline against a pre-provisioned NLTK
+    data directory.
+
+            Parameters:
+                ``download`` (``bool``): whether missing resources should be downloaded
+
+                ``data_dir`` (``str``): optional NLTK data directory to look in first, and to
+                download missing resources to. By default, NLTK's own search path (including the
+                ``NLTK_DATA`` environment variable) is used.
+
+            Returns:
+                The names of the resources that were downloaded.
+
+            Raises:
+                ``LookupError`` if some resources are missing and could not be downloaded.
+    """
+    global _resources_ensured
+
+    import nltk
+
+    if data_dir is not None and data_dir not in nltk.data.path:
+        nltk.data.path.insert(0, data_dir)
+
+    downloaded = []
+    missing = []
+    for name, path in RESOURCES.items():
+        try:
+            nltk.data.find(path)
+            continue
+        except LookupError:
+            pass
+
+        if download and nltk.download(name, download_dir=data_dir, quiet=True):
+            downloaded.append(name)
+        else:
+            missing.append(name)
+
+    if len(missing) > 0:
+        raise LookupError(f"Missing NLTK resources: {', '.join(missing)}. Provision them in an NLTK "
+                          f"data directory, or call mutatest.ensure_resources() with network access.")
+
+    _resources_ensured = True
+
+    return downloaded
+
+
+def require_resources():
+    """
+    Calls ``ensure_resources`` the first time any resource is needed in this process. Setting the
+    ``MUTATEST_OFFLINE`` environment variable disables downloading.
+    """
+    if not _resources_ensured:
+        ensure_resources(download=os.environ.get("MUTATEST_OFFLINE") is None)
+
+
+def get_stopwords() -> FrozenSet[str]:
+    """
+    Returns the English stopwords of NLTK, which are loaded on first use.
+    """
+    global _stopwords
+
+    if _stopwords is None:
+        require_resources()
+
+        from nltk.corpus import stopwords
+        _stopwords = frozenset(stopwords.words('english'))
+
+    return _stopwords
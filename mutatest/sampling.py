@@ -0,0 +1,88 @@
+from random import Random
+from typing import Callable, Dict, Hashable, Iterator, List, Tuple, TypeVar
+
+Rendering = TypeVar("Rendering", bound=Hashable)
+
+
+def count_table(radices: List[int], k: int) -> List[List[int]]:
+    """
+    Computes ``table[i][j]``: the number of ways to choose ``j`` of the elements from index ``i``
+    onwards, and one of the ``radices[x]`` options of every chosen element ``x`` (the elementary
+    symmetric polynomials of the radices). With all radices 1, these are binomial coefficients.
+    """
+    num_elements = len(radices)
+    table = [[0] * (k + 1) for _ in range(num_elements + 1)]
+    table[num_elements][0] = 1
+
+    for i in range(num_elements - 1, -1, -1):
+        table[i][0] = 1
+        for j in range(1, k + 1):
+            table[i][j] = table[i + 1][j] + radices[i] * table[i + 1][j - 1]
+
+    return table
+
+
+def unrank(rank: int, radices: List[int], k: int, table: List[List[int]]) -> List[Tuple[int, int]]:
+    """
+    Decodes a number in ``range(table[0][k])`` (see ``count_table``) into the choice it stands for,
+    as (element, option) pairs in increasing order of element. The numbers enumerate the choices as
+    a mixed-radix product: for each element in turn, first all choices with it (by option), then
+    all choices without it. With all radices 1, this is the lexicographic order of combinations.
+    """
+    choice = []
+    remaining = k
+    element = 0
+    while remaining > 0:
+        num_with_element = radices[element] * table[element + 1][remaining - 1]
+
+        if rank < num_with_element:
+            option, rank = divmod(rank, table[element + 1][remaining - 1])
+            choice.append((element, option))
+            remaining -= 1
+        else:
+            rank -= num_with_element
+
+        element += 1
+
+    return choice
+
+
+def shuffled_ranks(total: int, rng: Random) -> Iterator[int]:
+    """
+    Yields the integers of ``range(total)`` in a uniformly random order. The shuffle is lazy (a
+    Fisher-Yates shuffle that only stores the swapped entries), so drawing ``n`` of them costs O(n)
+    time and memory, however large ``total`` is.
+    """
+    swapped: Dict[int, int] = dict()
+    for i in range(total):
+        j = rng.randrange(i, total)
+        drawn = swapped.get(j, j)
+        current = swapped.pop(i, i)
+        if j != i:
+            swapped[j] = current
+        yield drawn
+
+
+def sample_distinct(total: int,
+                    num_items: int,
+                    rng: Random,
+                    render: Callable[[int], Rendering]) -> List[Tuple[int, Rendering]]:
+    """
+    Draws ranks uniformly, without replacement, from ``range(total)``, and renders them, until
+    ``num_items`` distinct renderings were found or all ranks were drawn. Ranks whose rendering was
+    found before, e.g. dropping either word of "very very", are skipped.
+
+            Returns:
+                The (rank, rendering) pairs with distinct renderings, in the order they were drawn.
+    """
+    if num_items <= 0:
+        return []
+
+    found: Dict[Rendering, int] = dict()
+    for rank in shuffled_ranks(total, rng):
+        found.setdefault(render(rank), rank)
+
+        if len(found) == num_items:
+            break
+
+    return [(rank, rendering) for rendering, rank in found.items()]
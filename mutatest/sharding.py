@@ -0,0 +1,157 @@
+# Runs one mutamorphic test on several machines, and merges the results. Every machine runs the
+# test on the same sentences with the same random seed and shard count, but its own shard index,
+# and writes a shard report:
+#
+#     test = MutamorphicTest(sentences, mutator, model, "cosine", shard_index=i, shard_count=n)
+#     test.run()
+#     write_shard_report(f"shard-{i}.jsonl", test)
+#
+# The reports are then merged with ``merge_shard_reports``, or ``mutatest merge shard-*.jsonl``.
+# Because every test case is seeded by its sentence, and sums are computed with ``math.fsum``
+# (which is exact, so independent of order), the merged aggregates are the same for any number
+# of shards.
+import json
+import math
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .checkpoint import describe_config, sentence_hash
+from .test_runner import MutamorphicTest, MutamorphicTestCase
+
+# The fields of the header of shard reports that should be the same for all shards of a run.
+_RUN_FIELDS = ["shard_count", "random_seed", "seed_per_case", "mutator_config"]
+
+
+def write_shard_report(path: str,
+                       test: MutamorphicTest,
+                       test_cases: Optional[Iterable[MutamorphicTestCase]] = None) -> int:
+    """
+    Writes the similarities of the completed test cases of a shard as JSON lines: a header with
+    the shard and the run, followed by a line per test case.
+
+            Parameters:
+                ``path`` (``str``): where to write the report
+
+                ``test`` (``MutamorphicTest``): the test of the shard
+
+                ``test_cases`` (``Iterable[MutamorphicTestCase]``): the completed test cases,
+                ``test.test_cases`` by default. This may also be ``test.stream(sentences)``, whose
+                test cases are then written as they complete.
+
+            Returns:
+                The number of test cases written.
+    """
+    if test_cases is None:
+        test_cases = test.test_cases
+
+    header = {"shard_index": test.shard_index,
+              "shard_count": test.shard_count,
+              "random_seed": test.random_seed,
+              "seed_per_case": test.seed_per_case,
+              "mutator_config": describe_config(test.mutator.config)}
+
+    count = 0
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(json.dumps(header) + "\n")
+        for test_case in test_cases:
+            file.write(json.dumps({"sentence_hash": sentence_hash(test_case.input_sentence),
+                                   "similarities": test_case.similarities.tolist()}) + "\n")
+            count += 1
+
+    return count
+
+
+def read_shard_report(path: str) -> Tuple[Dict[str, Any], Iterator[List[float]]]:
+    """
+    Reads the header of a shard report, and returns it with an iterator over the similarities of
+    each of its test cases.
+    """
+    file = open(path, encoding="utf-8")
+    header = json.loads(file.readline())
+
+    def similarities() -> Iterator[List[float]]:
+        with file:
+            for line in file:
+                if line.strip() != "":
+                    yield json.loads(line)["similarities"]
+
+    return header, similarities()
+
+
+def merge_shard_reports(paths: List[str], bins: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    """
+    Merges the reports of all shards of a run into the aggregates of the whole run.
+
+            Parameters:
+                ``paths`` (``List[str]``): the shard reports, one per shard, in any order
+
+                ``bins`` (``np.ndarray``): the bin edges of the similarity histogram, 10 equal
+                bins between 0 and 1 by default. Like in ``RunningSimilarityStats``, the first
+                and last bin also hold the similarities outside of the bins.
+
+            Returns:
+                A JSON-serializable report with the number of test cases (in total and without
+                variants), the number, mean, minimum and maximum of the similarities, the average
+                over the test cases with variants of their average similarity, and the histogram.
+                Statistics of the similarities are ``None`` (null in JSON, which has no NaN) if no
+                test case has variants.
+    """
+    assert len(paths) > 0, "There should be at least one shard report."
+
+    bins = np.linspace(0, 1, 11) if bins is None else np.asarray(bins, dtype=float)
+    histogram = np.zeros(len(bins) - 1, dtype=np.int64)
+
+    run: Optional[Dict[str, Any]] = None
+    shard_indices = set()
+    num_cases = 0
+    num_unmutated = 0
+    count = 0
+    minimum = math.inf
+    maximum = -math.inf
+
+    # The sum and average of the similarities of each test case, which only depend on the case.
+    case_sums: List[float] = []
+    case_averages: List[float] = []
+
+    for path in paths:
+        header, cases = read_shard_report(path)
+
+        if run is None:
+            run = {field: header[field] for field in _RUN_FIELDS}
+        assert all(header[field] == run[field] for field in _RUN_FIELDS), \
+            f"{path} is a shard of another run."
+        assert header["shard_index"] not in shard_indices, \
+            f"Shard {header['shard_index']} is given more than once."
+        shard_indices.add(header["shard_index"])
+
+        for similarities in cases:
+            num_cases += 1
+            if len(similarities) == 0:
+                num_unmutated += 1
+                continue
+
+            total = math.fsum(similarities)
+            case_sums.append(total)
+            case_averages.append(total / len(similarities))
+            count += len(similarities)
+            minimum = min(minimum, min(similarities))
+            maximum = max(maximum, max(similarities))
+
+            clipped = np.clip(similarities, bins[0], bins[-1])
+            histogram += np.histogram(clipped, bins=bins)[0]
+
+    missing = set(range(run["shard_count"])) - shard_indices
+    assert len(missing) == 0, f"The reports of shards {sorted(missing)} are missing."
+
+    return {**run,
+            "num_cases": num_cases,
+            "num_unmutated": num_unmutated,
+            "count": count,
+            "mean": math.fsum(case_sums) / count if count > 0 else None,
+            "min": minimum if count > 0 else None,
+            "max": maximum if count > 0 else None,
+            "average_similarity": math.fsum(case_averages) / len(case_averages)
+            if len(case_averages) > 0 else None,
+            "bins": bins.tolist(),
+            "histogram": histogram.tolist()}
@@ -0,0 +1,60 @@
+from typing import Callable
+
+import numpy as np
+
+
+def _as_rows(outputs: np.ndarray) -> np.ndarray:
+    return outputs.reshape(len(outputs), -1).astype(float, copy=False)
+
+
+def cosine_similarity(originals: np.ndarray, variants: np.ndarray) -> np.ndarray:
+    """
+    Row-wise cosine similarity between two stacks of output vectors. Pairs where either vector is
+    all zeros get similarity 0.
+    """
+    originals, variants = _as_rows(originals), _as_rows(variants)
+
+    dot_products = np.einsum("ij,ij->i", originals, variants)
+    norms = np.linalg.norm(originals, axis=1) * np.linalg.norm(variants, axis=1)
+
+    return np.divide(dot_products, norms, out=np.zeros(len(norms)), where=norms != 0)
+
+
+def l2_similarity(originals: np.ndarray, variants: np.ndarray) -> np.ndarray:
+    """
+    Row-wise similarity ``1 / (1 + d)``, where ``d`` is the Euclidean distance between two output
+    vectors. Identical outputs get similarity 1.
+    """
+    distances = np.linalg.norm(_as_rows(originals) - _as_rows(variants), axis=1)
+
+    return 1 / (1 + distances)
+
+
+def label_agreement(originals: np.ndarray, variants: np.ndarray) -> np.ndarray:
+    """
+    1 where the original and the variant output have the same label, 0 otherwise. Outputs are
+    either labels (one per sentence) or score vectors, in which case the label is the index of the
+    highest score.
+    """
+    if originals.ndim > 1:
+        originals = np.argmax(_as_rows(originals), axis=1)
+        variants = np.argmax(_as_rows(variants), axis=1)
+
+    return (originals == variants).astype(float)
+
+
+SIMILARITY_METRICS = {
+    "cosine": cosine_similarity,
+    "l2": l2_similarity,
+    "label_agreement": label_agreement,
+}
+
+
+def get_similarity_metric(name: str) -> Callable[[np.ndarray, np.ndarray], np.ndarray]:
+    """
+    A basic dictionary lookup to select one of the built-in vectorized similarity metrics.
+    """
+
+    assert name in SIMILARITY_METRICS, "Unknown similarity metric."
+
+    return SIMILARITY_METRICS[name]
@@ -1,37 +1,192 @@
-from typing import List, Iterable, Callable, Generic, TypeVar
+from typing import (Any, Dict, List, Iterable, Iterator, Callable, ContextManager, Generic,
+                    Optional, Tuple, TypeVar, Union)
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from itertools import islice
+import hashlib
+import json
+import math
+from . import profiling
+from . import early_stopping as stopping
+from .cache import SQLiteStore, TieredCache
+from .checkpoint import CheckpointFile, case_key, case_seed, describe_config, sentence_hash, \
+    shard_of
+from .early_stopping import EarlyStopping
 from .mutators import Mutator
-from .Word import Word, sentence_preprocessing
+from .profiling import RunStats
+from .similarity import get_similarity_metric
+from .Word import PreprocessedSentence, Word, preprocess_sentence, sentence_preprocessing
 import numpy as np
 
 ModelOutput = TypeVar("ModelOutput")
 
+EXECUTOR_BACKENDS = {
+    "process": ProcessPoolExecutor,
+    "thread": ThreadPoolExecutor,
+}
+
+
+class ModelOutputCache:
+    """
+    Model outputs by input sentence, so that the model is run once per distinct sentence: within a
+    run, e.g. for variants that several test cases or mutators have in common, and, with a
+    persistent store, across runs. Outputs are identified by the model identifier and a hash of the
+    sentence, so one store can hold the outputs of several models. Outputs are shared by all
+    sentences that are equal, and should not be modified. ``None`` outputs are not cached.
+
+            Attributes
+                    model_id (str): identifies the model, and should change when the model does
+
+                    cache (TieredCache): the cached outputs
+    """
+
+    def __init__(self,
+                 model_id: str,
+                 maxsize: int = 100_000,
+                 path: Optional[str] = None,
+                 max_entries: Optional[int] = None,
+                 cache: Optional[TieredCache] = None):
+        """
+                Parameters:
+                    ``maxsize`` (``int``): the number of outputs kept in memory, of which the least
+                    recently used are evicted first
+
+                    ``path`` (``str``): optional location of a SQLite file in which outputs are kept
+                    between runs and shared between processes
+
+                    ``max_entries`` (``int``): optional number of outputs the SQLite file is
+                    bounded to, of which the ones written longest ago are evicted first
+
+                    ``cache`` (``TieredCache``): a cache to use instead of creating one
+        """
+        if cache is None:
+            store = None if path is None else SQLiteStore(path, table="model_outputs",
+                                                          max_entries=max_entries)
+            cache = TieredCache(maxsize, store)
+
+        self.model_id = model_id
+        self.cache = cache
+
+    def key(self, sentence: str) -> str:
+        description = json.dumps([self.model_id, sentence_hash(sentence)])
+        return hashlib.sha256(description.encode("utf-8")).hexdigest()
+
+    def outputs(self,
+                sentences: List[str],
+                compute: Callable[[List[str]], List[ModelOutput]]) -> List[ModelOutput]:
+        """
+        Returns the model output of each sentence, of which only those of the distinct sentences
+        that are not cached are computed, in one call of ``compute``.
+        """
+        keys = [self.key(x) for x in sentences]
+        outputs = [self.cache.get(key) for key in keys]
+
+        # Sentences that occur more than once are computed once.
+        misses: Dict[str, str] = dict()
+        for key, sentence, output in zip(keys, sentences, outputs):
+            if output is None:
+                misses.setdefault(key, sentence)
+        profiling.count("model_cache_hits", len(sentences) - len(misses))
+        profiling.count("model_cache_misses", len(misses))
+
+        if len(misses) == 0:
+            return outputs
+
+        computed = compute(list(misses.values()))
+        assert len(computed) == len(misses), "Expected one model output per sentence."
+        computed_by_key = dict(zip(misses, computed))
+        for key, output in computed_by_key.items():
+            if output is not None:
+                self.cache.put(key, output)
+
+        return [computed_by_key[key] if key in computed_by_key else output
+                for key, output in zip(keys, outputs)]
+
+    def flush(self):
+        """
+        Commits the outputs buffered for the persistent store, if any.
+        """
+        if self.cache.store is not None:
+            self.cache.store.flush()
+
+    def __repr__(self):
+        return f"ModelOutputCache(\"{self.model_id}\", memory: {len(self.cache.memory)}, " \
+               f"hit rate: {self.cache.hit_rate:.2f})"
+
 
 class MutamorphicTestCase(Generic[ModelOutput]):
     """
     TODO comment
     """
 
-    def __init__(self, input_sentence: str):
+    def __init__(self, input_sentence: Union[str, PreprocessedSentence]):
+        """
+        Creates a test case for a sentence, which may already be preprocessed (see
+        ``preprocess_sentences``), e.g. to share one preprocessing pass between tests with several
+        mutators.
+        """
+        self._preprocessed: PreprocessedSentence | None = None
+        if isinstance(input_sentence, PreprocessedSentence):
+            self._preprocessed = input_sentence
+            input_sentence = input_sentence.sentence
+
         self.input_sentence = input_sentence
         self.variants: List[str] | None = None
         self.output_original: ModelOutput | None = None
         self.output_variants: List[ModelOutput] | None = None
-        self.similarities: List[float] = []
+        self._similarities = np.empty(0)
+        self._average_similarity: float | None = None
+        self._worker_stats: RunStats | None = None
+
+        # Why the evaluation of the variants stopped, when run with early stopping.
+        self.stop_reason: str | None = None
 
     def compute_variants(self, mutator: Mutator, random_seed: int):
         """
         TODO comment
         """
-        self.variants = mutator.mutate(self.input_sentence, random_seed=random_seed)
+        if not mutator.accepts_preprocessed:
+            self.variants = mutator.mutate(self.input_sentence, random_seed=random_seed)
+            return
+
+        # The sentence is only preprocessed (tokenized and tagged) if its variants are not cached,
+        # e.g. when it occurs more than once in a run.
+        variants = None
+        if self._preprocessed is None:
+            variants = mutator.cached_variants(self.input_sentence, random_seed)
+
+        if variants is None:
+            variants = mutator.mutate(self.preprocessed, random_seed=random_seed)
+
+        self.variants = variants
 
     def compute_model_outputs(self, model_callback: Callable[[str], ModelOutput]):
         """
         TODO comment
         """
+        with profiling.stage("model_inference"):
+            outputs = [model_callback(x) for x in self.model_inputs]
+
+        self.set_model_outputs(outputs)
+
+    @property
+    def model_inputs(self) -> List[str]:
+        """
+        The sentences the model should be run on: the input sentence, followed by its variants.
+        """
         assert self.variants is not None, "Make sure to run compute_variants() before this."
 
-        self.output_original = model_callback(self.input_sentence)
-        self.output_variants = [model_callback(x) for x in self.variants]
+        return [self.input_sentence] + self.variants
+
+    def set_model_outputs(self, outputs: List[ModelOutput]):
+        """
+        Stores the model outputs for ``model_inputs``, in the same order.
+        """
+        assert len(outputs) == len(self.model_inputs), "Expected one model output per model input."
+
+        self.output_original = outputs[0]
+        self.output_variants = outputs[1:]
 
     def compute_similarities(self,
                              similarity_callback: Callable[[ModelOutput, ModelOutput], float]):
@@ -41,8 +196,22 @@ class MutamorphicTestCase(Generic[ModelOutput]):
         assert self.output_original is not None and self.output_variants is not None, \
             "Make sure to run compute_model_outputs() before this."
 
-        self.similarities = [similarity_callback(self.output_original, x)
-                             for x in self.output_variants]
+        with profiling.stage("similarity"):
+            self.similarities = [similarity_callback(self.output_original, x)
+                                 for x in self.output_variants]
+
+    @property
+    def similarities(self) -> np.ndarray:
+        """
+        The similarity between the model output for the input sentence and for each variant. After
+        ``MutamorphicTest.run``, this is a slice of ``MutamorphicTest.similarities``.
+        """
+        return self._similarities
+
+    @similarities.setter
+    def similarities(self, similarities: Iterable[float]):
+        self._similarities = np.asarray(similarities, dtype=float)
+        self._average_similarity = None
 
     @property
     def average_similarity(self) -> float:
@@ -50,51 +219,755 @@ class MutamorphicTestCase(Generic[ModelOutput]):
         Returns: TODO comment
 
         """
-        return np.average(self.similarities)
+        if self._average_similarity is None:
+            self._average_similarity = np.average(self._similarities)
+
+        return self._average_similarity
+
+    @property
+    def preprocessed(self) -> PreprocessedSentence:
+        """
+        The tokens, tags and words of the input sentence, which are computed once and then shared
+        by ``compute_variants`` and the word helpers below.
+        """
+        if self._preprocessed is None:
+            self._preprocessed = preprocess_sentence(self.input_sentence)
+
+        return self._preprocessed
 
     def get_nontrivial_words(self) -> List[Word]:
         """
         TODO comment
         """
-        words = sentence_preprocessing(self.input_sentence)
-        return [word for word in words if word.is_nontrivial]
+        return self.preprocessed.nontrivial_words
 
     def get_non_stopwords(self) -> List[Word]:
-        words = sentence_preprocessing(self.input_sentence)
-        return [word for word in words if not word.is_stopword]
+        return self.preprocessed.non_stopwords
 
     def __repr__(self):
         return f"MutaTestCase(avg_sim: {self.average_similarity}, input: \"{self.input_sentence}\")"
 
+class RunningSimilarityStats:
+    """
+    Aggregates of the similarities of a stream of test cases, updated incrementally so that the
+    test cases themselves do not need to be kept.
+
+            Attributes
+                    num_cases (int): the number of test cases seen
+
+                    num_unmutated (int): the number of test cases without any variants
+
+                    count (int): the number of similarities seen
+
+                    mean (float): the mean of all similarities
+
+                    min (float), max (float): the lowest and highest similarity
+
+                    average_similarity (float): the average over all test cases with variants of
+                    their average similarity
+
+                    histogram (np.ndarray): the number of similarities per bin, where the first and
+                    last bin also hold the similarities outside of ``bins``
+
+                    bins (np.ndarray): the histogram bin edges
+    """
+
+    def __init__(self, bins: Optional[np.ndarray] = None):
+        self.bins = np.linspace(0, 1, 11) if bins is None else np.asarray(bins, dtype=float)
+        self.histogram = np.zeros(len(self.bins) - 1, dtype=int)
+        self.num_cases = 0
+        self.num_unmutated = 0
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._sum = 0.0
+        self._sum_case_averages = 0.0
+
+    def update(self, similarities: np.ndarray, counts: List[int]):
+        """
+        Adds the similarities of some test cases, given as one contiguous array and the number of
+        similarities of each test case.
+        """
+        counts = np.asarray(counts, dtype=int)
+        self.num_cases += len(counts)
+        self.num_unmutated += int(np.sum(counts == 0))
+
+        if len(similarities) == 0:
+            return
+
+        case_indices = np.repeat(np.arange(len(counts)), counts)
+        sums = np.bincount(case_indices, weights=similarities, minlength=len(counts))
+        mutated = counts > 0
+
+        self.count += len(similarities)
+        self._sum += float(np.sum(similarities))
+        self._sum_case_averages += float(np.sum(sums[mutated] / counts[mutated]))
+        self.min = min(self.min, float(np.min(similarities)))
+        self.max = max(self.max, float(np.max(similarities)))
+
+        clipped = np.clip(similarities, self.bins[0], self.bins[-1])
+        self.histogram += np.histogram(clipped, bins=self.bins)[0]
+
+    @property
+    def mean(self) -> float:
+        return self._sum / self.count if self.count > 0 else np.nan
+
+    @property
+    def average_similarity(self) -> float:
+        num_mutated = self.num_cases - self.num_unmutated
+        return self._sum_case_averages / num_mutated if num_mutated > 0 else np.nan
+
+    def __repr__(self):
+        return f"RunningSimilarityStats(cases: {self.num_cases}, mean: {self.mean}, " \
+               f"min: {self.min}, max: {self.max})"
+
+
 class MutamorphicTest(Generic[ModelOutput]):
     """
     TODO comment
     """
 
     def __init__(self,
-                 input_sentences: Iterable[str],
+                 input_sentences: Iterable[Union[str, PreprocessedSentence]],
                  mutator: Mutator,
-                 model_callback: Callable[[str], ModelOutput],
-                 similarity_callback: Callable[[ModelOutput, ModelOutput], float],
-                 random_seed: int = 13):
+                 model_callback: Optional[Callable[[str], ModelOutput]],
+                 similarity_callback: Union[Callable[[ModelOutput, ModelOutput], float], str],
+                 random_seed: int = 13,
+                 batch_model_callback: Optional[Callable[[List[str]], List[ModelOutput]]] = None,
+                 batch_size: int = 64,
+                 run_stats: Optional[RunStats] = None,
+                 seed_per_case: bool = True,
+                 shard_index: int = 0,
+                 shard_count: int = 1,
+                 model_cache: Optional[ModelOutputCache] = None):
         """
         TODO comment
+
+                Parameters:
+                    ``similarity_callback`` (``Callable[[ModelOutput, ModelOutput], float] | str``):
+                    either a function comparing two model outputs, or the name of a built-in
+                    vectorized metric ("cosine", "l2" or "label_agreement", see
+                    ``mutatest.similarity``), which compares the outputs of all test cases at once
+
+                    ``batch_model_callback`` (``Callable[[List[str]], List[ModelOutput]]``): an
+                    optional model callback that processes a list of sentences at once. If given,
+                    it is used instead of ``model_callback``, which may then be ``None``. Input
+                    sentences and variants of many test cases are collected into batches of
+                    ``batch_size`` sentences.
+
+                    ``run_stats`` (``RunStats``): optional stats in which the time spent in each
+                    stage, and counters such as the number of variants produced, are recorded
+                    (see ``mutatest.profiling``). Stats of worker processes are merged into it.
+                    Recording applies to the whole process, so only one test at a time should
+                    record stats.
+
+                    ``seed_per_case`` (``bool``): if True (default), each test case is mutated with
+                    its own seed, derived from ``random_seed`` and its sentence (see
+                    ``checkpoint.case_seed``), so that the variants of a sentence do not depend on
+                    the other sentences of the run. If False, all test cases use ``random_seed``,
+                    as they did before per-case seeds, e.g. to reproduce the variants of an older
+                    run.
+
+                    ``shard_index`` (``int``), ``shard_count`` (``int``): to split a run over
+                    several machines, each runs the test with the same sentences and the same
+                    ``shard_count``, but its own ``shard_index``. Each then only runs the test cases
+                    of its shard, which are chosen by a hash of their sentence. See
+                    ``mutatest.sharding`` to merge the results of all shards.
+
+                    ``model_cache`` (``ModelOutputCache``): if given, the model is run once per
+                    distinct sentence, in this process, on the sentences of many test cases at a
+                    time (in batches of ``batch_size`` with a batch model callback), and outputs
+                    that are cached, e.g. by an earlier run, are not computed again
         """
-        self.test_cases = [MutamorphicTestCase(x) for x in input_sentences]
+        assert model_callback is not None or batch_model_callback is not None, \
+            "Either a model callback or a batch model callback is needed."
+        assert batch_size > 0, "The batch size should be positive."
+        assert 0 <= shard_index < shard_count, "The shard index should be below the shard count."
+
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.test_cases = [MutamorphicTestCase(x) for x in input_sentences if self._in_shard(x)]
         self.mutator = mutator
         self.model_callback = model_callback
         self.similarity_callback = similarity_callback
         self.random_seed = random_seed
+        self.batch_model_callback = batch_model_callback
+        self.batch_size = batch_size
+        self.run_stats = run_stats
+        self.seed_per_case = seed_per_case
+        self.model_cache = model_cache
+        self.similarities = np.empty(0)
+        self.case_offsets = np.zeros(1, dtype=int)
+        self._average_similarity: float | None = None
 
-    def run(self):
+    def run(self,
+            workers: int = 1,
+            backend: str = "process",
+            checkpoint_path: Optional[str] = None,
+            resume: bool = True,
+            checkpoint_every: int = 1000,
+            early_stopping: Optional[EarlyStopping] = None):
         """
-        TODO comment
+        Computes the variants, model outputs and similarities of all test cases.
+
+                Parameters:
+                    ``workers`` (``int``): the number of test cases that are run in parallel
+
+                    ``backend`` (``str``): either "process" (default) or "thread". With the process
+                    backend, the mutator and callbacks must be picklable (e.g. module-level
+                    functions). With mutators that preprocess sentences, like the built-in ones,
+                    each worker loads the NLTK resources once when it starts.
+
+                    ``checkpoint_path`` (``str``): optional location of an append-only file to
+                    which completed test cases are saved, every ``checkpoint_every`` test cases
+
+                    ``resume`` (``bool``): if True (default), test cases found in the checkpoint
+                    file for the same sentence, random seed and mutator configuration are not run
+                    again. Their variants and model outputs are restored, and only their
+                    similarities are recomputed, so the similarity callback can be changed between
+                    runs. Checkpoints do not identify the model, so use a new checkpoint file when
+                    the model changes. If False, the checkpoint file is started anew.
+
+                    ``early_stopping`` (``EarlyStopping``): if given, variants are evaluated
+                    incrementally, and the evaluation of a test case stops early, e.g. once the
+                    mean of its similarities is known precisely enough (see
+                    ``mutatest.early_stopping``). The model is then run in this process, in rounds
+                    over all test cases that are still evaluated, which are batched with a batch
+                    model callback. Variants that were not evaluated are removed from the test
+                    cases, and each test case records its ``stop_reason``. Cannot be combined with
+                    checkpoints.
+
+        Results do not depend on the number of workers, because the random seed of every test case
+        only depends on its sentence. With a batch model callback, only the variants are computed by
+        the workers, and the model is run on batches in this process. Likewise, built-in vectorized
+        similarity metrics are computed in this process, for all test cases at once.
+        """
+        if early_stopping is not None:
+            assert checkpoint_path is None, "Early stopping cannot be combined with checkpoints."
+
+            with _create_executor(workers, backend, self.mutator) as executor:
+                self._run_adaptively(executor, workers, early_stopping)
+            return
+
+        if checkpoint_path is None:
+            with _create_executor(workers, backend, self.mutator) as executor:
+                self.test_cases, similarities = self._run_test_cases(self.test_cases, executor,
+                                                                     workers)
+
+            self._store_similarities(similarities)
+            return
+
+        assert checkpoint_every > 0, "The checkpoint interval should be positive."
+
+        checkpoint = CheckpointFile(checkpoint_path, resume=resume)
+        mutator_config = describe_config(self.mutator.config)
+        seeds = [self.case_seed(x.input_sentence) for x in self.test_cases]
+        keys = [case_key(x.input_sentence, seed, mutator_config)
+                for x, seed in zip(self.test_cases, seeds)]
+
+        restored = []
+        remaining = []
+        for index, (test_case, key) in enumerate(zip(self.test_cases, keys)):
+            record = checkpoint.get(key)
+            if record is None:
+                remaining.append(index)
+            else:
+                test_case.variants = record["variants"]
+                test_case.set_model_outputs([record["output_original"]] + record["output_variants"])
+                restored.append(test_case)
+
+        with _create_executor(workers, backend, self.mutator) as executor:
+            for start in range(0, len(remaining), checkpoint_every):
+                indices = remaining[start:start + checkpoint_every]
+                test_cases, _ = self._run_test_cases([self.test_cases[i] for i in indices],
+                                                     executor, workers)
+
+                for index, test_case in zip(indices, test_cases):
+                    self.test_cases[index] = test_case
+
+                checkpoint.append(_checkpoint_record(x, keys[i], seeds[i], mutator_config)
+                                  for i, x in zip(indices, test_cases))
+
+        self._compute_similarities(restored)
+        similarities = np.concatenate([np.empty(0)] + [x.similarities for x in self.test_cases])
+        self._store_similarities(_share_similarities(self.test_cases, similarities))
+
+    def stream(self,
+               input_sentences: Iterable[Union[str, PreprocessedSentence]],
+               chunk_size: int = 1000,
+               workers: int = 1,
+               backend: str = "process",
+               histogram_bins: Optional[np.ndarray] = None) -> Iterator[MutamorphicTestCase]:
         """
-        for test_case in self.test_cases:
-            test_case.compute_variants(mutator=self.mutator, random_seed=self.random_seed)
-            test_case.compute_model_outputs(self.model_callback)
-            test_case.compute_similarities(self.similarity_callback)
+        Runs the test on a (possibly very long) stream of sentences, ``chunk_size`` sentences at a
+        time, and yields every test case once it is completed. Completed test cases are not kept,
+        so memory use does not grow with the number of sentences. Instead, running aggregates of
+        the similarities are kept in ``stats``. ``self.test_cases`` is not used, and only the
+        sentences of this test's shard are run.
+
+                Parameters:
+                    ``input_sentences`` (``Iterable[str]``): the input sentences, e.g. the lines of
+                    a file
+
+                    ``chunk_size`` (``int``): the number of test cases run together, which bounds
+                    the batches for batch model callbacks and vectorized similarity metrics
+
+                    ``workers`` (``int``), ``backend`` (``str``): see ``run``
+
+                    ``histogram_bins`` (``np.ndarray``): the bin edges of the similarity histogram
+                    in ``stats``, 10 equal bins between 0 and 1 by default
+
+                Returns:
+                    An iterator over the completed test cases, in input order.
+        """
+        assert chunk_size > 0, "The chunk size should be positive."
+
+        self.stats = RunningSimilarityStats(histogram_bins)
+        sentences = (x for x in input_sentences if self._in_shard(x))
+
+        with _create_executor(workers, backend, self.mutator) as executor:
+            while True:
+                chunk = [MutamorphicTestCase(x) for x in islice(sentences, chunk_size)]
+                if len(chunk) == 0:
+                    return
+
+                chunk, similarities = self._run_test_cases(chunk, executor, workers)
+                self.stats.update(similarities, [len(x.similarities) for x in chunk])
+
+                yield from chunk
+
+    def _run_test_cases(self,
+                        test_cases: List[MutamorphicTestCase],
+                        executor: Optional[Executor],
+                        workers: int = 1) \
+            -> Tuple[List[MutamorphicTestCase], np.ndarray]:
+        """
+        Computes the variants, model outputs and similarities of the given test cases, in the
+        executor of ``workers`` workers if there is one.
+
+                Returns:
+                    The completed test cases (which are copies if they were run in other
+                    processes), and their similarities as one contiguous array. Each test case
+                    holds its slice of that array.
+        """
+        vectorized = isinstance(self.similarity_callback, str)
+        model_callback = self.model_callback \
+            if self.batch_model_callback is None and self.model_cache is None else None
+        similarity_callback = None if vectorized or model_callback is None \
+            else self.similarity_callback
+
+        with profiling.recording(self.run_stats):
+            test_cases = self._map_test_cases(partial(_run_test_case,
+                                                      mutator=self.mutator,
+                                                      model_callback=model_callback,
+                                                      similarity_callback=similarity_callback,
+                                                      record_stats=self._records_worker_stats(
+                                                          executor)),
+                                              test_cases,
+                                              [self.case_seed(x.input_sentence)
+                                               for x in test_cases],
+                                              executor, workers)
+
+            if model_callback is None:
+                self._compute_model_outputs(test_cases)
+
+            return test_cases, self._compute_similarities(test_cases,
+                                                          computed=similarity_callback is not None)
+
+    def _run_adaptively(self,
+                        executor: Optional[Executor],
+                        workers: int,
+                        early_stopping: EarlyStopping):
+        """
+        Computes the variants of all test cases, and then evaluates them in rounds until the
+        evaluation of every test case stopped (see ``EarlyStopping``).
+        """
+        with profiling.recording(self.run_stats):
+            self.test_cases = self._map_test_cases(
+                partial(_run_test_case, mutator=self.mutator, model_callback=None,
+                        similarity_callback=None,
+                        record_stats=self._records_worker_stats(executor)),
+                self.test_cases, [self.case_seed(x.input_sentence) for x in self.test_cases],
+                executor, workers)
+
+            test_cases = self.test_cases
+            budget = math.inf if early_stopping.max_model_calls is None \
+                else early_stopping.max_model_calls
+            outputs: List[List[ModelOutput]] = [[] for _ in test_cases]
+            similarities: List[List[float]] = [[] for _ in test_cases]
+
+            # Test cases without variants do not need the model.
+            active = []
+            for index, test_case in enumerate(test_cases):
+                if len(test_case.variants) == 0:
+                    test_case.stop_reason = stopping.EXHAUSTED
+                else:
+                    active.append(index)
+
+            # Every test case gets its input sentence and first variants evaluated, so that it has
+            # a similarity at all.
+            first_round_calls = sum(1 + min(early_stopping.min_variants,
+                                            len(test_cases[index].variants))
+                                    for index in active)
+            assert budget >= first_round_calls, \
+                f"The budget of {budget} model calls does not cover the first round, which " \
+                f"needs {first_round_calls}."
+
+            first_round = True
+            while len(active) > 0:
+                # After the first round, the budget that is left is split evenly over the test
+                # cases that are still evaluated (the first ones get the remainder).
+                share, remainder = (math.inf, 0) if math.isinf(budget) or first_round \
+                    else divmod(budget, len(active))
+
+                # The variants (and, in the first round, input sentences) evaluated this round, with
+                # their test case and whether they are its input sentence.
+                requests: List[Tuple[int, str, bool]] = []
+                for position, index in enumerate(active):
+                    test_case = test_cases[index]
+                    evaluated = max(len(outputs[index]) - 1, 0)
+                    count = early_stopping.min_variants if first_round else early_stopping.step
+                    count = min(count, len(test_case.variants) - evaluated,
+                                share + (position < remainder))
+                    if count <= 0:
+                        test_case.stop_reason = stopping.BUDGET
+                        continue
+
+                    if first_round:
+                        requests.append((index, test_case.input_sentence, True))
+                    requests.extend((index, x, False)
+                                    for x in test_case.variants[evaluated:evaluated + count])
+                    budget -= count + first_round
+
+                self._evaluate_round(requests, outputs, similarities)
+
+                remaining = []
+                for index in active:
+                    test_case = test_cases[index]
+                    if test_case.stop_reason is not None:
+                        continue
+
+                    test_case.stop_reason = early_stopping.stop_reason(similarities[index])
+                    if test_case.stop_reason is None and \
+                            len(outputs[index]) == 1 + len(test_case.variants):
+                        test_case.stop_reason = stopping.EXHAUSTED
+                    if test_case.stop_reason is None:
+                        remaining.append(index)
+
+                active = remaining
+                first_round = False
+
+            for test_case, case_outputs in zip(test_cases, outputs):
+                num_evaluated = max(len(case_outputs) - 1, 0)
+                profiling.count("variants_not_evaluated", len(test_case.variants) - num_evaluated)
+                test_case.variants = test_case.variants[:num_evaluated]
+                if len(case_outputs) > 0:
+                    test_case.set_model_outputs(case_outputs)
+                else:
+                    test_case.output_variants = []
+
+            self._store_similarities(_share_similarities(
+                test_cases, [x for case_similarities in similarities for x in case_similarities]))
+
+    def _evaluate_round(self,
+                        requests: List[Tuple[int, str, bool]],
+                        outputs: List[List[ModelOutput]],
+                        similarities: List[List[float]]):
+        """
+        Runs the model on the sentences of a round of adaptive evaluation, given with the index of
+        their test case and whether they are its input sentence, and adds their outputs and
+        similarities to those of their test case. Input sentences come before their variants.
+        """
+        round_outputs = self._run_model([sentence for _, sentence, _ in requests])
+
+        # The outputs of the variants, and the output of the input sentence of their test case.
+        compared: List[Tuple[int, ModelOutput, ModelOutput]] = []
+        for (index, _, is_original), output in zip(requests, round_outputs):
+            if not is_original:
+                compared.append((index, outputs[index][0], output))
+            outputs[index].append(output)
+
+        if len(compared) == 0:
+            return
+
+        with profiling.stage("similarity"):
+            if isinstance(self.similarity_callback, str):
+                metric = get_similarity_metric(self.similarity_callback)
+                round_similarities = metric(np.asarray([x[1] for x in compared]),
+                                            np.asarray([x[2] for x in compared])).tolist()
+            else:
+                round_similarities = [self.similarity_callback(original, output)
+                                      for _, original, output in compared]
+
+        for (index, _, _), similarity in zip(compared, round_similarities):
+            similarities[index].append(similarity)
+
+    def _compute_model_outputs(self, test_cases: List[MutamorphicTestCase]):
+        """
+        Runs the model on the model inputs of all test cases at once, and hands the outputs back
+        to the test cases they belong to.
+        """
+        outputs = self._run_model([x for test_case in test_cases for x in test_case.model_inputs])
+
+        offset = 0
+        for test_case in test_cases:
+            num_inputs = 1 + len(test_case.variants)
+            test_case.set_model_outputs(outputs[offset:offset + num_inputs])
+            offset += num_inputs
+
+    def _run_model(self, sentences: List[str]) -> List[ModelOutput]:
+        """
+        Runs the model on sentences, in batches with a batch model callback, and only on the
+        sentences without a cached output with a model cache.
+        """
+        def compute(inputs: List[str]) -> List[ModelOutput]:
+            if self.batch_model_callback is None:
+                with profiling.stage("model_inference"):
+                    return [self.model_callback(x) for x in inputs]
+
+            return _run_batch_model(inputs, self.batch_model_callback, self.batch_size)
+
+        if self.model_cache is None:
+            return compute(sentences)
+
+        return self.model_cache.outputs(sentences, compute)
+
+    def _compute_similarities(self,
+                              test_cases: List[MutamorphicTestCase],
+                              computed: bool = False) -> np.ndarray:
+        """
+        Computes the similarities of test cases with model outputs, unless ``computed`` says the
+        test cases did so themselves, and returns them as one contiguous array, of which each test
+        case holds its slice.
+        """
+        with profiling.recording(self.run_stats):
+            if isinstance(self.similarity_callback, str):
+                with profiling.stage("similarity"):
+                    similarities = _compute_similarities_vectorized(test_cases,
+                                                                    self.similarity_callback)
+            else:
+                if not computed:
+                    for test_case in test_cases:
+                        test_case.compute_similarities(self.similarity_callback)
+                similarities = np.concatenate([np.empty(0)] + [x.similarities for x in test_cases])
+
+        return _share_similarities(test_cases, similarities)
+
+    def _store_similarities(self, similarities: np.ndarray):
+        """
+        Stores the similarities of all test cases as one contiguous array.
+        """
+        self.case_offsets = _case_offsets(self.test_cases)
+        self.similarities = similarities
+        self._average_similarity = None
+
+    def _map_test_cases(self,
+                        func: Callable[[MutamorphicTestCase, int], MutamorphicTestCase],
+                        test_cases: List[MutamorphicTestCase],
+                        seeds: List[int],
+                        executor: Optional[Executor],
+                        workers: int = 1) -> List[MutamorphicTestCase]:
+        """
+        Applies ``func`` to every test case and its random seed, in the executor of ``workers``
+        workers if there is one.
+        """
+        if executor is None:
+            return [func(test_case, seed) for test_case, seed in zip(test_cases, seeds)]
+
+        chunksize = max(1, len(test_cases) // (4 * workers))
+        results = list(executor.map(func, test_cases, seeds, chunksize=chunksize))
+
+        if isinstance(executor, ProcessPoolExecutor):
+            # Workers ran on copies of the test cases and of the mutator. Like in this process,
+            # only mutators that count their sentences without variants are counted for.
+            if hasattr(self.mutator, "non_mutated"):
+                self.mutator.non_mutated += sum(1 for x in results if len(x.variants) == 0)
+
+            for test_case in results:
+                self._merge_worker_stats(test_case)
+
+        return results
+
+    def case_seed(self, sentence: str) -> int:
+        """
+        The random seed with which the test case of a sentence is mutated.
+        """
+        return case_seed(self.random_seed, sentence) if self.seed_per_case else self.random_seed
+
+    def _in_shard(self, sentence: Union[str, PreprocessedSentence]) -> bool:
+        if self.shard_count == 1:
+            return True
+
+        if isinstance(sentence, PreprocessedSentence):
+            sentence = sentence.sentence
+
+        return shard_of(sentence, self.shard_count) == self.shard_index
+
+    def _records_worker_stats(self, executor: Optional[Executor]) -> bool:
+        """
+        Whether test cases should record their own stats, because they are run in worker processes
+        while this test records stats.
+        """
+        return self.run_stats is not None and isinstance(executor, ProcessPoolExecutor)
+
+    def _merge_worker_stats(self, test_case: MutamorphicTestCase):
+        """
+        Merges the stats that a worker process recorded while running a test case.
+        """
+        if test_case._worker_stats is not None:
+            if self.run_stats is not None:
+                self.run_stats.merge(test_case._worker_stats)
+            test_case._worker_stats = None
 
     @property
     def average_similarity(self) -> float:
-        return np.average([x.average_similarity for x in self.test_cases])
+        """
+        The average over all test cases of their average similarity.
+        """
+        if self._average_similarity is None:
+            counts = np.diff(self.case_offsets)
+            case_indices = np.repeat(np.arange(len(counts)), counts)
+            sums = np.bincount(case_indices, weights=self.similarities, minlength=len(counts))
+
+            # Like the average of an empty test case, the average of nothing is NaN.
+            with np.errstate(divide="ignore", invalid="ignore"):
+                self._average_similarity = np.average(sums / counts)
+
+        return self._average_similarity
+
+
+def _run_test_case(test_case: MutamorphicTestCase,
+                   random_seed: int,
+                   mutator: Mutator,
+                   model_callback: Optional[Callable[[str], ModelOutput]],
+                   similarity_callback: Optional[Callable[[ModelOutput, ModelOutput], float]],
+                   record_stats: bool = False) -> MutamorphicTestCase:
+    """
+    Computes the variants of a test case and, if the callbacks are given, its model outputs and
+    similarities. With ``record_stats``, which is used in worker processes, the stats of the test
+    case are recorded on it, to be merged by the process that runs the test.
+    """
+    if record_stats:
+        with profiling.recording(RunStats()) as stats:
+            _run_test_case(test_case, random_seed, mutator, model_callback, similarity_callback)
+        test_case._worker_stats = stats
+        return test_case
+
+    test_case.compute_variants(mutator=mutator, random_seed=random_seed)
+
+    if model_callback is not None:
+        test_case.compute_model_outputs(model_callback)
+
+        if similarity_callback is not None:
+            test_case.compute_similarities(similarity_callback)
+
+    return test_case
+
+
+def _run_batch_model(inputs: List[str],
+                     batch_model_callback: Callable[[List[str]], List[ModelOutput]],
+                     batch_size: int) -> List[ModelOutput]:
+    """
+    Runs the model on sentences in batches of at most ``batch_size`` sentences.
+    """
+    outputs: List[ModelOutput] = []
+    for start in range(0, len(inputs), batch_size):
+        batch = inputs[start:start + batch_size]
+        with profiling.stage("model_inference"):
+            batch_outputs = batch_model_callback(batch)
+        assert len(batch_outputs) == len(batch), \
+            "The batch model callback should return one output per input sentence."
+        outputs.extend(batch_outputs)
+
+    return outputs
+
+
+def _compute_similarities_vectorized(test_cases: List[MutamorphicTestCase],
+                                     metric_name: str) -> np.ndarray:
+    """
+    Stacks the model outputs of all test cases into arrays, and compares every variant output to
+    the output of its input sentence with one call of a built-in similarity metric.
+    """
+    metric = get_similarity_metric(metric_name)
+
+    counts = [len(x.output_variants) for x in test_cases]
+    if sum(counts) == 0:
+        return np.empty(0)
+
+    originals = np.asarray([x.output_original for x in test_cases])
+    variants = np.asarray([output for x in test_cases for output in x.output_variants])
+    case_indices = np.repeat(np.arange(len(test_cases)), counts)
+
+    return metric(originals[case_indices], variants)
+
+
+def _initialize_worker(preprocesses: bool):
+    """
+    Loads the NLTK resources (tokenizer, tagger, stopwords and WordNet) once per worker, instead of
+    on the first test case it runs, if the mutator preprocesses sentences. Missing resources do not
+    break the pool: they are reported by the first test case that needs them.
+    """
+    if not preprocesses:
+        return
+
+    try:
+        sentence_preprocessing("Warm up the tagger")
+    except LookupError:
+        pass
+
+
+def _create_executor(workers: int,
+                     backend: str,
+                     mutator: Optional[Mutator] = None) -> ContextManager[Optional[Executor]]:
+    """
+    Creates a pool of ``workers`` workers, or a context without executor for a single worker.
+    Workers load the NLTK resources when they start if ``mutator`` preprocesses sentences, like the
+    built-in mutators do.
+    """
+    assert backend in EXECUTOR_BACKENDS, "Unknown executor backend."
+    assert workers > 0, "The number of workers should be positive."
+
+    if workers == 1:
+        return nullcontext()
+
+    preprocesses = mutator is not None and mutator.accepts_preprocessed
+
+    return EXECUTOR_BACKENDS[backend](max_workers=workers, initializer=_initialize_worker,
+                                      initargs=(preprocesses,))
+
+
+def _checkpoint_record(test_case: MutamorphicTestCase,
+                       key: str,
+                       random_seed: int,
+                       mutator_config: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "key": key,
+        "sentence_hash": sentence_hash(test_case.input_sentence),
+        "input_sentence": test_case.input_sentence,
+        "random_seed": random_seed,
+        "mutator_config": mutator_config,
+        "variants": test_case.variants,
+        "output_original": test_case.output_original,
+        "output_variants": test_case.output_variants,
+        "similarities": test_case.similarities.tolist(),
+    }
+
+
+def _case_offsets(test_cases: List[MutamorphicTestCase]) -> np.ndarray:
+    counts = [len(x.output_variants) for x in test_cases]
+    return np.concatenate([[0], np.cumsum(counts, dtype=int)])
+
+
+def _share_similarities(test_cases: List[MutamorphicTestCase],
+                        similarities: np.ndarray) -> np.ndarray:
+    """
+    Makes ``similarities`` (of all given test cases, in order) one contiguous array, and hands each
+    test case its slice of it.
+    """
+    similarities = np.ascontiguousarray(similarities, dtype=float)
+
+    offsets = _case_offsets(test_cases)
+    for test_case, start, end in zip(test_cases, offsets, offsets[1:]):
+        test_case.similarities = similarities[start:end]
+
+    return similarities
@@ -0,0 +1,269 @@
+"""
+A precompiled, memory-mappable index of WordNet variants.
+
+The index holds, for every WordNet lemma and every exception form (such as "geese" or "ran"), the
+synonym and hypernym counts that ``Word`` would compute by walking WordNet. It is built once with::
+
+    python -m mutatest.variant_index variants.idx
+
+and loaded with ``load_variant_index("variants.idx")`` or by setting the ``MUTATEST_VARIANT_INDEX``
+environment variable. Because the file is memory-mapped read-only, loading is nearly instant and
+its pages are shared by all worker processes on a machine.
+
+File layout (all integers little-endian):
+
+    magic (8 bytes) | number of entries n (uint64)
+    key offsets (uint64[n + 1]) | value offsets (uint64[n + 1]) | flags (uint8[n], padded to 8)
+    key table | value table
+
+Keys are "<pos>\\t<form>" in UTF-8, sorted bytewise, so that they can be binary searched. Values are
+"<variant>\\t<count>" lines. Counts are stored without removing the form itself, which is filtered
+out at lookup time, so one entry can answer lookups for the regular inflections of its form too.
+"""
+import argparse
+import mmap
+import os
+import struct
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from nltk.corpus.reader.wordnet import WordNetCorpusReader
+
+MAGIC = b"MTVIDX01"
+HEADER = struct.Struct("<8sQ")
+
+# The form is a WordNet lemma for at least one / every POS of its entry.
+FLAG_LEMMA_ANY = 1
+FLAG_LEMMA_ALL = 2
+# WordNet maps the form to itself only, so its synsets are exactly its own.
+FLAG_DIRECT = 4
+
+VARIANT_INDEX_PATH_ENV = "MUTATEST_VARIANT_INDEX"
+
+
+class VariantIndex:
+    """
+    Read-only view on a variant index file.
+
+            Attributes
+                    path (str): the location of the index file
+
+                    size (int): the number of (POS, form) entries in the index
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+        with open(path, "rb") as file:
+            self._buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.size = HEADER.unpack_from(self._buffer, 0)
+        assert magic == MAGIC, f"{path} is not a mutatest variant index."
+
+        offset = HEADER.size
+        self._key_offsets = np.frombuffer(self._buffer, dtype="<u8", count=self.size + 1,
+                                          offset=offset)
+        offset += 8 * (self.size + 1)
+        self._value_offsets = np.frombuffer(self._buffer, dtype="<u8", count=self.size + 1,
+                                            offset=offset)
+        offset += 8 * (self.size + 1)
+        self._flags = np.frombuffer(self._buffer, dtype=np.uint8, count=self.size, offset=offset)
+        offset += _padded(self.size)
+
+        self._keys_start = offset
+        self._values_start = offset + int(self._key_offsets[-1])
+
+    def lookup(self, value: str, pos: str) -> Optional[Dict[str, int]]:
+        """
+        Returns the variants of a lowercased word for a WordNet POS (e.g. "n" or "as"), in the shape
+        returned by ``Word._get_variations``. Returns ``None`` if the index cannot answer the lookup
+        exactly, in which case WordNet should be consulted.
+        """
+        entry = self._find(pos, value)
+        if entry is not None:
+            return self._variants(entry, exclude=value)
+
+        # Like WordNet's morphy, reduce the word to base forms with the regular suffix rules.
+        forms_per_pos = [_base_forms(value, p) for p in pos]
+        candidates = {}
+        for form in set().union(*forms_per_pos):
+            candidate = self._find(pos, form)
+            if candidate is not None and self._flags[candidate] & FLAG_LEMMA_ANY:
+                candidates[form] = candidate
+
+        if len(candidates) == 0:
+            return dict()
+
+        if len(candidates) == 1:
+            form, candidate = next(iter(candidates.items()))
+            exact = FLAG_LEMMA_ALL | FLAG_DIRECT
+            if self._flags[candidate] & exact == exact and all(form in x for x in forms_per_pos):
+                return self._variants(candidate, exclude=value)
+
+        return None
+
+    def _find(self, pos: str, form: str) -> Optional[int]:
+        target = f"{pos}\t{form}".encode()
+        low, high = 0, self.size
+
+        while low < high:
+            middle = (low + high) // 2
+            key = self._key(middle)
+            if key < target:
+                low = middle + 1
+            elif key > target:
+                high = middle
+            else:
+                return middle
+
+        return None
+
+    def _key(self, entry: int) -> bytes:
+        start = self._keys_start + int(self._key_offsets[entry])
+        end = self._keys_start + int(self._key_offsets[entry + 1])
+        return self._buffer[start:end]
+
+    def _variants(self, entry: int, exclude: str) -> Dict[str, int]:
+        start = self._values_start + int(self._value_offsets[entry])
+        end = self._values_start + int(self._value_offsets[entry + 1])
+
+        result: Dict[str, int] = dict()
+        if start == end:
+            return result
+
+        for line in self._buffer[start:end].decode().split("\n"):
+            variant, count = line.split("\t")
+            if variant.lower() != exclude:
+                result[variant] = int(count)
+
+        return result
+
+    def close(self):
+        # The offset arrays are views on the buffer and must be released before it is closed.
+        del self._key_offsets, self._value_offsets, self._flags
+        self._buffer.close()
+
+    def __len__(self) -> int:
+        return self.size
+
+
+def _padded(size: int) -> int:
+    return (size + 7) // 8 * 8
+
+
+def _base_forms(form: str, pos: str) -> List[str]:
+    return [form[:-len(old)] + new
+            for old, new in WordNetCorpusReader.MORPHOLOGICAL_SUBSTITUTIONS[pos]
+            if form.endswith(old)]
+
+
+def write_variant_index(path: str, entries: Iterable[Tuple[str, str, int, Dict[str, int]]]):
+    """
+    Writes a variant index file.
+
+            Parameters:
+                ``path`` (``str``): the location of the index file
+
+                ``entries`` (``Iterable[Tuple[str, str, int, Dict[str, int]]]``): tuples of a WordNet
+                POS, a lowercased form, the ``FLAG_*`` bits of the form, and the unfiltered variant
+                counts of the form
+    """
+    records = sorted((f"{pos}\t{form}".encode(), flags,
+                      "\n".join(f"{variant}\t{count}" for variant, count in variants.items()).encode())
+                     for pos, form, flags, variants in entries)
+
+    key_offsets = np.zeros(len(records) + 1, dtype="<u8")
+    value_offsets = np.zeros(len(records) + 1, dtype="<u8")
+    key_offsets[1:] = np.cumsum([len(key) for key, _, _ in records], dtype=np.uint64)
+    value_offsets[1:] = np.cumsum([len(value) for _, _, value in records], dtype=np.uint64)
+    flags = np.zeros(_padded(len(records)), dtype=np.uint8)
+    flags[:len(records)] = [flag for _, flag, _ in records]
+
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, len(records)))
+        file.write(key_offsets.tobytes())
+        file.write(value_offsets.tobytes())
+        file.write(flags.tobytes())
+        for key, _, _ in records:
+            file.write(key)
+        for _, _, value in records:
+            file.write(value)
+
+
+def build_variant_index(path: str) -> int:
+    """
+    Walks all of WordNet and writes the variants of every lemma and exception form, for every POS
+    used by ``Word``, to a variant index file.
+
+            Parameters:
+                ``path`` (``str``): the location of the index file
+
+            Returns:
+                The number of entries written.
+    """
+    from nltk.corpus import wordnet as wn
+    from .Word import POS_TAG_MAP, Word
+
+    wn.ensure_loaded()
+
+    def entries():
+        for pos in sorted({''.join(x) for x in POS_TAG_MAP.values()}):
+            forms = set()
+            for p in pos:
+                forms.update(wn.all_lemma_names(pos=p))
+                forms.update(wn._exception_map[p].keys())
+
+            for form in forms:
+                is_lemma = [p in wn._lemma_pos_offset_map.get(form, {}) for p in pos]
+                flags = (FLAG_LEMMA_ANY * any(is_lemma)
+                         | FLAG_LEMMA_ALL * all(is_lemma)
+                         | FLAG_DIRECT * all(wn._morphy(form, p) == [form] for p in pos))
+
+                synsets = wn.synsets(form, pos=pos)
+                variants = Word._count_variants(Word.synonym_names(synsets),
+                                                Word.hypernym_names(synsets))
+
+                yield pos, form, flags, variants
+
+    records = list(entries())
+    write_variant_index(path, records)
+
+    return len(records)
+
+
+_variant_index: Optional[VariantIndex] = None
+_variant_index_loaded = False
+
+
+def load_variant_index(path: Optional[str]) -> Optional[VariantIndex]:
+    """
+    Makes ``Word`` answer variant lookups from the index file at ``path`` in this process. Passing
+    ``None`` unloads the index.
+    """
+    global _variant_index, _variant_index_loaded
+
+    _variant_index = None if path is None else VariantIndex(path)
+    _variant_index_loaded = True
+
+    return _variant_index
+
+
+def get_variant_index() -> Optional[VariantIndex]:
+    """
+    Returns the variant index loaded in this process, if any. Unless ``load_variant_index`` was
+    called, the index named by the ``MUTATEST_VARIANT_INDEX`` environment variable is loaded on
+    first use.
+    """
+    if not _variant_index_loaded:
+        return load_variant_index(os.environ.get(VARIANT_INDEX_PATH_ENV))
+
+    return _variant_index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute the WordNet variants of every lemma.")
+    parser.add_argument("path", help="location of the index file to write")
+    args = parser.parse_args()
+
+    count = build_variant_index(args.path)
+    print(f"Wrote {count} entries to {args.path}")
@@ -0,0 +1,290 @@
+"""
+Sources of the variants of words. ``Word`` asks a variant source for the variants of each word:
+WordNet synonyms and hypernyms by default (``Word.WordNetVariantSource``), or e.g. the nearest
+neighbors of the word in an embedding matrix (``EmbeddingVariantSource``), for vocabularies that
+WordNet covers poorly::
+
+    from mutatest.variant_sources import EmbeddingVariantSource, configure_variant_source
+
+    configure_variant_source(EmbeddingVariantSource("vectors.npy", "vocabulary.txt", k=10))
+
+Sources are registered by name. Words are shared per (value, part-of-speech tag, source), and
+pickled words (e.g. sent to worker processes) carry their variants and the name of their source, so
+the source itself does not need to be available where they are unpickled.
+"""
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from . import profiling
+
+
+class VariantSource(ABC):
+    """
+    Suggests the variants of words, with a score per variant (higher is better), in the shape of
+    ``Word.variants``.
+
+            Attributes
+                    name (str): identifies the source and its parameters, e.g. in the keys of
+                    shared words and of cached mutation results
+    """
+
+    name: str
+
+    @abstractmethod
+    def lookup(self, value: str, pos_tag: str) -> Dict[str, int]:
+        """
+        Returns the variants of a lowercased word with a WordNet part-of-speech tag (e.g. "n" or
+        "as"), and their scores.
+        """
+        raise NotImplementedError()
+
+    def lookup_many(self, queries: List[Tuple[str, str]]) -> List[Dict[str, int]]:
+        """
+        Same as ``lookup``, for many (value, part-of-speech tag) pairs at once. Sources that can
+        answer a batch faster than one word at a time override this.
+        """
+        return [self.lookup(value, pos_tag) for value, pos_tag in queries]
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        """
+        The name and parameters of this source, which determine the variants it suggests, e.g. in
+        the configuration of the mutators that use it.
+        """
+        return {"name": self.name}
+
+    def __repr__(self):
+        return f"{type(self).__name__}(\"{self.name}\")"
+
+
+_sources: Dict[str, VariantSource] = dict()
+_default_source = "wordnet"
+
+
+def register_variant_source(source: VariantSource):
+    """
+    Makes a source available by its name, e.g. to ``Word`` and ``preprocess_sentences``.
+    """
+    _sources[source.name] = source
+
+
+def configure_variant_source(source: Union[str, VariantSource]) -> VariantSource:
+    """
+    Makes a source (or the registered source with the given name) the default source of this
+    process, which is used unless another source is asked for. Other processes, such as worker
+    processes that were not forked from this one, keep their own default.
+
+            Returns:
+                The new default source.
+    """
+    global _default_source
+
+    source = get_variant_source(source)
+    _default_source = source.name
+
+    return source
+
+
+def get_variant_source(source: Union[None, str, VariantSource] = None) -> VariantSource:
+    """
+    Returns the default source for None, the registered source for a name, or the given source,
+    which is registered if it was not yet.
+    """
+    if isinstance(source, VariantSource):
+        if _sources.get(source.name) is not source:
+            register_variant_source(source)
+        return source
+
+    if source is None:
+        source = _default_source
+
+    if source not in _sources and source == "wordnet":
+        # The WordNet source is registered when ``Word`` is imported.
+        from . import Word  # noqa: F401
+
+    assert source in _sources, f"Unknown variant source: {source}."
+
+    return _sources[source]
+
+
+class EmbeddingVariantSource(VariantSource):
+    """
+    Suggests the ``k`` nearest neighbors of a word in an embedding matrix, by cosine similarity,
+    as its variants. The matrix is memory-mapped, so it is neither loaded nor copied into each
+    process, and a batch of words is answered with one matrix product per block of the matrix,
+    instead of a lookup per word. Words that are not in the vocabulary have no variants, and the
+    part-of-speech tag is not used.
+
+    Scores are the similarities multiplied by ``score_scale`` and rounded, so that, like the counts
+    of WordNet suggestions, they rank the variants of a word for the "most_common_first" selection
+    strategy.
+    """
+
+    def __init__(self,
+                 vectors_path: str,
+                 vocabulary_path: str,
+                 k: int = 10,
+                 min_similarity: float = 0.0,
+                 score_scale: int = 100,
+                 block_size: int = 65536,
+                 name: Optional[str] = None):
+        """
+                Parameters:
+                    ``vectors_path`` (``str``): a ``.npy`` file with a (vocabulary size, dimension)
+                    matrix, with the vector of the i-th vocabulary entry in row i
+
+                    ``vocabulary_path`` (``str``): a text file with one vocabulary entry per line.
+                    Underscores in entries are replaced by spaces in variants, like in WordNet
+                    lemma names.
+
+                    ``k`` (``int``): the maximum number of variants per word
+
+                    ``min_similarity`` (``float``): neighbors with a lower cosine similarity are
+                    not suggested
+
+                    ``score_scale`` (``int``): the score of a variant with similarity 1
+
+                    ``block_size`` (``int``): the number of rows of the matrix that are compared
+                    to a batch at a time, which bounds the memory used by a lookup
+
+                    ``name`` (``str``): the name of the source, by default made of the paths and
+                    parameters
+        """
+        assert k > 0, "The number of neighbors should be positive."
+        assert block_size > 0, "The block size should be positive."
+
+        self.vectors_path = vectors_path
+        self.vocabulary_path = vocabulary_path
+        self.k = k
+        self.min_similarity = min_similarity
+        self.score_scale = score_scale
+        self.block_size = block_size
+        self.name = name if name is not None else \
+            f"embedding:{os.path.abspath(vectors_path)}:{os.path.abspath(vocabulary_path)}:" \
+            f"k={k},min_similarity={min_similarity},score_scale={score_scale}"
+
+        self.vectors: np.ndarray = np.load(vectors_path, mmap_mode="r")
+        assert self.vectors.ndim == 2, "The embedding matrix should have two dimensions."
+
+        with open(vocabulary_path, encoding="utf-8") as file:
+            self.vocabulary = [line.rstrip("\n") for line in file]
+        assert len(self.vocabulary) == len(self.vectors), \
+            "The vocabulary should have an entry per row of the embedding matrix."
+
+        # Words are looked up lowercased, and entries that only differ in case are the same word.
+        self._ids: Dict[str, int] = dict()
+        for index, entry in enumerate(self.vocabulary):
+            self._ids.setdefault(entry.lower(), index)
+
+        self._inverse_norms: Optional[np.ndarray] = None
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        # A custom name need not describe the parameters.
+        return {"name": self.name,
+                "vectors_path": os.path.abspath(self.vectors_path),
+                "vocabulary_path": os.path.abspath(self.vocabulary_path),
+                "k": self.k,
+                "min_similarity": self.min_similarity,
+                "score_scale": self.score_scale}
+
+    def lookup(self, value: str, pos_tag: str) -> Dict[str, int]:
+        return self.lookup_many([(value, pos_tag)])[0]
+
+    def lookup_many(self, queries: List[Tuple[str, str]]) -> List[Dict[str, int]]:
+        results: List[Dict[str, int]] = [dict() for _ in queries]
+
+        rows = [i for i, (value, _) in enumerate(queries) if value in self._ids]
+        if len(rows) == 0:
+            return results
+
+        with profiling.stage("embedding_lookup"):
+            ids = np.array([self._ids[queries[i][0]] for i in rows])
+            inverse_norms = self._get_inverse_norms()
+            batch = np.asarray(self.vectors[ids], dtype=np.float32) * inverse_norms[ids, None]
+
+            neighbor_ids, similarities = self._nearest_neighbors(batch)
+
+        for row, query_id, neighbors, scores in zip(rows, ids, neighbor_ids, similarities):
+            variants = results[row]
+            for neighbor, similarity in zip(neighbors, scores):
+                if len(variants) == self.k or similarity < self.min_similarity:
+                    break
+
+                # Skips the word itself, also when it differs in case.
+                entry = self.vocabulary[neighbor]
+                variant = entry.replace("_", " ")
+                if self._ids[entry.lower()] != query_id and variant not in variants:
+                    variants[variant] = max(1, int(round(float(similarity) * self.score_scale)))
+
+        return results
+
+    def _nearest_neighbors(self, batch: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the nearest neighbors of each (normalized) vector of a batch, block by block of the
+        matrix, keeping only the best candidates of the blocks so far.
+
+                Returns:
+                    For each vector, the ids and cosine similarities of its neighbors, by
+                    decreasing similarity. The vector's own entry may be among them.
+        """
+        # The word itself, and entries that only differ in case, are found and skipped.
+        num_candidates = min(2 * self.k + 1, len(self.vectors))
+        inverse_norms = self._get_inverse_norms()
+
+        best_ids = np.empty((len(batch), 0), dtype=np.int64)
+        best_scores = np.empty((len(batch), 0), dtype=np.float32)
+        for start in range(0, len(self.vectors), self.block_size):
+            block = np.asarray(self.vectors[start:start + self.block_size], dtype=np.float32)
+            scores = (batch @ block.T) * inverse_norms[start:start + len(block)]
+
+            if scores.shape[1] > num_candidates:
+                top = _top(scores, num_candidates)
+                scores = np.take_along_axis(scores, top, axis=1)
+            else:
+                top = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+
+            best_ids = np.concatenate([best_ids, top + start], axis=1)
+            best_scores = np.concatenate([best_scores, scores], axis=1)
+
+            if best_ids.shape[1] > num_candidates:
+                top = _top(best_scores, num_candidates)
+                best_ids = np.take_along_axis(best_ids, top, axis=1)
+                best_scores = np.take_along_axis(best_scores, top, axis=1)
+
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+
+        return np.take_along_axis(best_ids, order, axis=1), \
+            np.take_along_axis(best_scores, order, axis=1)
+
+    def _get_inverse_norms(self) -> np.ndarray:
+        """
+        The inverse norm of every row of the matrix, computed block by block on first use. Rows
+        of zeros get 0, so that they are never similar to anything.
+        """
+        if self._inverse_norms is None:
+            norms = np.concatenate([
+                np.linalg.norm(np.asarray(self.vectors[start:start + self.block_size],
+                                          dtype=np.float32), axis=1)
+                for start in range(0, len(self.vectors), self.block_size)])
+
+            with np.errstate(divide="ignore"):
+                self._inverse_norms = np.where(norms > 0, 1 / norms, 0).astype(np.float32)
+
+        return self._inverse_norms
+
+    def __reduce__(self):
+        # Copies, e.g. in worker processes, map the matrix again instead of copying it.
+        return EmbeddingVariantSource, (self.vectors_path, self.vocabulary_path, self.k,
+                                        self.min_similarity, self.score_scale, self.block_size,
+                                        self.name)
+
+
+def _top(scores: np.ndarray, count: int) -> np.ndarray:
+    """
+    The column indices of the ``count`` highest scores of each row, in no particular order.
+    """
+    return np.argpartition(-scores, count - 1, axis=1)[:, :count]
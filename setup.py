@@ -35,6 +35,9 @@ setup(
         'numpy',
         'nltk',
     ],
+    entry_points={
+        'console_scripts': ['mutatest=mutatest.cli:main'],
+    },
     python_requires='>=3.7',
     long_description=long_description,
     long_description_content_type="text/markdown",
@@ -0,0 +1,57 @@
+import random
+import sys
+import os
+from typing import List, Tuple
+sys.path.insert(0, os.getcwd())
+
+from mutatest.mutators import Mutator  # noqa: E402
+
+
+class SuffixMutator(Mutator):
+    """
+    A mutator that does not need NLTK resources: the variants of a sentence are the sentence
+    followed by " 0", " 1", and so on. Results are memoized like those of the built-in mutators
+    when the cache is enabled.
+
+            Attributes
+                    num_variants (int): the number of variants per sentence
+
+                    non_mutated (int): the number of sentences without variants
+
+                    computed (List[Tuple[str, int]]): the sentences whose variants were computed,
+                    with their random seed
+    """
+
+    def __init__(self, num_variants: int = 3):
+        self.num_variants = num_variants
+        self.non_mutated = 0
+        self.computed: List[Tuple[str, int]] = []
+
+    @property
+    def config(self):
+        return {"class": type(self).__name__, "num_variants": self.num_variants}
+
+    def mutate(self, input_sentence, random_seed=13):
+        return self._memoize(input_sentence, random_seed, False,
+                             lambda: self._compute([input_sentence], random_seed)[0])
+
+    def mutate_many(self, input_sentences, random_seed=13):
+        return self._memoize_many(list(input_sentences), random_seed, False,
+                                  lambda sentences: self._compute(sentences, random_seed))
+
+    def _compute(self, input_sentences, random_seed):
+        self.computed.extend((x, random_seed) for x in input_sentences)
+        if self.num_variants == 0:
+            self.non_mutated += len(input_sentences)
+
+        return [[f"{x} {i}" for i in range(self.num_variants)] for x in input_sentences]
+
+
+class NoiseMutator(Mutator):
+    """
+    A mutator whose variants, and their number (0 to 2), depend on the random seed.
+    """
+
+    def mutate(self, input_sentence, random_seed=13):
+        rng = random.Random(random_seed)
+        return [f"{input_sentence} {rng.random()}" for _ in range(rng.randrange(3))]
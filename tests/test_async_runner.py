@@ -0,0 +1,83 @@
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.getcwd())
+
+
+def test_async_runner():
+    from mutatest.async_runner import AsyncMutamorphicTest
+    from tests.helpers import SuffixMutator
+
+    class StubServer:
+        """
+        Behaves like a remote endpoint: every request takes a while, and the first request for each
+        sentence fails.
+        """
+
+        def __init__(self):
+            self.in_flight = 0
+            self.max_in_flight = 0
+            self.failed = set()
+
+        async def __call__(self, sentence):
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                await asyncio.sleep(0.01)
+                if sentence not in self.failed:
+                    self.failed.add(sentence)
+                    raise ConnectionError("Server busy")
+                return len(sentence)
+            finally:
+                self.in_flight -= 1
+
+    server = StubServer()
+    sentences = [f"sentence number {x}" for x in range(20)]
+    test = AsyncMutamorphicTest(sentences, SuffixMutator(), server,
+                                lambda a, b: 1.0 if a == b else 0.5,
+                                max_in_flight=8, retry_delay=0.001)
+    test.run()
+
+    assert server.max_in_flight == 8, "Requests should be issued concurrently, up to the limit."
+    assert len(test.similarities) == 60
+    assert all(x.output_original == len(x.input_sentence) for x in test.test_cases)
+    assert test.average_similarity == 0.5
+
+
+def test_async_runner_generates_variants_concurrently():
+    import threading
+    import time
+    from mutatest.async_runner import AsyncMutamorphicTest
+    from mutatest.profiling import RunStats
+    from tests.helpers import SuffixMutator
+
+    class SlowMutator(SuffixMutator):
+        def __init__(self):
+            super().__init__()
+            self._lock = threading.Lock()
+            self._running = 0
+            self.max_running = 0
+
+        def mutate(self, input_sentence, random_seed=13):
+            with self._lock:
+                self._running += 1
+                self.max_running = max(self.max_running, self._running)
+            time.sleep(0.01)
+            with self._lock:
+                self._running -= 1
+            return super().mutate(input_sentence, random_seed)
+
+    async def model(sentence):
+        await asyncio.sleep(0.001)
+        return len(sentence)
+
+    mutator = SlowMutator()
+    stats = RunStats()
+    test = AsyncMutamorphicTest([f"sentence {x}" for x in range(16)], mutator, model,
+                                lambda a, b: float(a == b), max_pending_cases=8, run_stats=stats)
+    test.run(workers=4)
+
+    assert mutator.max_running == 4, "Every worker of the executor should generate variants."
+    assert len(test.similarities) == 48
+    assert stats.stages["model_inference"].calls == 64
+    assert stats.stages["model_inference"].cpu_time == 0
@@ -0,0 +1,28 @@
+import sys
+import os
+sys.path.insert(0, os.getcwd())
+
+
+def test_benchmarks_run_on_a_tiny_corpus(tmp_path):
+    import json
+    from benchmarks.run import compare, main
+    from mutatest.cache import configure_variant_cache, get_variant_cache
+
+    path = str(tmp_path / "variants.sqlite")
+    cache = configure_variant_cache(maxsize=50, path=path)
+    output = tmp_path / "results.json"
+    try:
+        names = ["sentence_preprocessing", "replacement_random", "dropout_1"]
+        assert main([*names, "--sentences", "5", "--repeat", "1", "--output", str(output)]) == 0
+
+        # The benchmarks empty the configured variant cache, but do not replace it.
+        assert get_variant_cache() is cache
+        assert cache.memory.maxsize == 50 and len(cache.store) > 0
+    finally:
+        configure_variant_cache()
+
+    results = json.loads(output.read_text())
+    assert list(results["benchmarks"]) == names
+    assert results["corpus"]["num_sentences"] == 5
+    assert all(x["items"] == 5 and x["seconds"] > 0 for x in results["benchmarks"].values())
+    assert compare(results, results) == []
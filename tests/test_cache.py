@@ -0,0 +1,99 @@
+import sys
+import os
+sys.path.insert(0, os.getcwd())
+
+
+def test_lru_cache_evicts_least_recently_used():
+    from mutatest.cache import LRUCache
+
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert "b" not in cache, "The least recently used entry should have been evicted."
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.get("b") is None
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_tiered_cache_persists_between_instances(tmp_path):
+    from mutatest.cache import TieredCache, SQLiteStore
+
+    path = str(tmp_path / "variants.sqlite")
+
+    cache = TieredCache(maxsize=10, store=SQLiteStore(path, table="variants"))
+    cache.put("n:dog", {"canine": 2, "domestic dog": 1})
+    cache.store.close()
+
+    reopened = TieredCache(maxsize=10, store=SQLiteStore(path, table="variants"))
+    assert reopened.get("n:dog") == {"canine": 2, "domestic dog": 1}
+    assert reopened.get("n:cat") is None
+    assert reopened.store_hits == 1
+
+
+def test_unused_stores_are_freed(tmp_path):
+    import gc
+    import weakref
+    from mutatest.cache import SQLiteStore
+
+    path = str(tmp_path / "variants.sqlite")
+    store = SQLiteStore(path, table="variants")
+    store.put("n:dog", {"canine": 2})
+    reference = weakref.ref(store)
+
+    # Buffered writes are committed when the store is freed, not only at exit.
+    del store
+    gc.collect()
+    assert reference() is None
+    assert SQLiteStore(path, table="variants").get("n:dog") == {"canine": 2}
+
+
+def test_mutator_result_cache(tmp_path):
+    import pickle
+    from tests.helpers import SuffixMutator
+
+    mutator = SuffixMutator(num_variants=1)
+    mutator.enable_cache(maxsize=10, path=str(tmp_path / "mutations.sqlite"))
+
+    assert mutator.mutate("a  sentence") == mutator.mutate(" a sentence ") == ["a  sentence 0"]
+    assert len(mutator.computed) == 1, \
+        "Sentences differing in whitespace only should be computed once."
+    mutator.mutate("a sentence", random_seed=14)
+    assert len(mutator.computed) == 2
+
+    assert mutator.mutate_many(["b", "a sentence", "b"]) == [["b 0"], ["a  sentence 0"], ["b 0"]]
+    assert len(mutator.computed) == 3
+
+    # Copies, e.g. in worker processes, start with an empty memory tier but share the store.
+    mutator._result_cache.store.flush()
+    cache = pickle.loads(pickle.dumps(mutator._result_cache))
+    assert len(cache.memory) == 0
+
+    other = SuffixMutator(num_variants=1)
+    other.enable_cache(cache=cache)
+    assert other.mutate("b") == ["b 0"] and other.computed == []
+
+
+def test_persistent_cache_shared_by_threads(tmp_path):
+    import operator
+    from mutatest.cache import SQLiteStore, TieredCache
+    from mutatest.test_runner import MutamorphicTest
+    from tests.helpers import SuffixMutator
+
+    path = str(tmp_path / "mutations.sqlite")
+    sentences = [f"sentence {i}" for i in range(1000)]
+
+    # Threads share the connection and the write buffer, which is flushed by whichever needs to.
+    mutator = SuffixMutator()
+    mutator.enable_cache(maxsize=100, path=path)
+    MutamorphicTest(sentences, mutator, len, operator.eq).run(workers=8, backend="thread")
+    assert len(mutator.computed) == 1000
+    mutator._result_cache.store.close()
+
+    other = SuffixMutator()
+    other.enable_cache(cache=TieredCache(100, SQLiteStore(path, table="mutations")))
+    test = MutamorphicTest(sentences, other, len, operator.eq)
+    test.run(workers=8, backend="thread")
+    assert other.computed == [] and test.test_cases[-1].variants[-1] == "sentence 999 2"
@@ -0,0 +1,60 @@
+import sys
+import os
+sys.path.insert(0, os.getcwd())
+
+
+def test_checkpoint_file_discards_truncated_records(tmp_path):
+    from mutatest.checkpoint import CheckpointFile, case_key
+
+    path = str(tmp_path / "checkpoint.pkl")
+    config = {"class": "DropoutMutator", "num_dropouts": 1, "num_variants": 2}
+    keys = [case_key(x, 13, config) for x in ["first sentence", "second sentence"]]
+
+    checkpoint = CheckpointFile(path)
+    checkpoint.append([{"key": keys[0], "variants": ["first"]}])
+
+    # A run that dies while writing leaves a partial record behind.
+    with open(path, "ab") as file:
+        file.write(b"\x80\x05\x95partial")
+
+    resumed = CheckpointFile(path)
+    assert len(resumed) == 1 and resumed.get(keys[0])["variants"] == ["first"]
+
+    resumed.append([{"key": keys[1], "variants": ["second"]}])
+    assert len(CheckpointFile(path)) == 2
+    assert len(CheckpointFile(path, resume=False)) == 0
+
+    assert keys[0] != case_key("first sentence", 14, config), "Keys should depend on the seed."
+
+
+def test_mutators_with_attributes_json_cannot_encode(tmp_path):
+    import operator
+    from random import Random
+    import numpy as np
+    from mutatest.sharding import merge_shard_reports, write_shard_report
+    from mutatest.test_runner import MutamorphicTest
+    from mutatest.mutators import Mutator
+
+    class ToolMutator(Mutator):
+        def __init__(self):
+            self.rng = Random(13)
+            self.normalize = lambda x: x.lower()
+            self.weights = np.ones(3)
+            self._computed = []
+
+        def mutate(self, input_sentence, random_seed=13):
+            self._computed.append(input_sentence)
+            return [f"{self.normalize(input_sentence)} {i}" for i in range(2)]
+
+    sentences = [f"sentence {i}" for i in range(5)]
+    path = str(tmp_path / "checkpoint.pkl")
+    MutamorphicTest(sentences, ToolMutator(), len, operator.eq).run(checkpoint_path=path)
+
+    # The configuration is described the same way in another instance, so the run resumes.
+    mutator = ToolMutator()
+    test = MutamorphicTest(sentences, mutator, len, operator.eq)
+    test.run(checkpoint_path=path)
+    assert mutator._computed == []
+
+    write_shard_report(str(tmp_path / "shard.jsonl"), test)
+    assert merge_shard_reports([str(tmp_path / "shard.jsonl")])["num_cases"] == 5
@@ -0,0 +1,46 @@
+import sys
+import os
+sys.path.insert(0, os.getcwd())
+
+
+def test_read_sentences_formats():
+    import io
+    import json
+    from mutatest.cli import read_sentences
+
+    with open("tests/resources/example_sentences.json") as file:
+        expected = json.load(file)
+
+    # Small buffers split values (and escapes) between reads.
+    for buffer_size in [1, 7, 1 << 16]:
+        with open("tests/resources/example_sentences.json") as file:
+            assert list(read_sentences(file, buffer_size=buffer_size)) == expected
+
+    text = "first sentence\n\n  second sentence  \nthird"
+    assert list(read_sentences(io.StringIO(text), buffer_size=5)) == \
+        ["first sentence", "second sentence", "third"]
+
+    jsonl = '{"text": "first", "id": 1}\n"second"\n'
+    assert list(read_sentences(io.StringIO(jsonl), field="text")) == ["first", "second"]
+    assert list(read_sentences(io.StringIO(jsonl), "text"))[0] == jsonl.split("\n")[0]
+
+    # Text that starts with a quote is still text.
+    quoted = '"Quoted" title here\nsecond line\n'
+    for buffer_size in [1, 7, 1 << 16]:
+        assert list(read_sentences(io.StringIO(quoted), buffer_size=buffer_size)) == \
+            ['"Quoted" title here', "second line"]
+    assert list(read_sentences(io.StringIO('\n\n  "one line"'), buffer_size=3)) == ["one line"]
+
+    assert list(read_sentences(io.StringIO(' [ "a,]b" , {"sentence": "c"}]'),
+                               "json", buffer_size=2)) == ["a,]b", "c"]
+
+
+def test_mutate_stream_keeps_order():
+    from mutatest.cli import mutate_stream
+    from tests.helpers import SuffixMutator
+
+    mutator = SuffixMutator(num_variants=1)
+    sentences = [f"sentence {i}" for i in range(10)]
+    results = list(mutate_stream(mutator, iter(sentences), 7, chunk_size=3))
+    assert results == [(x, [f"{x} 0"]) for x in sentences]
+    assert mutator.computed == [(x, 7) for x in sentences]
@@ -57,4 +57,29 @@ def test_dropout():
                         assert word_difference == test_case["num_dropouts"], "The dropout mutator is not dropping the right amount of words."
 
 
+def test_dropout_by_position():
+    from mutatest.dropout_mutator import mutate_words_by_dropout
+
+    class FakeWord:
+        def __init__(self, value, is_stopword=False):
+            self.value = value
+            self.is_stopword = is_stopword
+
+    words = [FakeWord("the", True), FakeWord("cat"), FakeWord("sat"), FakeWord("on", True),
+             FakeWord("cat")]
+
+    assert mutate_words_by_dropout(words, 1) == ["the sat on cat", "the cat on cat", "the cat sat on"]
+    assert mutate_words_by_dropout(words, 2, num_variants=4, assure_variants=True) == []
+
+    # Dropping either of two equal adjacent words gives the same output sentence, once.
+    words = [FakeWord("very"), FakeWord("very"), FakeWord("good")]
+    assert mutate_words_by_dropout(words, 1) == ["very good", "very very"]
+    assert mutate_words_by_dropout(words, 1, num_variants=3, assure_variants=True) == []
+
+    words = [FakeWord(f"token{x}") for x in range(200)]
+    result = mutate_words_by_dropout(words, 3, random_seed=SEED, num_variants=50)
+    assert len(set(result)) == 50 and all(len(x.split()) == 197 for x in result)
+    assert result == mutate_words_by_dropout(words, 3, random_seed=SEED, num_variants=50)
+
+
 test_dropout()
@@ -0,0 +1,85 @@
+import sys
+import os
+sys.path.insert(0, os.getcwd())
+
+
+def test_adaptive_run_stops_early():
+    from mutatest.early_stopping import EarlyStopping
+    from mutatest.test_runner import MutamorphicTest
+    from tests.helpers import SuffixMutator
+
+    calls = []
+
+    def model(sentence):
+        calls.append(sentence)
+        return sentence
+
+    def similarity(original, variant):
+        if original.startswith("stable"):
+            return 0.9
+        if original.startswith("noisy"):
+            return 0.6 + 0.4 * (int(variant.split()[-1]) % 2)
+        return 0.1
+
+    def run(early_stopping, batch=False):
+        calls.clear()
+        batch_model = (lambda sentences: [model(x) for x in sentences]) if batch else None
+        test = MutamorphicTest(["stable", "noisy", "bad"], SuffixMutator(num_variants=20), model,
+                               similarity, batch_model_callback=batch_model, batch_size=5)
+        test.run(early_stopping=early_stopping)
+        return test
+
+    test = run(EarlyStopping(tolerance=0.05, min_variants=3, step=2, failure_threshold=0.5))
+    stable, noisy, bad = test.test_cases
+    assert (stable.stop_reason, len(stable.variants)) == ("converged", 3)
+    assert (noisy.stop_reason, len(noisy.variants)) == ("exhausted", 20)
+    assert (bad.stop_reason, len(bad.variants)) == ("failed", 3)
+    assert len(calls) == 4 + 21 + 4 and len(test.similarities) == 26
+    assert list(noisy.similarities) == [0.6 + 0.4 * (i % 2) for i in range(20)]
+
+    # The budget is spent round by round, and the results do not depend on batching.
+    test = run(EarlyStopping(min_variants=3, step=2, max_model_calls=16), batch=True)
+    stable, noisy, bad = test.test_cases
+    assert len(calls) == 16
+    assert (stable.stop_reason, bad.stop_reason) == ("converged", "converged")
+    assert (noisy.stop_reason, len(noisy.variants)) == ("budget", 7)
+    assert list(noisy.similarities) == [0.6 + 0.4 * (i % 2) for i in range(7)]
+
+
+def test_budget_is_split_over_all_test_cases():
+    from mutatest.early_stopping import EarlyStopping
+    from mutatest.test_runner import MutamorphicTest
+    from tests.helpers import SuffixMutator
+
+    calls = []
+
+    def model(sentence):
+        calls.append(sentence)
+        return sentence
+
+    def similarity(original, variant):
+        return 0.5 + 0.5 * (int(variant.split()[-1]) % 2)
+
+    # Test cases have fewer variants than min_variants, so the first round needs 30 * 3 calls,
+    # less than 30 * (1 + min_variants). Each test case then gets an even share of the rest.
+    sentences = [f"sentence {i}" for i in range(30)]
+    test = MutamorphicTest(sentences, SuffixMutator(num_variants=2), model, similarity)
+    test.run(early_stopping=EarlyStopping(min_variants=3, max_model_calls=100))
+    assert len(calls) == 90
+    assert all(x.output_original == x.input_sentence and len(x.similarities) == 2
+               for x in test.test_cases)
+
+    test = MutamorphicTest(sentences, SuffixMutator(num_variants=20), model, similarity)
+    calls.clear()
+    test.run(early_stopping=EarlyStopping(min_variants=3, step=2, max_model_calls=170))
+    assert len(calls) == 170
+    assert all(x.output_original == x.input_sentence for x in test.test_cases)
+    assert sorted(len(x.similarities) for x in test.test_cases) == [4] * 10 + [5] * 20
+
+    # A budget that does not cover the first round fails before the model is run.
+    calls.clear()
+    try:
+        test.run(early_stopping=EarlyStopping(min_variants=3, max_model_calls=50))
+        assert False, "A budget smaller than the first round should be reported."
+    except AssertionError as error:
+        assert "first round" in str(error) and len(calls) == 0
@@ -0,0 +1,56 @@
+import sys
+import os
+sys.path.insert(0, os.getcwd())
+
+
+def test_model_outputs_are_deduplicated_and_persisted(tmp_path):
+    from mutatest.profiling import RunStats
+    from mutatest.test_runner import ModelOutputCache, MutamorphicTest
+    from tests.helpers import SuffixMutator
+
+    calls = []
+
+    def batch_model(sentences):
+        calls.append(list(sentences))
+        return [len(x) for x in sentences]
+
+    def run(model_id, batch_size=2):
+        calls.clear()
+        cache = ModelOutputCache(model_id, path=str(tmp_path / "outputs.sqlite"))
+        stats = RunStats()
+        test = MutamorphicTest(["a", "a 0", "a"], SuffixMutator(), None,
+                               lambda x, y: x / y, batch_model_callback=batch_model,
+                               batch_size=batch_size, model_cache=cache, run_stats=stats)
+        test.run()
+        cache.flush()
+        return test, stats
+
+    # Each distinct sentence is sent to the model once, in batches, also when it is the input of
+    # one test case and a variant of another.
+    test, stats = run("model-v1")
+    assert sorted(x for batch in calls for x in batch) == \
+        ["a", "a 0", "a 0 0", "a 0 1", "a 0 2", "a 1", "a 2"]
+    assert [len(batch) for batch in calls] == [2, 2, 2, 1]
+    assert [(x.output_original, x.output_variants) for x in test.test_cases] == \
+        [(1, [3, 3, 3]), (3, [5, 5, 5]), (1, [3, 3, 3])]
+    assert (stats.counters["model_cache_hits"], stats.counters["model_cache_misses"]) == (5, 7)
+
+    # A later run of the same model reuses the stored outputs, unlike a run of another model.
+    test, stats = run("model-v1")
+    assert calls == [] and stats.counters["model_cache_hits"] == 12
+    assert [list(x.similarities) for x in test.test_cases] == [[1 / 3] * 3, [3 / 5] * 3, [1 / 3] * 3]
+    run("model-v2")
+    assert len([x for batch in calls for x in batch]) == 7
+
+
+def test_store_eviction(tmp_path):
+    from mutatest.cache import SQLiteStore
+
+    store = SQLiteStore(str(tmp_path / "store.sqlite"), flush_every=4, max_entries=5)
+    for i in range(12):
+        store.put(str(i), i)
+    store.flush()
+
+    # The entries written longest ago are evicted first.
+    assert len(store) == 5
+    assert [store.get(str(i)) for i in range(12)] == [None] * 7 + [7, 8, 9, 10, 11]
@@ -0,0 +1,26 @@
+import sys
+import os
+sys.path.insert(0, os.getcwd())
+
+
+def test_mutation_table():
+    from mutatest.mutation_table import MutationTable, render_mutations
+
+    tokens = "the quick fox jumps over the dog".split()
+    table = MutationTable.from_mutations(tokens, [[(6, "cat"), (2, "wolf")],
+                                                  [(2, "wolf")],
+                                                  [(3, "leaps")]])
+
+    assert len(table) == 3
+    assert table.vocabulary == ["wolf", "cat", "leaps"]
+    assert table.positions.tolist() == [2, 6, 2, 3]
+    assert table.variant_ids.tolist() == [0, 0, 1, 2]
+    assert table.mutations(0) == [(2, "wolf"), (6, "cat")]
+
+    assert table[0] == "the quick wolf jumps over the cat"
+    assert table[-1] == "the quick fox leaps over the dog"
+    assert list(table) == table[:] == table.to_list()
+    assert render_mutations(tokens, [(2, "wolf"), (6, "cat")]) == table[0]
+
+    empty = MutationTable.from_mutations(tokens, [])
+    assert len(empty) == 0 and empty.to_list() == []
@@ -0,0 +1,14 @@
+import sys
+import os
+sys.path.insert(0, os.getcwd())
+
+
+def test_text_prepare():
+    from mutatest.normalization import text_prepare, text_prepare_many
+
+    text = "How do I POST a (JSON) file to a REST/Web service in C#?"
+    assert text_prepare(text) == "post json file rest web service c#"
+    assert text_prepare("Ünïcode, tabs\tand\nlines") == "ncode tabsandlines"
+
+    texts = iter([text, "", "The|end."])
+    assert list(text_prepare_many(texts)) == [text_prepare(text), "", "end"]
@@ -0,0 +1,48 @@
+import sys
+import os
+import pickle
+sys.path.insert(0, os.getcwd())
+
+
+def test_run_stats():
+    from mutatest import profiling
+    from mutatest.profiling import RunStats
+
+    with profiling.stage("tokenization"):
+        profiling.count("variants_requested")
+    assert profiling.get_active() is None
+
+    hooked = []
+    stats = RunStats(hooks=[lambda *args: hooked.append(args)])
+    with profiling.recording(stats):
+        for _ in range(3):
+            with profiling.stage("tokenization"):
+                pass
+        profiling.count("variants_requested", 10)
+        profiling.count("variants_produced", 5)
+    assert profiling.get_active() is None
+
+    assert stats.stages["tokenization"].calls == 3 and len(hooked) == 3
+    assert stats.variant_yield == 0.5
+
+    # Stats of worker processes are pickled, and merged into the stats of the test.
+    worker_stats = pickle.loads(pickle.dumps(stats))
+    assert worker_stats.hooks == []
+    stats.merge(worker_stats)
+    assert stats.stages["tokenization"].calls == 6
+    assert stats.to_dict()["counters"] == {"variants_requested": 20, "variants_produced": 10}
+    assert RunStats().to_dict()["variant_yield"] is None
+
+
+def test_test_run_stats():
+    from mutatest.profiling import RunStats
+    from mutatest.test_runner import MutamorphicTest
+    from tests.helpers import SuffixMutator
+
+    stats = RunStats()
+    test = MutamorphicTest(["a", "b"], SuffixMutator(), len, lambda a, b: float(a == b),
+                           run_stats=stats)
+    test.run()
+
+    assert stats.stages["model_inference"].calls == 2
+    assert stats.stages["similarity"].calls == 2
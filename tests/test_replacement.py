@@ -67,4 +67,106 @@ def test_replacement():
                         test_sentence, result) == test_case["num_replacements"], "The replacement mutator is not changing the right amount of words."
 
 
+def test_random_selection_is_exhaustive():
+    from random import Random
+    from mutatest.replacement_mutator import _select_mutations_random, count_mutations
+
+    class FakeWord:
+        def __init__(self, num_variants):
+            self.variants = {f"variant{x}": 1 for x in range(num_variants)}
+
+    words = [FakeWord(2), FakeWord(3), FakeWord(1)]
+
+    # 2*3 + 2*1 + 3*1 ways to replace two of the three words.
+    assert count_mutations(words, 2) == 11
+
+    mutations_list = _select_mutations_random(words, 2, 100, Random(SEED))
+    assert len({frozenset(x) for x in mutations_list}) == 11, "All mutations should be returned."
+    assert _select_mutations_random(words, 2, 12, Random(SEED), assure_variants=True) == []
+    assert _select_mutations_random(words, 2, 5, Random(SEED)) == \
+        _select_mutations_random(words, 2, 5, Random(SEED))
+
+
+def test_mutator_counts_reachable_variants():
+    from mutatest.mutators import ReplacementMutator
+    from mutatest.Word import preprocess_sentences
+
+    [sentence] = preprocess_sentences(["The quick brown fox jumps over the lazy dog"])
+    total = ReplacementMutator(1).count_mutations(sentence)
+    assert total > 0 and total == ReplacementMutator(1).count_mutations(sentence.sentence)
+
+    # Requests beyond the count cannot be assured, and give at most the count otherwise.
+    assert ReplacementMutator(1, total + 1).mutate(sentence, SEED, assure_variants=True) == []
+    assert 0 < len(ReplacementMutator(1, total + 1).mutate(sentence, SEED)) <= total
+
+
+def test_most_common_first_selection():
+    from random import Random
+    from mutatest.replacement_mutator import _select_mutations_most_common_first
+
+    class FakeWord:
+        def __init__(self, value, variants):
+            self.value = value
+            self.variants = variants
+
+    words = [FakeWord("a", {"a1": 3, "a2": 1}), FakeWord("b", {"b1": 2, "b2": 2})]
+
+    mutations_list = _select_mutations_most_common_first(words, 1, 4, Random(SEED))
+    counts = [words[index].variants[variant] for [(index, variant)] in mutations_list]
+    assert counts == [3, 2, 2, 1], "Variants should be used from the most common to the least."
+    assert _select_mutations_most_common_first(words, 2, 3, Random(SEED), True) == []
+
+    # No word is mutated twice in one output sentence, also when it occurs twice.
+    words = [FakeWord(value, {f"{value}{x}": 1 + x % 3 for x in range(5)})
+             for value in ["a", "b", "c", "a", "d"]]
+    mutations_list = _select_mutations_most_common_first(words, 3, 100, Random(SEED))
+    assert len(mutations_list) > 0
+    for mutations in mutations_list:
+        assert len({words[index].value for index, _ in mutations}) == 3
+    assert len({x for mutations in mutations_list for x in mutations}) == 3 * len(mutations_list)
+
+
+def test_preprocessed_sentence_is_reused():
+    from mutatest.mutators import ReplacementMutator, DropoutMutator
+    from mutatest.test_runner import MutamorphicTestCase
+    from mutatest.Word import preprocess_sentences
+
+    sentence = "The quick brown fox jumps over the lazy dog"
+    [preprocessed] = preprocess_sentences([sentence])
+
+    replacement_mutator = ReplacementMutator(1, 3)
+    assert replacement_mutator.mutate(preprocessed, SEED) == replacement_mutator.mutate(sentence, SEED)
+    assert replacement_mutator.mutate(sentence, SEED) == \
+        replacement_mutator.mutate_table(sentence, SEED).to_list()
+
+    test_case = MutamorphicTestCase(preprocessed)
+    test_case.compute_variants(DropoutMutator(1, 3), SEED)
+    assert test_case.input_sentence == sentence
+    assert test_case.preprocessed is preprocessed
+    assert test_case.get_nontrivial_words() == preprocessed.nontrivial_words
+
+    # Sentences whose variants are cached are not preprocessed again.
+    replacement_mutator.enable_cache()
+    variants = replacement_mutator.mutate(sentence, SEED)
+    test_case = MutamorphicTestCase(sentence)
+    test_case.compute_variants(replacement_mutator, SEED)
+    assert test_case.variants == variants and test_case._preprocessed is None
+    assert replacement_mutator._result_cache.memory.hits == 1
+
+
+def test_words_are_shared():
+    import pickle
+    from mutatest.Word import Word
+
+    word = Word.from_tuple(("Dogs", "NNS"))
+    assert Word("dogs", "NN") is word and pickle.loads(pickle.dumps(word)) is word
+    assert Word("dogs", "VBZ") != word and word.pos_tag == "n"
+
+    try:
+        word.value = "cats"
+        assert False, "Words should be immutable."
+    except AttributeError:
+        pass
+
+
 test_replacement()
@@ -0,0 +1,34 @@
+import sys
+import os
+sys.path.insert(0, os.getcwd())
+
+
+def test_unrank_enumerates_all_choices():
+    from mutatest.sampling import count_table, unrank
+
+    radices = [2, 3, 1]
+    table = count_table(radices, 2)
+    choices = [unrank(rank, radices, 2, table) for rank in range(table[0][2])]
+    assert len(choices) == 2 * 3 + 2 * 1 + 3 * 1
+    assert len(set(map(tuple, choices))) == len(choices)
+
+    # With one option per element, choices are the combinations in lexicographic order.
+    table = count_table([1] * 4, 2)
+    assert [[x for x, _ in unrank(rank, [1] * 4, 2, table)] for rank in range(table[0][2])] == \
+        [[0, 1], [0, 2], [0, 3], [1, 2], [1, 3], [2, 3]]
+
+
+def test_sample_distinct():
+    from random import Random
+    from mutatest.sampling import sample_distinct, shuffled_ranks
+
+    assert sorted(shuffled_ranks(100, Random(13))) == list(range(100))
+
+    # Huge spaces are sampled without enumerating them.
+    sampled = sample_distinct(10 ** 30, 50, Random(13), lambda rank: rank)
+    assert len({rank for rank, _ in sampled}) == 50
+    assert sampled == sample_distinct(10 ** 30, 50, Random(13), lambda rank: rank)
+
+    # Ranks with equal renderings count once.
+    assert sorted(x for _, x in sample_distinct(10, 10, Random(13), lambda rank: rank % 3)) == \
+        [0, 1, 2]
@@ -0,0 +1,71 @@
+import sys
+import os
+sys.path.insert(0, os.getcwd())
+
+# Runs a shard of a test with a mutator and model that do not need NLTK resources.
+SHARD_SCRIPT = """
+import hashlib, sys
+import numpy as np
+sys.path.insert(0, ".")
+from mutatest.sharding import write_shard_report
+from mutatest.test_runner import MutamorphicTest
+from tests.helpers import NoiseMutator
+
+def model(sentence):
+    return np.frombuffer(hashlib.md5(sentence.encode()).digest(), dtype=np.uint8) / 255
+
+def similarity(a, b):
+    return float(np.dot(a, b) / np.linalg.norm(a) / np.linalg.norm(b))
+
+shard_index, shard_count, path = int(sys.argv[1]), int(sys.argv[2]), sys.argv[3]
+sentences = [f"sentence {i}" for i in range(200)]
+test = MutamorphicTest(sentences, NoiseMutator(), model, similarity, random_seed=7,
+                       shard_index=shard_index, shard_count=shard_count)
+test.run(workers=1)
+write_shard_report(path, test)
+"""
+
+
+def test_merged_shards_do_not_depend_on_shard_count(tmp_path):
+    import subprocess
+    from mutatest.cli import main
+    from mutatest.sharding import merge_shard_reports
+
+    reports = dict()
+    for shard_count in [1, 3]:
+        paths = [str(tmp_path / f"shard-{shard_count}-{i}.jsonl") for i in range(shard_count)]
+        processes = [subprocess.Popen([sys.executable, "-c", SHARD_SCRIPT, str(i),
+                                       str(shard_count), path])
+                     for i, path in enumerate(paths)]
+        assert all(x.wait() == 0 for x in processes)
+
+        reports[shard_count] = merge_shard_reports(paths[::-1])
+
+    single, sharded = reports[1], reports[3]
+    assert single["num_cases"] == 200 and 0 < single["num_unmutated"] < 200
+    assert {k: v for k, v in single.items() if k != "shard_count"} == \
+           {k: v for k, v in sharded.items() if k != "shard_count"}
+
+    output = str(tmp_path / "report.json")
+    assert main(["merge", *[str(tmp_path / f"shard-3-{i}.jsonl") for i in range(3)],
+                 "-o", output]) == 0
+
+    try:
+        merge_shard_reports([str(tmp_path / "shard-3-0.jsonl")])
+        assert False, "Missing shards should be reported."
+    except AssertionError as error:
+        assert "missing" in str(error)
+
+
+def test_merged_report_without_variants_is_valid_json(tmp_path):
+    import json
+    from mutatest.sharding import merge_shard_reports
+
+    path = tmp_path / "shard.jsonl"
+    header = {"shard_index": 0, "shard_count": 1, "random_seed": 13, "seed_per_case": True,
+              "mutator_config": {}}
+    path.write_text(json.dumps(header) + "\n" + json.dumps({"similarities": []}) + "\n")
+
+    report = merge_shard_reports([str(path)])
+    assert report["num_unmutated"] == 1 and report["mean"] is None
+    json.dumps(report, allow_nan=False)
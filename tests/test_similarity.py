@@ -0,0 +1,20 @@
+import sys
+import os
+import numpy as np
+sys.path.insert(0, os.getcwd())
+
+
+def test_similarity_metrics():
+    from mutatest.similarity import cosine_similarity, l2_similarity, label_agreement
+
+    originals = np.array([[1.0, 0.0], [0.0, 0.0], [1.0, 2.0]])
+    variants = np.array([[2.0, 0.0], [1.0, 0.0], [-1.0, -2.0]])
+
+    assert np.allclose(cosine_similarity(originals, variants), [1.0, 0.0, -1.0])
+    assert np.allclose(l2_similarity(originals, originals), 1.0)
+    assert np.allclose(l2_similarity(originals, variants), [0.5, 0.5, 1 / (1 + np.sqrt(20))])
+
+    # Score vectors are compared by their highest score, labels directly.
+    assert np.array_equal(label_agreement(originals, variants), [1.0, 1.0, 0.0])
+    assert np.array_equal(label_agreement(np.array(["bug", "feature"]), np.array(["bug", "bug"])),
+                          [1.0, 0.0])
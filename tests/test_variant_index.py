@@ -0,0 +1,37 @@
+import sys
+import os
+sys.path.insert(0, os.getcwd())
+
+
+def test_variant_index_lookup(tmp_path):
+    from mutatest.variant_index import (VariantIndex, write_variant_index, FLAG_LEMMA_ANY,
+                                        FLAG_LEMMA_ALL, FLAG_DIRECT)
+
+    lemma = FLAG_LEMMA_ANY | FLAG_LEMMA_ALL | FLAG_DIRECT
+    path = str(tmp_path / "variants.idx")
+    write_variant_index(path, [
+        ("n", "file", lemma, {"file": 3, "data file": 1, "record": 2}),
+        ("n", "goose", lemma, {"goose": 2, "bird": 1}),
+        ("n", "geese", 0, {"goose": 2, "bird": 1}),
+        ("v", "file", lemma, {"file": 2, "register": 1}),
+        ("n", "axis", FLAG_LEMMA_ANY | FLAG_LEMMA_ALL, {"axis": 1}),
+    ])
+
+    index = VariantIndex(path)
+    assert len(index) == 5
+
+    # Exact entries only drop the word itself.
+    assert index.lookup("file", "n") == {"data file": 1, "record": 2}
+    assert index.lookup("geese", "n") == {"goose": 2, "bird": 1}
+    assert index.lookup("file", "v") == {"register": 1}
+
+    # Regular inflections are answered from their base form.
+    assert index.lookup("files", "n") == {"file": 3, "data file": 1, "record": 2}
+
+    # Words without any base form in WordNet have no variants.
+    assert index.lookup("teambox", "n") == {}
+
+    # Base forms that WordNet maps to other forms as well cannot be answered exactly.
+    assert index.lookup("axises", "n") is None
+
+    index.close()
@@ -0,0 +1,93 @@
+import sys
+import os
+sys.path.insert(0, os.getcwd())
+
+
+def _write_embeddings(directory, vocabulary, vectors):
+    import numpy as np
+
+    np.save(str(directory / "vectors.npy"), np.asarray(vectors, dtype=np.float32))
+    with open(str(directory / "vocabulary.txt"), "w") as file:
+        file.write("\n".join(vocabulary) + "\n")
+
+    return str(directory / "vectors.npy"), str(directory / "vocabulary.txt")
+
+
+def test_embedding_nearest_neighbors(tmp_path):
+    import numpy as np
+    from mutatest.variant_sources import EmbeddingVariantSource
+
+    rng = np.random.default_rng(13)
+    vocabulary = [f"word{i}" for i in range(50)] + ["Word0", "new_york"]
+    vectors = rng.normal(size=(len(vocabulary), 8))
+    vectors[-2] = vectors[0]
+    paths = _write_embeddings(tmp_path, vocabulary, vectors)
+
+    normalized = vectors / np.linalg.norm(vectors, axis=1)[:, None]
+    queries = [("word0", "n"), ("unknown", "n"), ("word7", "v"), ("new_york", "n")]
+
+    # Blocks smaller than the number of candidates are merged across blocks.
+    for block_size in [3, 1000]:
+        source = EmbeddingVariantSource(*paths, k=4, block_size=block_size)
+        results = source.lookup_many(queries)
+
+        assert results[1] == {}
+        for (value, _), variants in zip(queries, results):
+            if value == "unknown":
+                continue
+            similarities = normalized @ normalized[vocabulary.index(value)]
+            expected = [vocabulary[i].replace("_", " ") for i in np.argsort(-similarities)
+                        if vocabulary[i].lower() != value][:4]
+            assert list(variants) == expected
+            assert list(variants.values()) == sorted(variants.values(), reverse=True)
+
+        # The case variant of the query itself is not a variant.
+        assert "Word0" not in results[0] and "word0" not in results[0]
+        assert results == [source.lookup(*x) for x in queries]
+
+
+def test_words_use_variant_source(tmp_path):
+    import pickle
+    import numpy as np
+    from mutatest.variant_sources import EmbeddingVariantSource
+    from mutatest.Word import Word, preprocess_sentences
+
+    vocabulary = ["upload", "transfer", "send", "file", "document", "image"]
+    vectors = np.array([[1, 0, 0], [0.9, 0.1, 0], [0.8, 0.3, 0],
+                        [0, 1, 0], [0, 0.9, 0.2], [0, 0.6, 0.8]])
+    source = EmbeddingVariantSource(*_write_embeddings(tmp_path, vocabulary, vectors), k=2,
+                                    name="test-embeddings")
+
+    [sentence] = preprocess_sentences(["How to upload a file"], variant_source=source)
+    index = sentence.tokens.index("file")
+    file_word, tag = sentence.words[index], sentence.tags[index]
+    assert sentence.variant_source == "test-embeddings" and file_word.source == "test-embeddings"
+    assert list(file_word.variants) == ["document", "image"]
+
+    # Words of different sources are different words.
+    assert Word("file", tag) is not file_word and Word("file", tag).source == "wordnet"
+    assert Word("file", tag, "test-embeddings") is file_word
+    assert pickle.loads(pickle.dumps(file_word)) is file_word
+
+
+def test_mutator_config_includes_variant_source(tmp_path):
+    import numpy as np
+    from mutatest.checkpoint import case_key
+    from mutatest.mutators import ReplacementMutator
+    from mutatest.variant_sources import EmbeddingVariantSource, configure_variant_source
+
+    paths = _write_embeddings(tmp_path, ["file", "document"], np.eye(2))
+    mutator = ReplacementMutator(1, 5)
+    assert mutator.config["variant_source"] == {"name": "wordnet"}
+
+    # Sources with the same name but other parameters give other checkpoint keys.
+    keys = []
+    try:
+        for k in [1, 2]:
+            configure_variant_source(EmbeddingVariantSource(*paths, k=k, name="test-embeddings"))
+            assert mutator.config["variant_source"]["k"] == k
+            keys.append(case_key("a file", 13, mutator.config))
+    finally:
+        configure_variant_source("wordnet")
+
+    assert keys[0] != keys[1]
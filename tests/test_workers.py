@@ -0,0 +1,32 @@
+import sys
+import os
+sys.path.insert(0, os.getcwd())
+
+
+def test_worker_pools_run_custom_mutators():
+    import operator
+    from mutatest.test_runner import MutamorphicTest
+    from tests.helpers import NoiseMutator, SuffixMutator
+
+    sentences = [f"sentence {i}" for i in range(20)]
+    expected = MutamorphicTest(sentences, NoiseMutator(), len, operator.eq)
+    expected.run()
+
+    # Custom mutators need neither NLTK resources nor a counter of sentences without variants.
+    for backend in ["thread", "process"]:
+        test = MutamorphicTest(sentences, NoiseMutator(), len, operator.eq)
+        test.run(workers=3, backend=backend)
+        assert [x.variants for x in test.test_cases] == [x.variants for x in expected.test_cases]
+
+    mutator = SuffixMutator(num_variants=0)
+    MutamorphicTest(sentences, mutator, len, operator.eq).run(workers=3, backend="process")
+    assert mutator.non_mutated == 20
+
+
+def test_worker_initialization_without_resources(monkeypatch):
+    from mutatest.test_runner import _initialize_worker
+
+    # Missing resources are reported by the test cases that need them, not by the pool.
+    monkeypatch.setenv("MUTATEST_OFFLINE", "1")
+    monkeypatch.setattr("nltk.data.path", [])
+    _initialize_worker(preprocesses=True)